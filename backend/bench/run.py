@@ -0,0 +1,358 @@
+"""
+Load and latency benchmark for the FastAPI + WebSocket server.
+
+Starts bench.serve (server.py on seeded local stand-ins for TradingView, NSE
+and Trendlyne) once per client count and drives that many simulated
+dashboards: a /ws subscriber per dashboard plus App.js's REST pattern
+(candles, OI data and account on load, candles again every 5 seconds).
+
+Per step it records live_tick fan-out latency (feed timestamp to client
+receipt) percentiles, REST p50/p99 per endpoint, messages per second, and
+server CPU and RSS, and writes everything to one JSON file.
+
+    cd backend
+    python -m bench.run --clients 1,10,50,100 --duration 20
+    python -m bench.run --clients 50 --baseline bench/results/<earlier>.json
+    python -m bench.run --clients 50,200 --replay recordings/<session>.tape --speed max
+
+With --baseline, a step whose p99 is more than --tolerance worse than the
+same step in the baseline is reported and the exit status is 1.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import httpx
+import numpy as np
+from websockets.asyncio.client import connect
+
+try:
+    import msgpack
+except ImportError:  # only needed for --encoding msgpack
+    msgpack = None
+
+try:
+    import psutil
+except ImportError:  # falls back to /proc on Linux
+    psutil = None
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+RESULTS_DIR = Path(__file__).resolve().parent / 'results'
+POLL_SECONDS = 5.0
+
+
+def percentiles(samples: List[float]) -> Dict[str, Optional[float]]:
+    if not samples:
+        return {"count": 0, "p50": None, "p90": None, "p99": None, "max": None}
+    values = np.asarray(samples)
+    p50, p90, p99 = np.percentile(values, [50, 90, 99])
+    return {"count": len(samples), "p50": round(float(p50), 3), "p90": round(float(p90), 3),
+            "p99": round(float(p99), 3), "max": round(float(values.max()), 3)}
+
+
+class ProcessSampler:
+    """CPU % and RSS of the server process, sampled once a second."""
+
+    def __init__(self, pid: int):
+        self.pid = pid
+        self.cpu: List[float] = []
+        self.rss: List[float] = []
+        self.proc = psutil.Process(pid) if psutil else None
+
+    def _cpu_seconds(self) -> Optional[float]:
+        if self.proc:
+            times = self.proc.cpu_times()
+            return times.user + times.system
+        try:
+            fields = Path(f'/proc/{self.pid}/stat').read_text().rsplit(')', 1)[1].split()
+            return (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')
+        except (OSError, IndexError, ValueError):
+            return None
+
+    def _rss_mb(self) -> Optional[float]:
+        if self.proc:
+            return self.proc.memory_info().rss / 1e6
+        try:
+            for line in Path(f'/proc/{self.pid}/status').read_text().splitlines():
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1e3
+        except (OSError, ValueError):
+            pass
+        return None
+
+    async def run(self):
+        last_cpu, last_at = self._cpu_seconds(), time.monotonic()
+        while True:
+            await asyncio.sleep(1.0)
+            cpu, now = self._cpu_seconds(), time.monotonic()
+            if cpu is not None and last_cpu is not None:
+                self.cpu.append(100.0 * (cpu - last_cpu) / (now - last_at))
+            last_cpu, last_at = cpu, now
+            rss = self._rss_mb()
+            if rss is not None:
+                self.rss.append(rss)
+
+    def reset(self):
+        self.cpu.clear()
+        self.rss.clear()
+
+    def summary(self) -> Dict[str, Optional[float]]:
+        return {
+            "cpu_percent_mean": round(float(np.mean(self.cpu)), 1) if self.cpu else None,
+            "cpu_percent_max": round(float(np.max(self.cpu)), 1) if self.cpu else None,
+            "rss_mb_mean": round(float(np.mean(self.rss)), 1) if self.rss else None,
+            "rss_mb_peak": round(float(np.max(self.rss)), 1) if self.rss else None
+        }
+
+
+class Recorder:
+    def __init__(self):
+        self.measuring = False
+        self.tick_latency: List[float] = []
+        self.messages = 0
+        self.ticks = 0
+        self.rest: Dict[str, List[float]] = {}
+        self.rest_errors: Dict[str, int] = {}
+        self.ws_errors = 0
+
+    def start(self):
+        self.measuring = True
+        self.started = time.monotonic()
+
+    def stop(self):
+        self.measuring = False
+        self.elapsed = time.monotonic() - self.started
+
+
+def _tick_ts_ms(raw, encoding: str) -> Optional[float]:
+    """Feed timestamp of a live_tick frame in any encoding; None for other messages."""
+    if encoding == 'json':
+        message = json.loads(raw)
+        if message.get('type') != 'live_tick':
+            return None
+        return datetime.fromisoformat(message['timestamp']).timestamp() * 1000
+    message = msgpack.unpackb(raw) if isinstance(raw, bytes) else json.loads(raw)
+    if isinstance(message, list) and message and message[0] in (1, 2):
+        return float(message[2])
+    return None
+
+
+async def dashboard(base_url: str, ws_url: str, symbol: str, encoding: str, http: httpx.AsyncClient,
+                    recorder: Recorder, stop: asyncio.Event):
+    async def get(name: str, path: str):
+        started = time.perf_counter()
+        try:
+            response = await http.get(base_url + path)
+            response.raise_for_status()
+            response.content
+        except Exception:
+            if recorder.measuring:
+                recorder.rest_errors[name] = recorder.rest_errors.get(name, 0) + 1
+            return
+        if recorder.measuring:
+            recorder.rest.setdefault(name, []).append((time.perf_counter() - started) * 1000)
+
+    async def poll():
+        candles = f"/api/market/candles?symbol={symbol}&interval=1&n_bars=100"
+        await asyncio.gather(get('candles', candles), get('oi_data', f"/api/market/oi-data?symbol={symbol}"),
+                             get('account', '/api/account'))
+        while not stop.is_set():
+            try:
+                await asyncio.wait_for(stop.wait(), POLL_SECONDS)
+            except asyncio.TimeoutError:
+                await get('candles', candles)
+
+    poller = asyncio.create_task(poll())
+    try:
+        async with connect(ws_url, max_queue=None) as ws:
+            await ws.send(json.dumps({"type": "subscribe", "symbols": [symbol]}))
+            stopped = asyncio.create_task(stop.wait())
+            while not stop.is_set():
+                received = asyncio.create_task(ws.recv())
+                done, _ = await asyncio.wait({received, stopped}, return_when=asyncio.FIRST_COMPLETED)
+                if received not in done:
+                    received.cancel()
+                    break
+                raw = received.result()
+                now_ms = time.time() * 1000
+                if not recorder.measuring:
+                    continue
+                recorder.messages += 1
+                ts_ms = _tick_ts_ms(raw, encoding)
+                if ts_ms is not None:
+                    recorder.ticks += 1
+                    recorder.tick_latency.append(now_ms - ts_ms)
+    except Exception:
+        recorder.ws_errors += 1
+    finally:
+        await poller
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+async def wait_healthy(base_url: str, server: subprocess.Popen, timeout: float = 60.0):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as http:
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                raise RuntimeError(f"server exited with status {server.returncode}")
+            try:
+                if (await http.get(base_url + '/api/health')).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError("server did not become healthy in time")
+
+
+async def run_step(clients: int, args, log) -> Dict[str, Any]:
+    port = _free_port()
+    base_url, ws_url = f"http://127.0.0.1:{port}", f"ws://127.0.0.1:{port}/ws"
+    if args.encoding != 'json':
+        ws_url += f"?encoding={args.encoding}"
+    command = [sys.executable, '-m', 'bench.serve', '--port', str(port), '--tick-rate', str(args.tick_rate),
+               '--provider-latency-ms', str(args.provider_latency_ms), '--seed', str(args.seed)]
+    if args.replay:
+        command += ['--replay', str(Path(args.replay).resolve()), '--speed', args.speed]
+    server = subprocess.Popen(command, cwd=BACKEND_DIR, stdout=log, stderr=log)
+    try:
+        await wait_healthy(base_url, server)
+        sampler = ProcessSampler(server.pid)
+        sampling = asyncio.create_task(sampler.run())
+        recorder, stop = Recorder(), asyncio.Event()
+        limits = httpx.Limits(max_connections=max(clients * 2, 10))
+        async with httpx.AsyncClient(limits=limits, timeout=30.0) as http:
+            symbols = args.symbols
+            tasks = []
+            for i in range(clients):
+                tasks.append(asyncio.create_task(
+                    dashboard(base_url, ws_url, symbols[i % len(symbols)], args.encoding, http, recorder, stop)))
+                # Ramp connections in over about a second rather than all at once
+                await asyncio.sleep(min(1.0 / clients, 0.05))
+            await asyncio.sleep(args.warmup)
+            sampler.reset()
+            recorder.start()
+            await asyncio.sleep(args.duration)
+            recorder.stop()
+            stop.set()
+            await asyncio.gather(*tasks)
+        sampling.cancel()
+        await asyncio.gather(sampling, return_exceptions=True)
+    finally:
+        server.terminate()
+        try:
+            server.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            server.kill()
+
+    return {
+        "clients": clients,
+        "duration_seconds": round(recorder.elapsed, 2),
+        "messages": recorder.messages,
+        "messages_per_second": round(recorder.messages / recorder.elapsed, 1),
+        "ticks_per_second": round(recorder.ticks / recorder.elapsed, 1),
+        "tick_latency_ms": percentiles(recorder.tick_latency),
+        "rest_ms": {name: {**percentiles(samples), "errors": recorder.rest_errors.get(name, 0)}
+                    for name, samples in sorted(recorder.rest.items())},
+        "ws_errors": recorder.ws_errors,
+        "server": sampler.summary()
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Human-readable p99 regressions of current vs baseline, matched by client count."""
+    previous = {run["clients"]: run for run in baseline.get("runs", [])}
+    regressions = []
+    for run in current["runs"]:
+        before = previous.get(run["clients"])
+        if before is None:
+            continue
+        pairs = [("tick_latency_ms", run["tick_latency_ms"], before["tick_latency_ms"])]
+        pairs += [(f"rest_ms.{name}", stats, before["rest_ms"].get(name, {})) for name, stats in run["rest_ms"].items()]
+        for label, now, then in pairs:
+            if now.get("p99") is not None and then.get("p99") and now["p99"] > then["p99"] * (1 + tolerance):
+                regressions.append(f"{run['clients']} clients {label} p99 {then['p99']} -> {now['p99']} ms")
+    return regressions
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BACKEND_DIR, capture_output=True,
+                              text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+async def main_async(args) -> int:
+    RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+    stamp = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+    out = Path(args.out) if args.out else RESULTS_DIR / f"bench-{stamp}.json"
+    result = {
+        "meta": {
+            "started_at": stamp,
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "args": {k: v for k, v in vars(args).items() if k not in ('out', 'baseline')}
+        },
+        "runs": []
+    }
+    with open(out.with_suffix('.server.log'), 'w') as log:
+        for clients in args.clients:
+            run = await run_step(clients, args, log)
+            result["runs"].append(run)
+            latency, rest = run["tick_latency_ms"], run["rest_ms"].get("candles", {})
+            print(f"{clients:>5} clients  {run['messages_per_second']:>9} msg/s  "
+                  f"tick p50 {latency['p50']} p99 {latency['p99']} ms  "
+                  f"candles p50 {rest.get('p50')} p99 {rest.get('p99')} ms  "
+                  f"cpu {run['server']['cpu_percent_mean']}%  rss {run['server']['rss_mb_peak']} MB", flush=True)
+            out.write_text(json.dumps(result, indent=2))
+    print(f"Results written to {out}")
+
+    if args.baseline:
+        regressions = compare(result, json.loads(Path(args.baseline).read_text()), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        return 1 if regressions else 0
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clients', default='1,10,50', type=lambda s: [int(n) for n in s.split(',')],
+                        help='comma-separated dashboard counts, one server run each')
+    parser.add_argument('--duration', type=float, default=20.0, help='measured seconds per step')
+    parser.add_argument('--warmup', type=float, default=5.0, help='unmeasured seconds after all clients connect')
+    parser.add_argument('--symbols', default='NIFTY,BANKNIFTY', type=lambda s: s.split(','),
+                        help='dashboards are spread over these symbols')
+    parser.add_argument('--encoding', default='json', choices=['json', 'compact', 'msgpack'])
+    parser.add_argument('--tick-rate', type=float, default=10.0, help='stub bar updates per second per symbol')
+    parser.add_argument('--provider-latency-ms', type=float, default=50.0)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--replay', default=None, help='recorded tape to serve instead of the stub stream')
+    parser.add_argument('--speed', default='1', help="replay speed multiplier, or 'max'")
+    parser.add_argument('--out', default=None, help='result JSON (default: bench/results/bench-<utc>.json)')
+    parser.add_argument('--baseline', default=None, help='earlier result JSON to check p99 regressions against')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed p99 slowdown vs baseline (0.2 = 20%%)')
+    args = parser.parse_args()
+    if args.encoding == 'msgpack' and msgpack is None:
+        parser.error("--encoding msgpack needs the msgpack package")
+    sys.exit(asyncio.run(main_async(args)))
+
+
+if __name__ == '__main__':
+    main()
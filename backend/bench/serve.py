@@ -0,0 +1,46 @@
+"""
+server.py against deterministic local stand-ins, for benchmarking.
+
+    python -m bench.serve --port 8765 --tick-rate 10
+    python -m bench.serve --replay recordings/<session>.tape --speed 10
+
+Nothing leaves the machine and nothing touches trading.db: history, option
+chains and the live stream come from bench.stubs, or from a recorded tape
+with --replay (real tick distributions, looped), SQLite goes to a
+throw-away file.
+"""
+import argparse
+import os
+import tempfile
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--tick-rate', type=float, default=10.0, help='bar updates per second per symbol')
+    parser.add_argument('--provider-latency-ms', type=float, default=50.0)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--db', default=None, help='SQLite path (default: a temporary file)')
+    parser.add_argument('--replay', default=None, help='tape to replay instead of the seeded stand-ins')
+    parser.add_argument('--speed', default='1', help="replay speed multiplier, or 'max'")
+    args = parser.parse_args()
+
+    os.environ['USE_MOCK_DATA'] = 'false'
+    os.environ.pop('RECORD_TAPE', None)
+    if args.replay:
+        os.environ.update(REPLAY_FILE=args.replay, REPLAY_SPEED=args.speed, REPLAY_LOOP='true')
+    import uvicorn
+
+    import server
+    from sqlite_db import sqlite_db
+    from bench.stubs import install
+
+    if not args.replay:
+        install(seed=args.seed, tick_rate=args.tick_rate, provider_latency=args.provider_latency_ms / 1000)
+    sqlite_db.db_path = args.db or os.path.join(tempfile.mkdtemp(prefix='bench-'), 'trading.db')
+    uvicorn.run(server.app, host=args.host, port=args.port, log_level='warning')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,162 @@
+import asyncio
+import random
+import time
+import zlib
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from core.option_chain import IST
+from data.providers import DataProvider
+
+
+def _rng(*parts) -> random.Random:
+    # Same inputs, same numbers: every run sees identical candles, chains and ticks
+    return random.Random(zlib.crc32(':'.join(str(p) for p in parts).encode()))
+
+
+def base_price(symbol: str) -> float:
+    symbol = symbol.upper()
+    if 'BANKNIFTY' in symbol:
+        return 48000.0
+    if 'NIFTY' in symbol:
+        return 22000.0
+    return 1000.0 + zlib.crc32(symbol.encode()) % 4000
+
+
+class StubHistoricalProvider(DataProvider):
+    """Seeded random-walk candles in place of TradingView history."""
+
+    name = 'stub-tradingview'
+
+    def __init__(self, seed: int = 0, latency: float = 0.05):
+        self.seed = seed
+        self.latency = latency
+
+    async def get_historical_ohlcv(self, symbol: str, interval: str, n_bars: int) -> Optional[List[dict]]:
+        await asyncio.sleep(self.latency)
+        rng = _rng(self.seed, symbol, interval)
+        step = int(interval) * 60 if interval.isdigit() else 86400
+        end = int(time.time()) // step * step
+        price = base_price(symbol)
+        candles = []
+        for i in range(n_bars):
+            open_ = price
+            close = open_ * (1 + rng.gauss(0, 0.001))
+            candles.append({
+                "time": end - (n_bars - 1 - i) * step,
+                "open": round(open_, 2),
+                "high": round(max(open_, close) * (1 + abs(rng.gauss(0, 0.0005))), 2),
+                "low": round(min(open_, close) * (1 - abs(rng.gauss(0, 0.0005))), 2),
+                "close": round(close, 2),
+                "volume": rng.randint(100000, 500000)
+            })
+            price = close
+        return candles
+
+
+class StubOptionChainProvider(DataProvider):
+    """Seeded option chains (NSE / Trendlyne stand-in); premiums change every `period` seconds."""
+
+    name = 'stub-options'
+
+    def __init__(self, seed: int = 0, latency: float = 0.1, strikes: int = 41, period: float = 5.0):
+        self.seed = seed
+        self.latency = latency
+        self.strikes = strikes
+        self.period = period
+
+    async def get_option_chain(self, symbol: str, expiry: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        await asyncio.sleep(self.latency)
+        bucket = int(time.time() // self.period)
+        rng = _rng(self.seed, symbol, bucket)
+        spot = base_price(symbol) * (1 + rng.gauss(0, 0.002))
+        gap = 100 if 'BANKNIFTY' in symbol.upper() else 50
+        atm = round(spot / gap) * gap
+        expiry = expiry or (datetime.now(IST) + timedelta(days=7)).strftime('%d-%b-%Y')
+        rows = []
+        for i in range(-(self.strikes // 2), self.strikes // 2 + 1):
+            strike = atm + i * gap
+            time_value = spot * 0.006 * 2.718 ** (-(i * gap / (spot * 0.01)) ** 2 / 2)
+            rows.append({
+                "strike": strike,
+                "ce_oi": rng.randint(10000, 100000),
+                "pe_oi": rng.randint(10000, 100000),
+                "ce_change": rng.randint(-5000, 5000),
+                "pe_change": rng.randint(-5000, 5000),
+                "ce_ltp": round(max(spot - strike, 0) + time_value, 2),
+                "pe_ltp": round(max(strike - spot, 0) + time_value, 2)
+            })
+        return {
+            "symbol": symbol,
+            "expiry": expiry,
+            "expiries": [expiry],
+            "spot": round(spot, 2),
+            "strikes": rows,
+            "timestamp": datetime.now(IST).isoformat(),
+            "source": "stub"
+        }
+
+
+class StubStream:
+    """
+    Stand-in for data.tv_stream.TradingViewStream: every added symbol
+    produces `tick_rate` seeded 1-minute bar updates per second.
+    """
+
+    def __init__(self, on_bar, tick_rate: float = 10.0, seed: int = 0, **kwargs):
+        self.on_bar = on_bar
+        self.tick_rate = tick_rate
+        self.seed = seed
+        self.tasks: Dict[str, asyncio.Task] = {}
+        self.connected = True
+        self.reconnects = 0
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        for task in self.tasks.values():
+            task.cancel()
+        await asyncio.gather(*self.tasks.values(), return_exceptions=True)
+        self.tasks.clear()
+
+    async def add_symbol(self, symbol: str):
+        if symbol not in self.tasks:
+            self.tasks[symbol] = asyncio.create_task(self._run(symbol))
+
+    async def remove_symbol(self, symbol: str):
+        task = self.tasks.pop(symbol, None)
+        if task:
+            task.cancel()
+
+    async def _run(self, symbol: str):
+        rng = _rng(self.seed, symbol, 'ticks')
+        interval = 1.0 / self.tick_rate
+        price = base_price(symbol)
+        minute, open_, high, low, volume = None, price, price, price, 0
+        next_at = time.monotonic()
+        while True:
+            next_at += interval
+            await asyncio.sleep(max(next_at - time.monotonic(), 0))
+            now = int(time.time())
+            if now // 60 != minute:
+                minute, open_, high, low, volume = now // 60, price, price, price, 0
+            price = round(price * (1 + rng.gauss(0, 0.0002)), 2)
+            high, low = max(high, price), min(low, price)
+            volume += rng.randint(1, 500)
+            await self.on_bar(symbol, {
+                "timestamp": minute * 60, "open": open_, "high": high, "low": low, "close": price, "volume": volume
+            })
+
+
+def install(seed: int = 0, tick_rate: float = 10.0, provider_latency: float = 0.05):
+    """Swap every upstream (history, option chains, live stream) for its stand-in; call before app startup."""
+    from functools import partial
+
+    import data.tv_stream
+    from data.providers import provider_registry
+
+    provider_registry.register('tradingview', StubHistoricalProvider(seed, provider_latency))
+    provider_registry.register('nse', StubOptionChainProvider(seed, provider_latency * 2))
+    provider_registry.register('trendlyne', StubOptionChainProvider(seed, provider_latency * 2))
+    data.tv_stream.TradingViewStream = partial(StubStream, tick_rate=tick_rate, seed=seed)
@@ -11,30 +11,129 @@ TV_PASSWORD = os.getenv('TV_PASSWORD')
 DATA_PROVIDER_CONFIG: Dict[str, Any] = {
     'live_feed': {
         'provider': 'tradingview',  # 'tradingview' | 'nse' | 'custom'
+        'mode': 'session',  # 'session' (one multiplexed upstream socket) | 'poll' (Streamer per symbol)
+        'teardown_grace_seconds': 30,  # keep an unsubscribed symbol streaming this long before stopping it
         'enabled': True
     },
     'historical': {
         'provider': 'tradingview',  # 'tradingview' | 'nse'
+        'hedge_after_ms': 3000,  # start the fallback (if any) when the primary is slower than this
+        'timeout_seconds': 30,
+        'max_concurrent': 25,  # TradingView history sockets open at once
         'enabled': True
     },
     'options': {
         'provider': 'nse',  # 'nse' | 'trendlyne'
         'fallback': 'trendlyne',
+        'chain_ttl_seconds': 5,  # option chains are cached per (symbol, expiry) for this long
+        'poll_interval_seconds': 5,  # background poll of each subscribed underlying for oi_update pushes
+        'hedge_after_ms': 1500,  # start the fallback when the primary is slower than this
+        'timeout_seconds': 15,
         'enabled': True
+    },
+    'circuit_breaker': {
+        'failure_threshold': 3,  # consecutive failures before a provider is skipped
+        'cooldown_seconds': 30  # then one trial request is let through
     }
 }
 
+# Startup phase: providers are initialized concurrently, then these caches are warmed
+WARMUP_CONFIG = {
+    'watchlist': ['NIFTY', 'BANKNIFTY', 'FINNIFTY'],
+    'candle_intervals': ['1', '5', '15'],  # intraday intervals all come from one 1-minute seed per symbol
+    'n_bars': 100,
+    'option_chains': True,
+    'init_timeout_seconds': 30,
+    'concurrency': 4
+}
+
+# Multi-symbol endpoints (/api/market/candles/batch, /api/market/quotes)
+BATCH_CONFIG = {
+    'max_symbols': 100,  # per request
+    'concurrency': 25  # cache misses fetched at once per request (a 50-symbol watchlist in two rounds)
+}
+
+# Footprint / volume-profile aggregation
+FOOTPRINT_CONFIG = {
+    'price_step': 5.0,  # price bucket size for symbols not listed below
+    'price_steps': {'BANKNIFTY': 10.0},
+    'max_bars': 750,  # 1-minute footprint bars kept per symbol (about two sessions)
+    'value_area': 0.7
+}
+
+# Market structure: order blocks and liquidity levels from closed 1-minute bars
+STRUCTURE_CONFIG = {
+    'swing_length': 2,  # bars on each side of a fractal swing high / low
+    'max_order_blocks': 5,  # newest unmitigated blocks kept per side
+    'history_minutes': 750  # 1-minute history seeded on first request (covers the previous session)
+}
+
+# Market-data tapes: record upstream bars and option chains, or replay a recorded session
+# instead of the live providers (REPLAY_SPEED: 1, 10, ... or 'max' for no pacing)
+REPLAY_CONFIG = {
+    'record': os.getenv('RECORD_TAPE', 'false').lower() == 'true',
+    'record_dir': os.getenv('TAPE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'recordings')),
+    'flush_interval_seconds': 1.0,
+    'file': os.getenv('REPLAY_FILE'),
+    'speed': os.getenv('REPLAY_SPEED', '1'),
+    'loop': os.getenv('REPLAY_LOOP', 'false').lower() == 'true'
+}
+
+# Instrumentation: Prometheus text at /api/metrics, sampling profiler via /api/profiler
+METRICS_CONFIG = {
+    'namespace': 'dashboard',
+    'profiler_interval_ms': 5  # default sampling period while the profiler runs
+}
+
+# Option Greeks (Black-Scholes IV, computed per chain snapshot)
+GREEKS_CONFIG = {
+    'risk_free_rate': 0.065,  # annualized, continuously compounded
+    'expiry_time': (15, 30),  # IST; options stop trading at the close on expiry day
+    'iv_tolerance': 1e-4,  # Newton stops once model and market premium agree this closely
+    'max_iterations': 50,
+    'cache_size': 64,  # (spot, chain version) results kept per underlying
+    'push_interval_seconds': 1.0  # greeks_update at most this often while only spot moves
+}
+
+# Bars and ticks persisted to SQLite (write-behind, see sqlite_db.TimeSeriesWriter)
+TIMESERIES_CONFIG = {
+    'flush_interval_seconds': 1.0,
+    'max_pending': 20000,  # buffered rows that trigger an early flush
+    'max_retained': 200000,  # rows kept for retry while writes fail; oldest ticks go first
+    'tick_retention_days': 7,  # older ticks are deleted; bars are kept
+    'prune_interval_seconds': 3600
+}
+
 # Paper Trading Configuration
 PAPER_TRADING_CONFIG = {
     'enabled': True,
     'initial_balance': 1000000,  # 10 Lakhs
-    'max_position_size': 100000,  # 1 Lakh
-    'trading_enabled': True
+    'max_position_size': 100000,  # 1 Lakh, notional per symbol
+    'trading_enabled': True,
+    'flush_interval_seconds': 1.0  # write-behind of orders / positions to SQLite
 }
 
 # WebSocket Configuration
 WS_CONFIG = {
     'ping_interval': 20,
     'ping_timeout': 10,
-    'reconnect_delay': 5
+    'reconnect_delay': 5,
+    'send_queue_size': 256,  # per-client outbound frames before the slow-consumer policy kicks in
+    'slow_consumer_policy': 'drop_oldest',  # 'drop_oldest' | 'disconnect'
+    'conflation_flush_ms': 20,  # how often held ticks of rate-limited clients are checked
+    'max_update_rate': 60,  # upper bound for a client's requested per-symbol updates/second
+    # Recent messages kept per symbol for reconnecting clients (last_seq). Each tick journals a
+    # live_tick and usually a footprint_update, so this covers about 512 ticks.
+    'replay_buffer_size': 1024,
+    'snapshot_bars': 100  # candles in the snapshot sent on subscribe
+}
+
+# Feed bus between uvicorn workers: 'local' keeps everything in-process;
+# 'unix' elects one feed process (flock on lock_path) that owns the upstream
+# streams and relays bars to the other workers over socket_path.
+FEED_BUS_CONFIG = {
+    'bus': os.environ.get('FEED_BUS', 'local'),
+    'socket_path': os.environ.get('FEED_BUS_SOCKET', '/tmp/app_vscode_feed.sock'),
+    'lock_path': os.environ.get('FEED_BUS_LOCK', '/tmp/app_vscode_feed.lock'),
+    'retry_seconds': 1.0
 }
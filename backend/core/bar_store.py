@@ -0,0 +1,146 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple, Union
+
+from core.resampler import BarSeries, SymbolBars, base_minutes_needed, is_intraday
+
+logger = logging.getLogger(__name__)
+
+CandleFetcher = Callable[[str, str, int], Awaitable[Optional[List[dict]]]]
+
+
+class BarStore:
+    """
+    Per-symbol in-memory candle store.
+
+    Intraday intervals are all derived from one 1-minute base series per
+    symbol (core.resampler), so switching timeframe is served locally. Daily
+    bars, requests needing more than `max_base_bars` minutes of history, and
+    requests deeper than the 1-minute history upstream returned are seeded
+    at their own interval instead. `seeded_bars` counts the bars actually
+    received, so a short answer is never mistaken for full depth. Each seed
+    happens once;
+    concurrent misses for the same key wait on a single fetch. After that
+    every series is kept current from the 1-minute bar snapshots DataEngine
+    receives, so repeat requests never leave the process.
+    """
+
+    def __init__(self, max_bars: int = 5000, max_base_bars: int = 20000):
+        self.max_bars = max_bars
+        self.max_base_bars = max_base_bars
+        self.symbols: Dict[str, SymbolBars] = {}
+        self.direct: Dict[str, Dict[str, BarSeries]] = {}
+        self.locks: Dict[Tuple[str, str], asyncio.Lock] = {}
+        # symbol -> (minute bar time, cumulative minute volume) of the last tick
+        self.last_minute: Dict[str, Tuple[int, int]] = {}
+        self.last_close: Dict[str, float] = {}
+
+    def _derived(self, interval: str, n_bars: int) -> bool:
+        return is_intraday(interval) and base_minutes_needed(interval, n_bars) <= self.max_base_bars
+
+    @staticmethod
+    def _render(series: BarSeries, n_bars: int, columnar: bool) -> Union[List[dict], Dict[str, list]]:
+        return series.columns(n_bars) if columnar else series.candles(n_bars)
+
+    def peek(self, symbol: str, interval: str, n_bars: int, columnar: bool = False):
+        symbol = symbol.upper()
+        if self._derived(interval, n_bars):
+            bars = self.symbols.get(symbol)
+            if bars is not None and bars.base.seeded_bars >= base_minutes_needed(interval, n_bars):
+                return self._render(bars.timeframe(interval), n_bars, columnar)
+        series = self.direct.get(symbol, {}).get(interval)
+        if series is None or series.seeded_bars < n_bars:
+            return None
+        return self._render(series, n_bars, columnar)
+
+    async def get_candles(self, symbol: str, interval: str, n_bars: int, fetch: CandleFetcher,
+                          columnar: bool = False) -> Optional[Union[List[dict], Dict[str, list]]]:
+        """Candles as a list of rows, or as {"time": [...], ...} columns when columnar is set."""
+        candles = self.peek(symbol, interval, n_bars, columnar)
+        if candles is not None:
+            return candles
+
+        symbol = symbol.upper()
+        derived = self._derived(interval, n_bars)
+        lock = self.locks.setdefault((symbol, '1' if derived else interval), asyncio.Lock())
+        async with lock:
+            candles = self.peek(symbol, interval, n_bars, columnar)
+            if candles is not None:
+                return candles
+
+            bars = self.symbols.get(symbol) if derived else None
+            if derived:
+                minutes = base_minutes_needed(interval, n_bars)
+                fetched = await fetch(symbol, '1', minutes)
+                if fetched:
+                    base = BarSeries.from_candles('1', fetched, session_aligned=True)
+                    if bars is None or base.seeded_bars > bars.base.seeded_bars:
+                        # A deeper base replaces the old one; derived timeframes are rebuilt lazily.
+                        bars = self.symbols[symbol] = SymbolBars(base)
+                        logger.info(f"Seeded 1-minute base for {symbol} with {len(base)} candles")
+                if interval == '1' or (bars is not None and bars.base.seeded_bars >= minutes):
+                    return self._render(bars.timeframe(interval), n_bars, columnar) if bars else None
+                logger.info(f"1-minute history for {symbol} cannot cover {n_bars} x {interval}; "
+                            f"fetching {interval} directly")
+
+            fetched = await fetch(symbol, interval, n_bars)
+            if not fetched:
+                # Short but still the deepest history there is
+                return self._render(bars.timeframe(interval), n_bars, columnar) if bars else None
+            series = BarSeries.from_candles(interval, fetched)
+            self.direct.setdefault(symbol, {})[interval] = series
+            logger.info(f"Seeded bar store for {symbol} {interval} with {len(series)} candles")
+            return self._render(series, n_bars, columnar)
+
+    def apply_tick(self, symbol: str, bar_time: int, open_: float, high: float, low: float, close: float, volume: int):
+        """Fold a 1-minute bar snapshot (cumulative minute volume) into every timeframe held for symbol."""
+        symbol = symbol.upper()
+        prev = self.last_minute.get(symbol)
+        if prev is None:
+            # First snapshot: the seeded history already counts this minute's volume.
+            volume_delta = None
+        elif prev[0] == bar_time:
+            volume_delta = max(volume - prev[1], 0)
+        else:
+            volume_delta = volume
+        self.last_minute[symbol] = (bar_time, volume)
+        self.last_close[symbol] = close
+
+        bars = self.symbols.get(symbol)
+        if bars is not None:
+            bars.apply(bar_time, open_, high, low, close, volume, volume_delta)
+            if len(bars.base) > self.max_base_bars + 256:
+                bars.trim(self.max_bars, self.max_base_bars)
+        for series in self.direct.get(symbol, {}).values():
+            series.apply(bar_time, open_, high, low, close, volume, volume_delta)
+            if len(series) > self.max_bars + 256:
+                series.trim(self.max_bars)
+
+    def base_series(self, symbol: str) -> Optional[BarSeries]:
+        """The symbol's 1-minute base series, if one has been seeded."""
+        bars = self.symbols.get(symbol.upper())
+        return bars.base if bars is not None else None
+
+    def last_price(self, symbol: str) -> Optional[float]:
+        symbol = symbol.upper()
+        if symbol in self.last_close:
+            return self.last_close[symbol]
+        bars = self.symbols.get(symbol)
+        if bars is not None and len(bars.base):
+            return bars.base.last_close()
+        for series in self.direct.get(symbol, {}).values():
+            if len(series):
+                return series.last_close()
+        return None
+
+    def invalidate(self, symbol: str, interval: Optional[str] = None):
+        symbol = symbol.upper()
+        if interval is None or is_intraday(interval):
+            self.symbols.pop(symbol, None)
+        if interval is None:
+            self.direct.pop(symbol, None)
+        else:
+            self.direct.get(symbol, {}).pop(interval, None)
+
+
+bar_store = BarStore()
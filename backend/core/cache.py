@@ -0,0 +1,67 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+
+class TTLCache:
+    """
+    Async TTL cache with request coalescing.
+
+    Concurrent `get_or_load` misses for the same key share one in-flight
+    loader call. Falsy results are returned but not cached, so an upstream
+    hiccup is retried on the next request instead of being pinned for a TTL.
+    """
+
+    def __init__(self, ttl: float, max_entries: int = 1024):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.entries: Dict[Hashable, Tuple[float, Any]] = {}
+        self.inflight: Dict[Hashable, asyncio.Task] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] < time.monotonic():
+            del self.entries[key]
+            return None
+        return entry[1]
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        if len(self.entries) >= self.max_entries and key not in self.entries:
+            self._evict()
+        self.entries[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+
+    def _evict(self):
+        now = time.monotonic()
+        for key in [k for k, (expires, _) in self.entries.items() if expires < now]:
+            del self.entries[key]
+        if len(self.entries) >= self.max_entries:
+            # Oldest insertion first; dicts keep insertion order.
+            del self.entries[next(iter(self.entries))]
+
+    async def get_or_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]],
+                          ttl: Optional[float] = None) -> Any:
+        value = self.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        self.misses += 1
+        task = self.inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._load(key, loader, ttl))
+            self.inflight[key] = task
+        # Shielded so one cancelled waiter does not cancel the shared fetch.
+        return await asyncio.shield(task)
+
+    async def _load(self, key: Hashable, loader: Callable[[], Awaitable[Any]], ttl: Optional[float]) -> Any:
+        try:
+            value = await loader()
+            if value:
+                self.set(key, value, ttl)
+            return value
+        finally:
+            self.inflight.pop(key, None)
@@ -0,0 +1,97 @@
+import operator
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+CANDLE_FIELDS = ('time', 'open', 'high', 'low', 'close', 'volume')
+_ohlcv = operator.itemgetter('open', 'high', 'low', 'close', 'volume')
+
+# Columnar candles: one array per CANDLE_FIELDS entry, time as int64 epoch seconds.
+CandleColumns = Dict[str, np.ndarray]
+
+
+def epoch_seconds(values: Sequence[Any]) -> np.ndarray:
+    """Epoch seconds for a column of numeric or ISO-8601 timestamps; unparseable entries become -1."""
+    try:
+        return np.asarray(values, dtype=np.float64).astype(np.int64)
+    except (TypeError, ValueError):
+        pass
+    try:
+        # UTC ("Z") or offset-free ISO strings parse natively in NumPy, several times faster than pandas.
+        stripped = [v[:-1] if v[-1:] == 'Z' else v for v in values]
+        if not any(len(v) > 19 and v[-6] in '+-' for v in stripped):
+            return np.array(stripped, dtype='datetime64[s]').astype(np.int64)
+    except (TypeError, ValueError):
+        pass
+    parsed = pd.to_datetime(pd.Series(values, dtype=object), utc=True, format='ISO8601', errors='coerce')
+    seconds = parsed.dt.as_unit('s').astype('int64').to_numpy()
+    seconds[parsed.isna().to_numpy()] = -1
+    return seconds
+
+
+def _valid(cols: CandleColumns) -> CandleColumns:
+    keep = cols['time'] >= 0
+    if keep.all():
+        return cols
+    return {name: column[keep] for name, column in cols.items()}
+
+
+def columns_from_rows(rows: List[dict]) -> CandleColumns:
+    """Columns from upstream OHLC rows ({'timestamp' | 'datetime', 'open', ..., 'volume'})."""
+    if not rows:
+        return empty_columns()
+    times = epoch_seconds([row.get('timestamp') or row.get('datetime') for row in rows])
+    try:
+        values = np.array(list(map(_ohlcv, rows)), dtype=np.float64)
+    except (KeyError, TypeError, ValueError):
+        values = np.array([(row['open'], row['high'], row['low'], row['close'], row.get('volume') or 0)
+                           for row in rows], dtype=np.float64)
+    values = np.nan_to_num(values.reshape(len(rows), 5))
+    return _valid({
+        'time': times,
+        'open': values[:, 0],
+        'high': values[:, 1],
+        'low': values[:, 2],
+        'close': values[:, 3],
+        'volume': values[:, 4].astype(np.int64)
+    })
+
+
+def columns_from_frame(df: pd.DataFrame) -> CandleColumns:
+    """Columns from a DatetimeIndex-ed OHLCV frame (tvDatafeed); naive times are taken as UTC."""
+    index = pd.DatetimeIndex(df.index)
+    volume = df['volume'] if 'volume' in df else pd.Series(0, index=df.index)
+    return {
+        'time': index.as_unit('s').asi8.astype(np.int64),
+        'open': df['open'].to_numpy(dtype=np.float64),
+        'high': df['high'].to_numpy(dtype=np.float64),
+        'low': df['low'].to_numpy(dtype=np.float64),
+        'close': df['close'].to_numpy(dtype=np.float64),
+        'volume': volume.fillna(0).to_numpy(dtype=np.float64).astype(np.int64)
+    }
+
+
+def empty_columns() -> CandleColumns:
+    return {name: np.zeros(0, dtype=np.int64 if name in ('time', 'volume') else np.float64)
+            for name in CANDLE_FIELDS}
+
+
+def columns_to_lists(cols: CandleColumns, n_bars: Optional[int] = None) -> Dict[str, list]:
+    """JSON-ready columnar shape: {"time": [...], "open": [...], ...} (the last n_bars if given)."""
+    start = 0 if n_bars is None else max(len(cols['time']) - n_bars, 0)
+    return {name: cols[name][start:].tolist() for name in CANDLE_FIELDS}
+
+
+def rows_from_columns(cols: CandleColumns) -> List[dict]:
+    """The row-per-candle shape the rest of the backend and the default API response use."""
+    lists = columns_to_lists(cols)
+    return [
+        {"time": t, "open": o, "high": h, "low": l, "close": c, "volume": v}
+        for t, o, h, l, c, v in zip(*(lists[name] for name in CANDLE_FIELDS))
+    ]
+
+
+def rows_to_lists(rows: List[dict]) -> Dict[str, list]:
+    """Columnar shape for candles that are already rows (mock data, SQLite)."""
+    return {name: [row[name] for row in rows] for name in CANDLE_FIELDS}
@@ -0,0 +1,481 @@
+import asyncio
+import json
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple, Union
+
+try:
+    import msgpack
+except ImportError:  # optional: the msgpack encoding is offered only when installed
+    msgpack = None
+
+from core.journal import TICK, MessageJournal
+
+logger = logging.getLogger(__name__)
+
+DROP_OLDEST = 'drop_oldest'
+DISCONNECT = 'disconnect'
+
+# Wire encodings a client can pick with /ws?encoding=...
+JSON = 'json'
+COMPACT = 'compact'
+MSGPACK = 'msgpack'
+
+# Compact live_tick frames (arrays, JSON text or msgpack binary):
+#   keyframe: [1, symbol_id, ts_ms, symbol, *TICK_FIELDS, seq]
+#   delta:    [2, symbol_id, ts_ms, changed_mask, *changed values in TICK_FIELDS order, seq]
+# Bit i of changed_mask is set when TICK_FIELDS[i] differs from the previous frame.
+# seq is the symbol's journal sequence number (absent on unjournaled mock ticks).
+TICK_FIELDS = ('ltp', 'open', 'high', 'low', 'volume', 'change', 'change_percent')
+KEYFRAME = 1
+DELTA = 2
+
+Payload = Union[str, bytes]
+
+
+def available_encodings() -> List[str]:
+    return [JSON, COMPACT] + ([MSGPACK] if msgpack is not None else [])
+
+
+def negotiate_encoding(requested: Optional[str]) -> str:
+    requested = (requested or JSON).lower()
+    return requested if requested in available_encodings() else JSON
+
+
+def encode_message(message: Any, encoding: str = JSON) -> Payload:
+    if encoding == MSGPACK:
+        return msgpack.packb(message, use_bin_type=True)
+    return json.dumps(message, separators=(',', ':'))
+
+
+def tick_values(ltp: float, open_: Optional[float] = None, high: Optional[float] = None,
+                low: Optional[float] = None, volume: Optional[int] = None,
+                change: Optional[float] = None, change_percent: Optional[float] = None) -> Tuple:
+    """Positional live_tick fields in TICK_FIELDS order (None = not provided)."""
+    return (ltp, open_, high, low, volume, change, change_percent)
+
+
+def tick_message(symbol: str, ts_ms: int, values: Tuple, seq: Optional[int] = None) -> Dict[str, Any]:
+    """The verbose JSON live_tick for clients on the default encoding."""
+    message = {"type": "live_tick", "symbol": symbol}
+    for name, value in zip(TICK_FIELDS, values):
+        if value is not None:
+            message[name] = value
+    message["timestamp"] = datetime.fromtimestamp(ts_ms / 1000, timezone.utc).isoformat()
+    if seq is not None:
+        message["seq"] = seq
+    return message
+
+
+def tick_keyframe(symbol_id: int, symbol: str, ts_ms: int, values: Tuple, seq: Optional[int] = None) -> list:
+    frame = [KEYFRAME, symbol_id, ts_ms, symbol, *values]
+    if seq is not None:
+        frame.append(seq)
+    return frame
+
+
+def tick_delta(symbol_id: int, ts_ms: int, values: Tuple, prev: Tuple, seq: Optional[int] = None) -> list:
+    """[DELTA, id, ts_ms, mask, *changed values, seq]; seq follows the popcount(mask) values."""
+    frame = [DELTA, symbol_id, ts_ms, 0]
+    mask = 0
+    for i, value in enumerate(values):
+        if value != prev[i]:
+            mask |= 1 << i
+            frame.append(value)
+    frame[3] = mask
+    if seq is not None:
+        frame.append(seq)
+    return frame
+
+
+class ClientChannel:
+    """One websocket plus its bounded send queue and the writer task draining it."""
+
+    __slots__ = ('websocket', 'queue', 'symbols', 'sender', 'dropped', 'closed', 'encoding', 'stale',
+                 'min_interval', 'last_sent', 'pending', 'sent')
+
+    def __init__(self, websocket, max_queue: int, encoding: str = JSON):
+        self.websocket = websocket
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self.symbols: Set[str] = set()
+        self.sender = None
+        self.dropped = 0
+        self.closed = False
+        self.encoding = encoding
+        # Symbols whose next compact tick must be a keyframe (new subscription or a dropped frame)
+        self.stale: Set[str] = set()
+        # Conflation state for rate-limited symbols: seconds between ticks, loop time of
+        # the last tick sent, the latest unsent (ts_ms, values, seq) and the last values sent
+        self.min_interval: Dict[str, float] = {}
+        self.last_sent: Dict[str, float] = {}
+        self.pending: Dict[str, Tuple[int, Tuple, int]] = {}
+        self.sent: Dict[str, Tuple] = {}
+
+    def forget(self, symbols: Iterable[str]):
+        for symbol in symbols:
+            self.stale.discard(symbol)
+            self.min_interval.pop(symbol, None)
+            self.last_sent.pop(symbol, None)
+            self.pending.pop(symbol, None)
+            self.sent.pop(symbol, None)
+
+    async def run_sender(self):
+        try:
+            while True:
+                payload = await self.queue.get()
+                if isinstance(payload, bytes):
+                    await self.websocket.send_bytes(payload)
+                else:
+                    await self.websocket.send_text(payload)
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logger.debug(f"Send failed, closing channel: {e}")
+        finally:
+            self.closed = True
+
+
+class FanoutHub:
+    """
+    Symbol -> subscriber index with one shared encode per message.
+
+    `publish` serializes a message once and enqueues the same string on every
+    subscriber's bounded queue without awaiting, so a slow socket only ever
+    delays itself. When a queue is full the slow-consumer policy applies:
+    `drop_oldest` discards the oldest queued frame, `disconnect` closes the
+    socket.
+
+    Each client picks a wire encoding when it registers. `publish_tick`
+    sends JSON clients the verbose live_tick and compact/msgpack clients
+    positional frames keyed by an interned symbol id that carry only the
+    fields changed since the symbol's previous tick; a client gets a full
+    keyframe after subscribing, and one per symbol is queued as soon as a
+    frame is dropped from its queue. Every payload is still encoded at most
+    once per (encoding, frame kind).
+
+    A client may cap the tick rate per symbol when subscribing. Ticks that
+    arrive sooner than the cap allows replace the client's pending value for
+    that symbol, and a flush loop running every `flush_interval` seconds
+    sends whatever is due, so the last value always goes out and per-client
+    state stays at one tick per symbol.
+
+    Everything published for a symbol is numbered and kept in a
+    MessageJournal ring, so a reconnecting client can `resume` from the last
+    seq it saw instead of reloading.
+    """
+
+    def __init__(self, max_queue: int = 256, slow_consumer_policy: str = DROP_OLDEST,
+                 flush_interval: float = 0.02, journal_size: int = 1024):
+        if slow_consumer_policy not in (DROP_OLDEST, DISCONNECT):
+            raise ValueError(f"Unknown slow consumer policy: {slow_consumer_policy}")
+        self.max_queue = max_queue
+        self.slow_consumer_policy = slow_consumer_policy
+        self.channels: Dict[Any, ClientChannel] = {}
+        self.subscribers: Dict[str, Set[ClientChannel]] = {}
+        self.symbol_ids: Dict[str, int] = {}
+        self.last_ticks: Dict[str, Tuple] = {}
+        self.flush_interval = flush_interval
+        self.conflating: Set[ClientChannel] = set()
+        self.flusher: Optional[asyncio.Task] = None
+        self.journal = MessageJournal(journal_size)
+        # Frames dropped for clients that have since disconnected
+        self.dropped_closed = 0
+
+    def register(self, websocket, encoding: str = JSON) -> ClientChannel:
+        channel = ClientChannel(websocket, self.max_queue, encoding)
+        channel.sender = asyncio.create_task(channel.run_sender())
+        self.channels[websocket] = channel
+        return channel
+
+    def unregister(self, websocket) -> Set[str]:
+        channel = self.channels.pop(websocket, None)
+        if channel is None:
+            return set()
+        symbols = set(channel.symbols)
+        self.dropped_closed += channel.dropped
+        self._unindex(channel, symbols)
+        channel.symbols.clear()
+        self.conflating.discard(channel)
+        channel.closed = True
+        if channel.sender:
+            channel.sender.cancel()
+        return symbols
+
+    def set_subscriptions(self, websocket, symbols: Iterable[str],
+                          rates: Optional[Dict[str, float]] = None) -> Tuple[Set[str], Set[str]]:
+        """
+        Replace a client's symbol list; returns (added, removed).
+
+        rates maps symbol -> max live_tick updates per second; symbols without
+        a positive rate get every tick.
+        """
+        channel = self.channels.get(websocket)
+        if channel is None:
+            return set(), set()
+        wanted = set(symbols)
+        added = wanted - channel.symbols
+        removed = channel.symbols - wanted
+        self._unindex(channel, removed)
+        channel.forget(removed)
+        for symbol in added:
+            self.subscribers.setdefault(symbol, set()).add(channel)
+        channel.symbols = wanted
+        channel.stale |= added
+        rates = rates or {}
+        for symbol in wanted:
+            rate = rates.get(symbol)
+            if rate and rate > 0:
+                channel.min_interval[symbol] = 1.0 / rate
+            elif channel.min_interval.pop(symbol, None) is not None:
+                channel.last_sent.pop(symbol, None)
+                channel.sent.pop(symbol, None)
+                # Ticks now go out unthrottled; hand over the held value as a keyframe.
+                held = channel.pending.pop(symbol, None)
+                channel.stale.add(symbol)
+                if held is not None:
+                    self._offer(channel, self._conflated_payload(channel, symbol, *held))
+        return added, removed
+
+    def _unindex(self, channel: ClientChannel, symbols: Iterable[str]):
+        for symbol in symbols:
+            subscribers = self.subscribers.get(symbol)
+            if subscribers is None:
+                continue
+            subscribers.discard(channel)
+            if not subscribers:
+                del self.subscribers[symbol]
+
+    def subscriptions(self, websocket) -> List[str]:
+        channel = self.channels.get(websocket)
+        return sorted(channel.symbols) if channel else []
+
+    def encoding(self, websocket) -> Optional[str]:
+        channel = self.channels.get(websocket)
+        return channel.encoding if channel else None
+
+    def symbol_id(self, symbol: str) -> int:
+        symbol_id = self.symbol_ids.get(symbol)
+        if symbol_id is None:
+            symbol_id = self.symbol_ids[symbol] = len(self.symbol_ids) + 1
+        return symbol_id
+
+    def queue_stats(self) -> Dict[str, Any]:
+        depths = [channel.queue.qsize() for channel in self.channels.values()]
+        return {
+            "connections": len(depths),
+            "queued": sum(depths),
+            "max_depth": max(depths, default=0),
+            "max_queue": self.max_queue,
+            "dropped": self.dropped_closed + sum(channel.dropped for channel in self.channels.values()),
+            "conflating": len(self.conflating)
+        }
+
+    def subscriber_count(self, symbol: str) -> int:
+        return len(self.subscribers.get(symbol, ()))
+
+    def _offer(self, channel: ClientChannel, payload: Payload):
+        if channel.closed:
+            return
+        try:
+            channel.queue.put_nowait(payload)
+            return
+        except asyncio.QueueFull:
+            pass
+
+        channel.dropped += 1
+        if self.slow_consumer_policy == DROP_OLDEST:
+            channel.queue.get_nowait()
+            channel.queue.put_nowait(payload)
+            if channel.encoding != JSON:
+                # The dropped frame may have been a delta that later ones build on
+                self._resync(channel)
+        else:
+            logger.warning(f"Disconnecting slow consumer after {self.max_queue} queued messages")
+            channel.closed = True
+            if channel.sender:
+                channel.sender.cancel()
+            asyncio.create_task(self._close(channel.websocket))
+
+    def _resync(self, channel: ClientChannel):
+        """Queue a keyframe of every symbol a compact client follows, right behind what it has queued."""
+        if len(channel.symbols) >= self.max_queue:
+            channel.stale |= channel.symbols
+            return
+        for symbol in channel.symbols:
+            tick = self.journal.last_tick(symbol)
+            if tick is None:
+                channel.stale.add(symbol)
+                continue
+            seq, ts_ms, values = tick
+            if symbol in channel.min_interval:
+                # Rate-limited: the flush loop sends it as a keyframe once the cap allows
+                channel.stale.add(symbol)
+                self._hold(channel, symbol, ts_ms, values, seq)
+                continue
+            channel.stale.discard(symbol)
+            frame = tick_keyframe(self.symbol_id(symbol), symbol, ts_ms, values, seq)
+            payload = encode_message(frame, channel.encoding)
+            # Make room without recursing; the symbols keyframed here cover anything dropped
+            while channel.queue.full():
+                channel.queue.get_nowait()
+                channel.dropped += 1
+            channel.queue.put_nowait(payload)
+
+    @staticmethod
+    async def _close(websocket):
+        try:
+            await websocket.close(code=1013)
+        except Exception:
+            pass
+
+    def send(self, websocket, message: Dict[str, Any]):
+        channel = self.channels.get(websocket)
+        if channel is not None:
+            self._offer(channel, encode_message(message, channel.encoding))
+
+    def publish(self, symbol: str, message: Dict[str, Any]) -> int:
+        self.journal.record_message(symbol, message)
+        subscribers = self.subscribers.get(symbol)
+        if not subscribers:
+            return 0
+        self._offer_all(subscribers, message)
+        return len(subscribers)
+
+    def broadcast(self, message: Dict[str, Any]):
+        self._offer_all(self.channels.values(), message)
+
+    def send_many(self, websockets: Iterable, message: Dict[str, Any]):
+        channels = self.channels
+        self._offer_all([channels[ws] for ws in websockets if ws in channels], message)
+
+    def _offer_all(self, channels: Iterable[ClientChannel], message: Dict[str, Any]):
+        payloads: Dict[str, Payload] = {}
+        for channel in channels:
+            payload = payloads.get(channel.encoding)
+            if payload is None:
+                payload = payloads[channel.encoding] = encode_message(message, channel.encoding)
+            self._offer(channel, payload)
+
+    def send_tick(self, websocket, symbol: str, ts_ms: int, values: Tuple):
+        """A live_tick for one client only; compact encodings always get a keyframe."""
+        channel = self.channels.get(websocket)
+        if channel is None:
+            return
+        if channel.encoding == JSON:
+            self._offer(channel, encode_message(tick_message(symbol, ts_ms, values)))
+        else:
+            frame = tick_keyframe(self.symbol_id(symbol), symbol, ts_ms, values)
+            self._offer(channel, encode_message(frame, channel.encoding))
+
+    def publish_tick(self, symbol: str, ts_ms: int, values: Tuple) -> int:
+        """Fan a live_tick out to symbol's subscribers in each client's encoding."""
+        prev = self.last_ticks.get(symbol)
+        self.last_ticks[symbol] = values
+        seq = self.journal.record_tick(symbol, ts_ms, values)
+        subscribers = self.subscribers.get(symbol)
+        if not subscribers:
+            return 0
+        payloads: Dict[Tuple[str, int], Payload] = {}
+        now = None
+        for channel in subscribers:
+            if symbol in channel.min_interval:
+                if now is None:
+                    now = asyncio.get_running_loop().time()
+                self._conflate(channel, symbol, ts_ms, values, seq, now)
+                continue
+            encoding = channel.encoding
+            if encoding == JSON:
+                kind = 0
+            elif prev is None or symbol in channel.stale:
+                kind = KEYFRAME
+                channel.stale.discard(symbol)
+            else:
+                kind = DELTA
+            payload = payloads.get((encoding, kind))
+            if payload is None:
+                if kind == 0:
+                    frame = tick_message(symbol, ts_ms, values, seq)
+                elif kind == KEYFRAME:
+                    frame = tick_keyframe(self.symbol_id(symbol), symbol, ts_ms, values, seq)
+                else:
+                    frame = tick_delta(self.symbol_id(symbol), ts_ms, values, prev, seq)
+                payload = payloads[(encoding, kind)] = encode_message(frame, encoding)
+            self._offer(channel, payload)
+        return len(subscribers)
+
+    def _conflated_payload(self, channel: ClientChannel, symbol: str, ts_ms: int, values: Tuple,
+                           seq: Optional[int] = None) -> Payload:
+        # Rate-limited clients skip ticks, so compact deltas are taken against what this client last got.
+        if channel.encoding == JSON:
+            return encode_message(tick_message(symbol, ts_ms, values, seq))
+        prev = channel.sent.get(symbol)
+        channel.sent[symbol] = values
+        if prev is None or symbol in channel.stale:
+            channel.stale.discard(symbol)
+            frame = tick_keyframe(self.symbol_id(symbol), symbol, ts_ms, values, seq)
+        else:
+            frame = tick_delta(self.symbol_id(symbol), ts_ms, values, prev, seq)
+        return encode_message(frame, channel.encoding)
+
+    def _conflate(self, channel: ClientChannel, symbol: str, ts_ms: int, values: Tuple, seq: int, now: float):
+        if now - channel.last_sent.get(symbol, 0.0) >= channel.min_interval[symbol]:
+            channel.last_sent[symbol] = now
+            channel.pending.pop(symbol, None)
+            self._offer(channel, self._conflated_payload(channel, symbol, ts_ms, values, seq))
+            return
+        self._hold(channel, symbol, ts_ms, values, seq)
+
+    def _hold(self, channel: ClientChannel, symbol: str, ts_ms: int, values: Tuple, seq: int):
+        channel.pending[symbol] = (ts_ms, values, seq)
+        self.conflating.add(channel)
+        if self.flusher is None:
+            self.flusher = asyncio.create_task(self._run_flusher())
+
+    async def _run_flusher(self):
+        try:
+            while self.conflating:
+                await asyncio.sleep(self.flush_interval)
+                self.flush_conflated(asyncio.get_running_loop().time())
+        finally:
+            self.flusher = None
+
+    def flush_conflated(self, now: float):
+        """Send every held tick whose client's rate limit has elapsed."""
+        for channel in list(self.conflating):
+            if channel.closed:
+                self.conflating.discard(channel)
+                continue
+            for symbol, (ts_ms, values, seq) in list(channel.pending.items()):
+                if now - channel.last_sent.get(symbol, 0.0) >= channel.min_interval.get(symbol, 0.0):
+                    del channel.pending[symbol]
+                    channel.last_sent[symbol] = now
+                    self._offer(channel, self._conflated_payload(channel, symbol, ts_ms, values, seq))
+            if not channel.pending:
+                self.conflating.discard(channel)
+
+    def resume(self, websocket, symbol: str, last_seq: int, epoch: Optional[str]) -> bool:
+        """
+        Replay what symbol published after last_seq to one client, in order.
+
+        Ticks are replayed as full frames (keyframes for compact encodings).
+        Returns False, sending nothing, when the gap is no longer covered by
+        the journal; the caller then sends a snapshot.
+        """
+        channel = self.channels.get(websocket)
+        entries = self.journal.since(symbol, last_seq, epoch)
+        if channel is None or entries is None:
+            return False
+        symbol_id = self.symbol_id(symbol)
+        for seq, item in entries:
+            if isinstance(item, tuple) and item[0] == TICK:
+                _, ts_ms, values = item
+                if channel.encoding == JSON:
+                    frame = tick_message(symbol, ts_ms, values, seq)
+                else:
+                    frame = tick_keyframe(symbol_id, symbol, ts_ms, values, seq)
+                self._offer(channel, encode_message(frame, channel.encoding))
+            else:
+                self._offer(channel, encode_message(item, channel.encoding))
+        if channel.encoding != JSON:
+            channel.stale.add(symbol)
+        return True
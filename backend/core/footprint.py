@@ -0,0 +1,202 @@
+import logging
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from config import FOOTPRINT_CONFIG
+from core.resampler import interval_to_seconds, session_bucket
+
+logger = logging.getLogger(__name__)
+
+
+class FootprintBar:
+    """
+    Buy/sell volume per price level for one base (1-minute) bar.
+
+    Levels live in two float64 arrays indexed from `base_level`
+    (price = level * step); they grow by doubling when price leaves the
+    covered range, so a tick is an index computation and two adds.
+    """
+
+    __slots__ = ('time', 'base_level', 'buy', 'sell', 'buy_total', 'sell_total')
+
+    def __init__(self, time: int, level: int, capacity: int = 32):
+        self.time = time
+        self.base_level = level - capacity // 2
+        self.buy = np.zeros(capacity, dtype=np.float64)
+        self.sell = np.zeros(capacity, dtype=np.float64)
+        self.buy_total = 0.0
+        self.sell_total = 0.0
+
+    def _index(self, level: int) -> int:
+        idx = level - self.base_level
+        size = len(self.buy)
+        if 0 <= idx < size:
+            return idx
+        grow = max(size, abs(idx) + 1 if idx < 0 else idx - size + 1)
+        if idx < 0:
+            self.buy = np.concatenate((np.zeros(grow), self.buy))
+            self.sell = np.concatenate((np.zeros(grow), self.sell))
+            self.base_level -= grow
+            return idx + grow
+        self.buy = np.concatenate((self.buy, np.zeros(grow)))
+        self.sell = np.concatenate((self.sell, np.zeros(grow)))
+        return idx
+
+    def add(self, level: int, volume: float, is_buy: bool) -> Tuple[float, float]:
+        idx = self._index(level)
+        if is_buy:
+            self.buy[idx] += volume
+            self.buy_total += volume
+        else:
+            self.sell[idx] += volume
+            self.sell_total += volume
+        return float(self.buy[idx]), float(self.sell[idx])
+
+
+def merge_bars(bars: List[FootprintBar]) -> Tuple[int, np.ndarray, np.ndarray]:
+    """Sum several bars' level arrays onto one common price grid."""
+    lo = min(b.base_level for b in bars)
+    hi = max(b.base_level + len(b.buy) for b in bars)
+    buy = np.zeros(hi - lo)
+    sell = np.zeros(hi - lo)
+    for b in bars:
+        start = b.base_level - lo
+        buy[start:start + len(b.buy)] += b.buy
+        sell[start:start + len(b.sell)] += b.sell
+    return lo, buy, sell
+
+
+def profile_stats(buy: np.ndarray, sell: np.ndarray, value_area: float = 0.7) -> Tuple[int, int, int]:
+    """(POC, value-area low, value-area high) as array indices."""
+    total = buy + sell
+    poc = int(np.argmax(total))
+    target = total.sum() * value_area
+    lo = hi = poc
+    covered = total[poc]
+    # Classic expansion: take the heavier neighbouring level until the area holds `value_area`.
+    while covered < target and (lo > 0 or hi < len(total) - 1):
+        below = total[lo - 1] if lo > 0 else -1.0
+        above = total[hi + 1] if hi < len(total) - 1 else -1.0
+        if above >= below:
+            hi += 1
+            covered += above
+        else:
+            lo -= 1
+            covered += below
+    return poc, lo, hi
+
+
+class FootprintEngine:
+    """
+    Tick-level footprint aggregation per symbol.
+
+    Each 1-minute snapshot from DataEngine contributes the volume added since
+    the previous snapshot, classified buy or sell by the tick rule (uptick ->
+    buy, downtick -> sell, unchanged -> same side as the last move) and
+    bucketed at `price_step`. Higher intervals are merged from the base bars
+    on request.
+    """
+
+    def __init__(self, price_step: float = 5.0, max_bars: int = 750, value_area: float = 0.7,
+                 price_steps: Optional[Dict[str, float]] = None):
+        self.price_step = price_step
+        self.price_steps = price_steps or {}
+        self.max_bars = max_bars
+        self.value_area = value_area
+        self.bars: Dict[str, Deque[FootprintBar]] = {}
+        # symbol -> [last price, last side (True = buy), minute bar time, cumulative minute volume]
+        self.last: Dict[str, list] = {}
+
+    def step_for(self, symbol: str) -> float:
+        return self.price_steps.get(symbol.upper(), self.price_step)
+
+    def on_tick(self, symbol: str, bar_time: int, price: float, volume: int) -> Optional[Dict[str, Any]]:
+        symbol = symbol.upper()
+        state = self.last.get(symbol)
+        if state is None:
+            # First snapshot only establishes the reference price and volume.
+            self.last[symbol] = [price, True, bar_time, volume]
+            return None
+
+        last_price, last_side, last_time, last_volume = state
+        if bar_time == last_time:
+            increment = volume - last_volume
+        elif bar_time > last_time:
+            increment = volume
+        else:
+            return None
+        is_buy = price > last_price if price != last_price else last_side
+        state[0], state[1], state[2], state[3] = price, is_buy, bar_time, volume
+        if increment <= 0:
+            return None
+
+        series = self.bars.get(symbol)
+        if series is None:
+            series = self.bars[symbol] = deque(maxlen=self.max_bars)
+        step = self.step_for(symbol)
+        level = int(round(price / step))
+        if not series or series[-1].time != bar_time:
+            series.append(FootprintBar(bar_time, level))
+        bar = series[-1]
+        buy, sell = bar.add(level, increment, is_buy)
+        return {
+            "type": "footprint_update",
+            "symbol": symbol,
+            "time": bar_time,
+            "price": round(level * step, 4),
+            "buy": buy,
+            "sell": sell,
+            "side": "buy" if is_buy else "sell",
+            "delta": bar.buy_total - bar.sell_total
+        }
+
+    def get_bars(self, symbol: str, interval: str = '1', n_bars: int = 50) -> List[Dict[str, Any]]:
+        series = self.bars.get(symbol.upper())
+        if not series:
+            return []
+        seconds = interval_to_seconds(interval)
+        groups: List[List[FootprintBar]] = []
+        bucket_times: List[int] = []
+        # Walk newest to oldest so only the requested bars are merged.
+        for bar in reversed(series):
+            bucket = session_bucket(bar.time, seconds)
+            if not bucket_times or bucket_times[-1] != bucket:
+                if len(groups) == n_bars:
+                    break
+                bucket_times.append(bucket)
+                groups.append([])
+            groups[-1].append(bar)
+
+        step = self.step_for(symbol)
+        result = []
+        for bucket, bars in zip(reversed(bucket_times), reversed(groups)):
+            lo, buy, sell = merge_bars(bars)
+            active = np.flatnonzero((buy + sell) > 0)
+            if len(active) == 0:
+                continue
+            first, last = active[0], active[-1] + 1
+            buy, sell = buy[first:last], sell[first:last]
+            poc, val, vah = profile_stats(buy, sell, self.value_area)
+            prices = (np.arange(lo + first, lo + last) * step).round(4)
+            result.append({
+                "time": bucket,
+                "prices": prices.tolist(),
+                "buy": buy.tolist(),
+                "sell": sell.tolist(),
+                "volume": float(buy.sum() + sell.sum()),
+                "delta": float(buy.sum() - sell.sum()),
+                "poc": float(prices[poc]),
+                "val": float(prices[val]),
+                "vah": float(prices[vah])
+            })
+        return result
+
+
+footprint_engine = FootprintEngine(
+    price_step=FOOTPRINT_CONFIG['price_step'],
+    price_steps=FOOTPRINT_CONFIG['price_steps'],
+    max_bars=FOOTPRINT_CONFIG['max_bars'],
+    value_area=FOOTPRINT_CONFIG['value_area']
+)
@@ -0,0 +1,335 @@
+import logging
+import math
+import re
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+from config import GREEKS_CONFIG
+from core.option_analytics import chain_arrays
+from core.option_chain import IST
+
+logger = logging.getLogger(__name__)
+
+SECONDS_PER_YEAR = 365.0 * 86400
+EXPIRY_FORMATS = ('%d-%b-%Y', '%Y-%m-%d', '%d%b%Y')
+_SQRT2 = math.sqrt(2.0)
+_INV_SQRT_2PI = 1.0 / math.sqrt(2.0 * math.pi)
+_OPTION_SYMBOL = re.compile(r'^(?P<underlying>[A-Z&-]+?)\d{2}[A-Z0-9]*?(?P<digits>\d+)(?P<right>CE|PE)$')
+
+
+def _erfc(x: np.ndarray) -> np.ndarray:
+    # Chebyshev fit (Numerical Recipes erfcc): relative error < 1.2e-7 everywhere
+    z = np.abs(x)
+    t = 1.0 / (1.0 + 0.5 * z)
+    r = t * np.exp(-z * z - 1.26551223 + t * (1.00002368 + t * (0.37409196 + t * (0.09678418 + t * (
+        -0.18628806 + t * (0.27886807 + t * (-1.13520398 + t * (1.48851587 + t * (
+            -0.82215223 + t * 0.17087277)))))))))
+    return np.where(x >= 0, r, 2.0 - r)
+
+
+def norm_cdf(x: np.ndarray) -> np.ndarray:
+    return 0.5 * _erfc(-x / _SQRT2)
+
+
+def norm_pdf(x: np.ndarray) -> np.ndarray:
+    return _INV_SQRT_2PI * np.exp(-0.5 * x * x)
+
+
+def _d1_d2(spot, strike, t, r, sigma) -> Tuple[np.ndarray, np.ndarray]:
+    vol_t = sigma * np.sqrt(t)
+    d1 = (np.log(spot / strike) + (r + 0.5 * sigma * sigma) * t) / vol_t
+    return d1, d1 - vol_t
+
+
+def bs_price(spot, strike, t, r, sigma, is_call) -> np.ndarray:
+    """Black-Scholes premium, element-wise over arrays (is_call: bool array)."""
+    d1, d2 = _d1_d2(spot, strike, t, r, sigma)
+    discounted = strike * np.exp(-r * t)
+    call = spot * norm_cdf(d1) - discounted * norm_cdf(d2)
+    # Put from parity keeps both legs on one set of d1/d2
+    return np.where(is_call, call, call - spot + discounted)
+
+
+def implied_vol(price, spot, strike, t, r, is_call, tol: float = 1e-4, max_iter: int = 50) -> np.ndarray:
+    """
+    Implied volatility for every option at once.
+
+    Newton steps on the whole batch, each element keeping a [lo, hi]
+    bracket that its step must stay inside, falling back to bisection
+    otherwise, so deep ITM/OTM strikes with vanishing vega still converge.
+    Converged elements drop out of the working set. Premiums outside the
+    no-arbitrage bounds give NaN.
+    """
+    price, strike, t, is_call = np.broadcast_arrays(np.asarray(price, dtype=np.float64),
+                                                    np.asarray(strike, dtype=np.float64),
+                                                    np.asarray(t, dtype=np.float64),
+                                                    np.asarray(is_call, dtype=bool))
+    spot = np.broadcast_to(np.asarray(spot, dtype=np.float64), price.shape)
+    discounted = strike * np.exp(-r * t)
+    intrinsic = np.where(is_call, np.maximum(spot - discounted, 0.0), np.maximum(discounted - spot, 0.0))
+    upper = np.where(is_call, spot, discounted)
+    valid = (price > intrinsic) & (price < upper) & (t > 0) & (strike > 0) & (spot > 0)
+
+    sigma = np.full(price.shape, np.nan)
+    idx = np.flatnonzero(valid)
+    # Brenner-Subrahmanyam starting point, kept to a sane range
+    s = np.clip(np.sqrt(2 * np.pi / t[idx]) * price[idx] / spot[idx], 0.05, 2.0)
+    lo = np.full(idx.shape, 1e-4)
+    hi = np.full(idx.shape, 10.0)
+    # Per-option constants, filtered alongside the working set
+    p, c, sp, tt = price[idx], is_call[idx], spot[idx], t[idx]
+    disc, sqrt_t, log_sk = discounted[idx], np.sqrt(tt), np.log(spot[idx] / strike[idx])
+    for _ in range(max_iter):
+        if not idx.size:
+            break
+        vol_t = s * sqrt_t
+        d1 = (log_sk + (r + 0.5 * s * s) * tt) / vol_t
+        call = sp * norm_cdf(d1) - disc * norm_cdf(d1 - vol_t)
+        diff = np.where(c, call, call - sp + disc) - p
+        vega = sp * norm_pdf(d1) * sqrt_t
+        # Premium rises with sigma: a positive error means sigma is an upper bound
+        above = diff > 0
+        hi = np.where(above, s, hi)
+        lo = np.where(above, lo, s)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            step = s - diff / vega
+        step = np.where(np.isfinite(step) & (step > lo) & (step < hi), step, 0.5 * (lo + hi))
+        done = (np.abs(diff) < tol) | (hi - lo < 1e-7)
+        sigma[idx[done]] = s[done]
+        keep = ~done
+        idx, s = idx[keep], step[keep]
+        lo, hi, p, c, sp, tt = lo[keep], hi[keep], p[keep], c[keep], sp[keep], tt[keep]
+        disc, sqrt_t, log_sk = disc[keep], sqrt_t[keep], log_sk[keep]
+    if idx.size:
+        sigma[idx] = s
+    return sigma
+
+
+def bs_greeks(spot, strike, t, r, sigma, is_call) -> Dict[str, np.ndarray]:
+    """Delta, gamma, theta (per calendar day) and vega (per 1 vol point); NaN where sigma is NaN."""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        d1, d2 = _d1_d2(spot, strike, t, r, sigma)
+        sqrt_t = np.sqrt(t)
+        pdf = norm_pdf(d1)
+        discounted = strike * np.exp(-r * t)
+        decay = -spot * pdf * sigma / (2 * sqrt_t)
+        return {
+            "delta": np.where(is_call, norm_cdf(d1), norm_cdf(d1) - 1.0),
+            "gamma": pdf / (spot * sigma * sqrt_t),
+            "theta": np.where(is_call, decay - r * discounted * norm_cdf(d2),
+                              decay + r * discounted * norm_cdf(-d2)) / 365.0,
+            "vega": spot * pdf * sqrt_t / 100.0
+        }
+
+
+def expiry_datetime(expiry: Any, close: Tuple[int, int] = (15, 30)) -> Optional[datetime]:
+    if not expiry:
+        return None
+    for fmt in EXPIRY_FORMATS:
+        try:
+            day = datetime.strptime(str(expiry), fmt)
+        except ValueError:
+            continue
+        return day.replace(hour=close[0], minute=close[1], tzinfo=IST)
+    return None
+
+
+def _json_column(values: np.ndarray, digits: int) -> list:
+    out = np.round(values, digits).astype(object)
+    out[~np.isfinite(values)] = None
+    return out.tolist()
+
+
+class ChainGreeks:
+    """One underlying's chain inputs, solved IVs and recent results."""
+
+    __slots__ = ('version', 'strike', 'ltp', 'is_call', 'expiry', 'expiry_ts', 'iv', 'results', 'latest',
+                 'sent', 'sent_at')
+
+    def __init__(self):
+        self.version = 0
+        self.strike = np.zeros(0)
+        self.ltp = np.zeros(0)
+        self.is_call = np.zeros(0, dtype=bool)
+        self.expiry = np.zeros(0, dtype=object)
+        self.expiry_ts = np.zeros(0)
+        self.iv = np.zeros(0)
+        self.results: 'OrderedDict[Tuple[float, int], Dict[str, Any]]' = OrderedDict()
+        # Result at the most recent spot, for position greeks
+        self.latest: Optional[Dict[str, Any]] = None
+        # Last greeks_update pushed and when (monotonic seconds)
+        self.sent: Optional[Dict[str, Any]] = None
+        self.sent_at = 0.0
+
+
+class GreeksEngine:
+    """
+    IV and Greeks for every strike of an underlying's option chain.
+
+    Each fresh chain is compared with the last one; only when strikes or
+    premiums changed does the version bump and IV get re-solved (against the
+    chain's own spot, which the premiums were quoted at). Greeks are then a
+    pure function of (spot, version): they are recomputed on every spot tick
+    from DataEngine and kept in a small per-underlying LRU, so unchanged
+    inputs are never recomputed. Only the full-chain greeks_update push is
+    throttled: it goes out on the first tick after a new chain version, and
+    otherwise at most once per `push_interval` seconds while spot moves.
+    IV is reported in percent, like NSE's chain.
+    """
+
+    def __init__(self, risk_free_rate: float = 0.065, expiry_time: Tuple[int, int] = (15, 30),
+                 tol: float = 1e-4, max_iter: int = 50, cache_size: int = 64, push_interval: float = 1.0):
+        self.r = risk_free_rate
+        self.expiry_time = tuple(expiry_time)
+        self.tol = tol
+        self.max_iter = max_iter
+        self.cache_size = cache_size
+        self.push_interval = push_interval
+        self.chains: Dict[str, ChainGreeks] = {}
+        self.solves = 0
+        self.computes = 0
+        self.hits = 0
+
+    def update_chain(self, symbol: str, chain: Dict[str, Any], spot: Optional[float] = None) -> Optional[ChainGreeks]:
+        strikes = chain.get('strikes') or []
+        spot = chain.get('spot') or spot
+        if not strikes or not spot:
+            return None
+        cols = chain_arrays(strikes)
+        expiry = np.where(cols["expiry"] == '', chain.get('expiry') or '', cols["expiry"])
+        stamps = {e: expiry_datetime(e, self.expiry_time) for e in set(expiry.tolist())}
+        expiry_ts = np.array([stamps[e].timestamp() if stamps[e] else np.nan for e in expiry.tolist()])
+        if np.isnan(expiry_ts).all():
+            return None
+
+        n = len(strikes)
+        strike = np.concatenate([cols["strike"], cols["strike"]])
+        ltp = np.concatenate([cols["ce_ltp"], cols["pe_ltp"]])
+        expiry_ts = np.concatenate([expiry_ts, expiry_ts])
+        state = self.chains.get(symbol.upper())
+        if state is not None and np.array_equal(state.strike, strike) and np.array_equal(state.ltp, ltp) \
+                and np.array_equal(state.expiry_ts, expiry_ts, equal_nan=True):
+            return state
+
+        state = state or self.chains.setdefault(symbol.upper(), ChainGreeks())
+        state.version += 1
+        state.strike, state.ltp, state.expiry_ts = strike, ltp, expiry_ts
+        state.expiry = np.concatenate([expiry, expiry])
+        state.is_call = np.r_[np.ones(n, dtype=bool), np.zeros(n, dtype=bool)]
+        started = time.perf_counter()
+        state.iv = implied_vol(ltp, float(spot), strike, self._years(expiry_ts), self.r, state.is_call,
+                               self.tol, self.max_iter)
+        state.results.clear()
+        state.latest = None
+        self.solves += 1
+        logger.debug(f"Solved IV for {symbol} ({2 * n} options) in {(time.perf_counter() - started) * 1000:.2f}ms")
+        return state
+
+    @staticmethod
+    def _years(expiry_ts: np.ndarray) -> np.ndarray:
+        return np.maximum(expiry_ts - time.time(), 60.0) / SECONDS_PER_YEAR
+
+    def compute(self, symbol: str, spot: float) -> Optional[Dict[str, Any]]:
+        state = self.chains.get(symbol.upper())
+        if state is None or not spot:
+            return None
+        key = (round(float(spot), 2), state.version)
+        result = state.results.get(key)
+        if result is not None:
+            state.results.move_to_end(key)
+            state.latest = result
+            self.hits += 1
+            return result
+
+        greeks = bs_greeks(key[0], state.strike, self._years(state.expiry_ts), self.r, state.iv, state.is_call)
+        n = len(state.strike) // 2
+        sides = {}
+        for side, part in (("ce", slice(0, n)), ("pe", slice(n, None))):
+            sides[side] = {
+                "iv": _json_column(state.iv[part] * 100, 2),
+                "delta": _json_column(greeks["delta"][part], 4),
+                "gamma": _json_column(greeks["gamma"][part], 6),
+                "theta": _json_column(greeks["theta"][part], 2),
+                "vega": _json_column(greeks["vega"][part], 2)
+            }
+        result = {
+            "spot": key[0],
+            "version": state.version,
+            "strikes": state.strike[:n].tolist(),
+            "expiries": state.expiry[:n].tolist(),
+            **sides
+        }
+        state.results[key] = result
+        state.latest = result
+        if len(state.results) > self.cache_size:
+            state.results.popitem(last=False)
+        self.computes += 1
+        return result
+
+    def attach(self, chain: Optional[Dict[str, Any]], spot: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        if chain and isinstance(chain.get('strikes'), list):
+            symbol = str(chain.get('symbol', ''))
+            if self.update_chain(symbol, chain, spot) is not None:
+                chain['greeks'] = self.compute(symbol, chain.get('spot') or spot)
+        return chain
+
+    def on_spot(self, symbol: str, spot: float) -> Optional[Dict[str, Any]]:
+        """Greeks at spot (cached); a greeks_update message when one is due, None otherwise."""
+        state = self.chains.get(symbol.upper())
+        if state is None:
+            return None
+        result = self.compute(symbol, spot)
+        if not result or result is state.sent:
+            return None
+        now = time.monotonic()
+        sent = state.sent
+        if sent is not None and sent["version"] == state.version and now - state.sent_at < self.push_interval:
+            return None
+        state.sent, state.sent_at = result, now
+        return {"type": "greeks_update", "symbol": symbol, **result}
+
+    def position_greeks(self, symbol: str, qty: int) -> Optional[Dict[str, float]]:
+        """Position delta / gamma: 1:1 for an underlying, from the chain for an option symbol (e.g. NIFTY25OCT22000CE)."""
+        symbol = symbol.upper()
+        if symbol in self.chains:
+            return {"delta": float(qty), "gamma": 0.0}
+        match = _OPTION_SYMBOL.match(symbol)
+        state = self.chains.get(match.group('underlying')) if match else None
+        if state is None or state.latest is None:
+            return None
+        result = state.latest
+        # The strike is the longest run of trailing digits that is a listed strike
+        digits = match.group('digits')
+        strikes = result["strikes"]
+        side = result["ce" if match.group('right') == 'CE' else "pe"]
+        for start in range(len(digits)):
+            strike = float(digits[start:])
+            if strike in strikes:
+                i = strikes.index(strike)
+                delta, gamma = side["delta"][i], side["gamma"][i]
+                if delta is None:
+                    return None
+                return {"delta": round(delta * qty, 4), "gamma": round(gamma * qty, 6)}
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "underlyings": {symbol: state.version for symbol, state in self.chains.items()},
+            "iv_solves": self.solves,
+            "greeks_computes": self.computes,
+            "cache_hits": self.hits
+        }
+
+
+greeks_engine = GreeksEngine(
+    risk_free_rate=GREEKS_CONFIG['risk_free_rate'],
+    expiry_time=GREEKS_CONFIG['expiry_time'],
+    tol=GREEKS_CONFIG['iv_tolerance'],
+    max_iter=GREEKS_CONFIG['max_iterations'],
+    cache_size=GREEKS_CONFIG['cache_size'],
+    push_interval=GREEKS_CONFIG['push_interval_seconds']
+)
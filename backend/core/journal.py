@@ -0,0 +1,75 @@
+import uuid
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+# A journaled tick is kept as its raw fields so replays can be encoded per client;
+# every other symbol message is kept as the dict that was published.
+TICK = 'tick'
+Entry = Tuple[int, Any]
+
+
+class MessageJournal:
+    """
+    Per-symbol sequence numbers and a bounded ring of recent messages.
+
+    Every message published for a symbol gets the next `seq` for that symbol.
+    A client that reconnects with the epoch and the last seq it saw gets
+    exactly the messages after it, as long as they are still in the ring;
+    otherwise (ring overrun, another worker or a restarted server, i.e. a
+    different epoch) it needs a fresh snapshot instead.
+    """
+
+    def __init__(self, size: int = 1024):
+        self.size = size
+        # Sequence numbers are only comparable within one process lifetime
+        self.epoch = uuid.uuid4().hex[:12]
+        self.seqs: Dict[str, int] = {}
+        self.rings: Dict[str, Deque[Entry]] = {}
+        self.ticks: Dict[str, Tuple[int, int, Tuple]] = {}
+
+    def _append(self, symbol: str, item: Any) -> int:
+        seq = self.seqs.get(symbol, 0) + 1
+        self.seqs[symbol] = seq
+        ring = self.rings.get(symbol)
+        if ring is None:
+            ring = self.rings[symbol] = deque(maxlen=self.size)
+        ring.append((seq, item))
+        return seq
+
+    def record_tick(self, symbol: str, ts_ms: int, values: Tuple) -> int:
+        seq = self._append(symbol, (TICK, ts_ms, values))
+        self.ticks[symbol] = (seq, ts_ms, values)
+        return seq
+
+    def record_message(self, symbol: str, message: Dict[str, Any]) -> int:
+        seq = message["seq"] = self._append(symbol, message)
+        return seq
+
+    def last_seq(self, symbol: str) -> int:
+        return self.seqs.get(symbol, 0)
+
+    def last_tick(self, symbol: str) -> Optional[Tuple[int, int, Tuple]]:
+        """(seq, ts_ms, values) of the latest tick."""
+        return self.ticks.get(symbol)
+
+    def since(self, symbol: str, last_seq: int, epoch: Optional[str] = None) -> Optional[List[Entry]]:
+        """Entries after last_seq, oldest first; None when they can no longer all be replayed."""
+        if epoch != self.epoch:
+            return None
+        current = self.seqs.get(symbol, 0)
+        if last_seq > current or last_seq < 0:
+            return None
+        if last_seq == current:
+            return []
+        ring = self.rings[symbol]
+        if ring[0][0] > last_seq + 1:
+            return None
+        # Seqs in the ring are contiguous, so the start index is arithmetic
+        return list(ring)[len(ring) - (current - last_seq):]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "epoch": self.epoch,
+            "ring_size": self.size,
+            "symbols": {symbol: {"seq": seq, "buffered": len(self.rings[symbol])} for symbol, seq in self.seqs.items()}
+        }
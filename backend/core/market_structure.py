@@ -0,0 +1,236 @@
+import logging
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from config import STRUCTURE_CONFIG
+
+logger = logging.getLogger(__name__)
+
+IST_OFFSET = 19800  # seconds; session days roll over at IST midnight
+
+# (time, open, high, low, close)
+Bar = Tuple[int, float, float, float, float]
+
+
+class SymbolStructure:
+    """Incremental structure state for one symbol; every field is O(1) to update per closed bar."""
+
+    __slots__ = ('forming', 'window', 'swing_high', 'swing_low', 'last_down', 'last_up', 'day',
+                 'session_high', 'session_low', 'levels', 'bullish', 'bearish', 'next_id', 'seeded_bars')
+
+    def __init__(self, swing_length: int):
+        self.forming: Optional[list] = None
+        # Closed bars around the pivot candidate: swing_length on each side
+        self.window: Deque[Bar] = deque(maxlen=2 * swing_length + 1)
+        # [price, time, broken]
+        self.swing_high: Optional[list] = None
+        self.swing_low: Optional[list] = None
+        self.last_down: Optional[Bar] = None
+        self.last_up: Optional[Bar] = None
+        self.day: Optional[int] = None
+        self.session_high: Optional[list] = None
+        self.session_low: Optional[list] = None
+        self.levels: Dict[str, Dict[str, Any]] = {}
+        self.bullish: Deque[str] = deque()
+        self.bearish: Deque[str] = deque()
+        self.next_id = 1
+        # History depth the state was rebuilt from; a deeper base reseeds
+        self.seeded_bars = 0
+
+
+class MarketStructureEngine:
+    """
+    Order blocks and liquidity levels (PDH/PDL, session high/low) per symbol.
+
+    Fed the 1-minute snapshots DataEngine already receives; a bar is processed
+    once, when the next minute starts, so the work per bar is constant however
+    long the session runs. Swing highs/lows are fractals of `swing_length`
+    bars on each side. A close through the latest unbroken swing high turns
+    the last bearish candle before it into a bullish order block (mirrored for
+    bearish ones); a close back through a block invalidates it, and only the
+    newest `max_order_blocks` per side are kept.
+
+    Changes are returned as `structure_update` messages carrying just the
+    levels added (or moved, same id) and the ids removed.
+    """
+
+    def __init__(self, swing_length: int = 2, max_order_blocks: int = 5):
+        self.swing_length = swing_length
+        self.max_order_blocks = max_order_blocks
+        self.symbols: Dict[str, SymbolStructure] = {}
+
+    def _state(self, symbol: str) -> SymbolStructure:
+        state = self.symbols.get(symbol)
+        if state is None:
+            state = self.symbols[symbol] = SymbolStructure(self.swing_length)
+        return state
+
+    def seed(self, symbol: str, bars) -> Optional[Dict[str, Any]]:
+        """
+        Rebuild a symbol's levels from the bar store's 1-minute BarSeries.
+        Returns a full `structure_update` replacing whatever the clients hold,
+        or None when the state was already built from at least this much history.
+        """
+        symbol = symbol.upper()
+        state = self._state(symbol)
+        if bars.seeded_bars <= state.seeded_bars:
+            return None
+        forming = state.forming
+        fresh = self.symbols[symbol] = SymbolStructure(self.swing_length)
+        fresh.seeded_bars = bars.seeded_bars
+        n = len(bars)
+        # The newest stored bar may still be forming; it closes through on_bar like any other
+        times, opens, highs, lows, closes = (bars.time[:n].tolist(), bars.open[:n].tolist(),
+                                              bars.high[:n].tolist(), bars.low[:n].tolist(),
+                                              bars.close[:n].tolist())
+        end = n
+        if forming is not None:
+            while end and times[end - 1] >= forming[0]:
+                end -= 1
+        elif n:
+            end = n - 1
+            forming = [times[end], opens[end], highs[end], lows[end], closes[end]]
+        added: Dict[str, Dict[str, Any]] = {}
+        removed: set = set()
+        for i in range(end):
+            self._close_bar(fresh, (times[i], opens[i], highs[i], lows[i], closes[i]), added, removed)
+        fresh.forming = forming
+        logger.info(f"Seeded market structure for {symbol} from {end} bars: {len(fresh.levels)} levels")
+        return self.snapshot_message(symbol)
+
+    def seeded_bars(self, symbol: str) -> int:
+        state = self.symbols.get(symbol.upper())
+        return state.seeded_bars if state else 0
+
+    def on_bar(self, symbol: str, bar_time: int, open_: float, high: float, low: float,
+               close: float) -> Optional[Dict[str, Any]]:
+        """Track the forming bar; when a new minute starts, process the one that just closed."""
+        state = self._state(symbol.upper())
+        forming = state.forming
+        if forming is None or bar_time > forming[0]:
+            state.forming = [bar_time, open_, high, low, close]
+            if forming is None:
+                return None
+            added: Dict[str, Dict[str, Any]] = {}
+            removed: set = set()
+            self._close_bar(state, tuple(forming), added, removed)
+            if not added and not removed:
+                return None
+            return {
+                "type": "structure_update",
+                "symbol": symbol.upper(),
+                "time": forming[0],
+                "added": [state.levels[level_id] for level_id in added if level_id in state.levels],
+                "removed": sorted(removed - added.keys())
+            }
+        if bar_time == forming[0]:
+            forming[2] = max(forming[2], high)
+            forming[3] = min(forming[3], low)
+            forming[4] = close
+        return None
+
+    def _set(self, state: SymbolStructure, level: Dict[str, Any], added: Dict[str, Dict[str, Any]]):
+        state.levels[level["id"]] = level
+        added[level["id"]] = level
+
+    def _drop(self, state: SymbolStructure, level_id: str, added: Dict[str, Dict[str, Any]], removed: set):
+        if state.levels.pop(level_id, None) is not None:
+            added.pop(level_id, None)
+            removed.add(level_id)
+
+    def _close_bar(self, state: SymbolStructure, bar: Bar, added: Dict[str, Dict[str, Any]], removed: set):
+        bar_time, open_, high, low, close = bar
+
+        # Liquidity levels: the previous session's range becomes PDH/PDL at the day roll
+        day = (bar_time + IST_OFFSET) // 86400
+        if day != state.day:
+            if state.day is not None and state.session_high is not None:
+                self._set(state, {"id": "pdh", "kind": "pdh", "price": state.session_high[0],
+                                  "time": state.session_high[1]}, added)
+                self._set(state, {"id": "pdl", "kind": "pdl", "price": state.session_low[0],
+                                  "time": state.session_low[1]}, added)
+            state.day = day
+            state.session_high = state.session_low = None
+        if state.session_high is None or high > state.session_high[0]:
+            state.session_high = [high, bar_time]
+            self._set(state, {"id": "session_high", "kind": "session_high", "price": high, "time": bar_time}, added)
+        if state.session_low is None or low < state.session_low[0]:
+            state.session_low = [low, bar_time]
+            self._set(state, {"id": "session_low", "kind": "session_low", "price": low, "time": bar_time}, added)
+
+        # A close back through an order block invalidates it
+        if state.bullish:
+            for level_id in [i for i in state.bullish if close < state.levels[i]["bottom"]]:
+                state.bullish.remove(level_id)
+                self._drop(state, level_id, added, removed)
+        if state.bearish:
+            for level_id in [i for i in state.bearish if close > state.levels[i]["top"]]:
+                state.bearish.remove(level_id)
+                self._drop(state, level_id, added, removed)
+
+        # Break of structure: the last opposite candle before the break becomes the block
+        swing = state.swing_high
+        if swing is not None and not swing[2] and close > swing[0]:
+            swing[2] = True
+            if state.last_down is not None and close >= state.last_down[2]:
+                self._order_block(state, state.last_down, "bullish", bar_time, added, removed)
+        swing = state.swing_low
+        if swing is not None and not swing[2] and close < swing[0]:
+            swing[2] = True
+            if state.last_up is not None and close <= state.last_up[3]:
+                self._order_block(state, state.last_up, "bearish", bar_time, added, removed)
+
+        if close < open_:
+            state.last_down = bar
+        elif close > open_:
+            state.last_up = bar
+
+        # Confirm a fractal pivot once swing_length bars have closed after it
+        window = state.window
+        window.append(bar)
+        if len(window) == window.maxlen:
+            k = self.swing_length
+            pivot_time, _, pivot_high, pivot_low, _ = window[k]
+            left, right = range(k), range(k + 1, 2 * k + 1)
+            # Strict against the left side, ties allowed on the right (equal highs form one swing)
+            if all(pivot_high > window[i][2] for i in left) and all(pivot_high >= window[i][2] for i in right):
+                state.swing_high = [pivot_high, pivot_time, False]
+            if all(pivot_low < window[i][3] for i in left) and all(pivot_low <= window[i][3] for i in right):
+                state.swing_low = [pivot_low, pivot_time, False]
+
+    def _order_block(self, state: SymbolStructure, candle: Bar, side: str, formed: int,
+                     added: Dict[str, Dict[str, Any]], removed: set):
+        ids = state.bullish if side == "bullish" else state.bearish
+        level_id = f"ob-{state.next_id}"
+        state.next_id += 1
+        self._set(state, {
+            "id": level_id,
+            "kind": "order_block",
+            "side": side,
+            "top": candle[2],
+            "bottom": candle[3],
+            "time": candle[0],
+            "formed": formed
+        }, added)
+        ids.append(level_id)
+        while len(ids) > self.max_order_blocks:
+            self._drop(state, ids.popleft(), added, removed)
+
+    def get_levels(self, symbol: str) -> List[Dict[str, Any]]:
+        state = self.symbols.get(symbol.upper())
+        return list(state.levels.values()) if state else []
+
+    def snapshot_message(self, symbol: str) -> Dict[str, Any]:
+        return {
+            "type": "structure_update",
+            "symbol": symbol.upper(),
+            "full": True,
+            "added": self.get_levels(symbol),
+            "removed": []
+        }
+
+
+market_structure = MarketStructureEngine(
+    swing_length=STRUCTURE_CONFIG['swing_length'],
+    max_order_blocks=STRUCTURE_CONFIG['max_order_blocks']
+)
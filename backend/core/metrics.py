@@ -0,0 +1,247 @@
+"""
+Counters, fixed-bucket histograms and scrape-time gauges, rendered in the
+Prometheus text format (/api/metrics).
+
+Hot paths only do dict updates: a counter increment is one dict write, a
+histogram observation a bisect into its bucket bounds plus three adds.
+Anything that already exists as state elsewhere (queue depths, cache hit
+counts) is read by a collector callback at scrape time instead of being
+tracked per event.
+"""
+import bisect
+import collections
+import logging
+import math
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from config import METRICS_CONFIG
+
+logger = logging.getLogger(__name__)
+
+Labels = Tuple[str, ...]
+
+# Seconds; from sub-millisecond tick handling up to slow upstream fetches
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[Any], extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _number(value: float) -> str:
+    if value == math.inf:
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(value)
+
+
+class Counter:
+    __slots__ = ('name', 'help', 'labelnames', 'values')
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.values: Dict[Labels, float] = {}
+
+    def inc(self, labels: Labels = (), amount: float = 1):
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for labels, value in self.values.items():
+            lines.append(f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}")
+        return lines
+
+
+class Histogram:
+    """Fixed upper bounds; per label set one count per bucket (cumulated when rendered), sum and count."""
+
+    __slots__ = ('name', 'help', 'labelnames', 'bounds', 'series')
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.bounds = tuple(sorted(buckets))
+        # labels -> [bucket counts (last is +Inf), sum, count]
+        self.series: Dict[Labels, list] = {}
+
+    def observe(self, value: float, labels: Labels = ()):
+        series = self.series.get(labels)
+        if series is None:
+            series = self.series[labels] = [[0] * (len(self.bounds) + 1), 0.0, 0]
+        series[0][bisect.bisect_left(self.bounds, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def time(self, labels: Labels = ()) -> 'Timer':
+        return Timer(self, labels)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for labels, (counts, total, count) in self.series.items():
+            cumulative = 0
+            for bound, bucket in zip(self.bounds + (math.inf,), counts):
+                cumulative += bucket
+                le = 'le="' + _number(bound) + '"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {count}")
+        return lines
+
+
+class Timer:
+    """`with histogram.time():` for paths where a context manager's cost does not matter."""
+
+    __slots__ = ('histogram', 'labels', 'started')
+
+    def __init__(self, histogram: Histogram, labels: Labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.started, self.labels)
+
+
+# A collector returns (name, type, help, [(labels dict, value), ...]) families
+Family = Tuple[str, str, str, Iterable[Tuple[Dict[str, Any], float]]]
+
+
+class MetricsRegistry:
+    def __init__(self, namespace: str = 'dashboard'):
+        self.namespace = namespace
+        self.metrics: Dict[str, Any] = {}
+        self.collectors: List[Callable[[], Iterable[Family]]] = []
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        name = f"{self.namespace}_{name}"
+        if name not in self.metrics:
+            self.metrics[name] = Counter(name, help, labelnames)
+        return self.metrics[name]
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        name = f"{self.namespace}_{name}"
+        if name not in self.metrics:
+            self.metrics[name] = Histogram(name, help, labelnames, buckets)
+        return self.metrics[name]
+
+    def collector(self, collect: Callable[[], Iterable[Family]]):
+        """Register a callback read at scrape time (gauges over existing state)."""
+        self.collectors.append(collect)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self.metrics.values():
+            lines.extend(metric.render())
+        for collect in self.collectors:
+            try:
+                families = list(collect())
+            except Exception as e:
+                logger.error(f"Metrics collector failed: {e}")
+                continue
+            for name, kind, help, samples in families:
+                name = f"{self.namespace}_{name}"
+                lines.append(f"# HELP {name} {help}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    lines.append(f"{name}{_labels(list(labels), list(labels.values()))} {_number(value)}")
+        return '\n'.join(lines) + '\n'
+
+
+class SamplingProfiler:
+    """
+    Statistical profiler for the event loop thread, off unless started.
+
+    A daemon thread wakes every `interval` seconds and records the target
+    thread's current stack; the result is collapsed stacks ("a;b;c count"),
+    the input format of flamegraph.pl / speedscope. Nothing runs on the
+    event loop itself, so the cost while started is the sampling thread
+    holding the GIL briefly per sample.
+    """
+
+    def __init__(self, interval: float = 0.005, max_depth: int = 64):
+        self.interval = interval
+        self.max_depth = max_depth
+        self.samples: collections.Counter = collections.Counter()
+        self.thread: Optional[threading.Thread] = None
+        self.stop_event = threading.Event()
+        self.target: Optional[int] = None
+        self.started_at: Optional[float] = None
+        self.sample_count = 0
+
+    @property
+    def running(self) -> bool:
+        return self.thread is not None
+
+    def start(self, interval: Optional[float] = None):
+        if self.thread is not None:
+            return
+        if interval:
+            self.interval = interval
+        self.samples.clear()
+        self.sample_count = 0
+        self.target = threading.get_ident()
+        self.started_at = time.time()
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+        self.thread.start()
+        logger.info(f"Sampling profiler started ({self.interval * 1000:.1f} ms interval)")
+
+    def stop(self) -> str:
+        if self.thread is not None:
+            self.stop_event.set()
+            self.thread.join()
+            self.thread = None
+            logger.info(f"Sampling profiler stopped after {self.sample_count} samples")
+        return self.collapsed()
+
+    def _run(self):
+        while not self.stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.target)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None and len(stack) < self.max_depth:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({code.co_filename.rsplit('/', 1)[-1]})")
+                frame = frame.f_back
+            self.samples[';'.join(reversed(stack))] += 1
+            self.sample_count += 1
+
+    def collapsed(self) -> str:
+        return '\n'.join(f"{stack} {count}" for stack, count in self.samples.most_common()) + '\n'
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self.running,
+            "interval_ms": self.interval * 1000,
+            "samples": self.sample_count,
+            "started_at": self.started_at
+        }
+
+
+metrics = MetricsRegistry(METRICS_CONFIG['namespace'])
+
+# Shared by the data/* clients: one request/response round trip to an upstream API
+UPSTREAM_HTTP_SECONDS = metrics.histogram('upstream_http_seconds', 'Upstream HTTP round trips', ('api', 'endpoint'))
+UPSTREAM_HTTP_ERRORS = metrics.counter('upstream_http_errors_total', 'Failed upstream HTTP round trips', ('api', 'endpoint'))
+profiler = SamplingProfiler(METRICS_CONFIG['profiler_interval_ms'] / 1000)
@@ -0,0 +1,172 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+ChainFetcher = Callable[[str], Awaitable[Optional[Dict[str, Any]]]]
+
+# Computed from the chain on every fetch rather than part of it; never diffed into oi_update
+DERIVED_KEYS = ('timestamp', 'analytics', 'greeks')
+# Analytics fields that grow a point per poll; they ride along but do not count as a change
+TREND_KEYS = ('pcr_trend', 'oi_price_trend')
+
+
+class ChainState:
+    """Latest good chain for one underlying plus the version each strike last changed in."""
+
+    __slots__ = ('version', 'strikes', 'strike_versions', 'full_version', 'meta', 'analytics', 'error')
+
+    def __init__(self):
+        self.version = 0
+        self.strikes: Dict[Any, dict] = {}
+        self.strike_versions: Dict[Any, int] = {}
+        # Last version at which the strike set itself changed (expiry roll etc.);
+        # clients older than this need a full snapshot.
+        self.full_version = 0
+        self.meta: Dict[str, Any] = {}
+        self.analytics: Optional[Dict[str, Any]] = None
+        # Why the last poll failed; None while the chain is current
+        self.error: Optional[str] = None
+
+
+class OIPoller:
+    """
+    Polls each actively subscribed underlying's option chain once per interval,
+    however many clients watch it, and publishes `oi_update` messages over /ws
+    carrying only the strikes that changed.
+
+    Every update carries `version` and `base_version`. A client whose current
+    version is not `base_version` has missed an update and re-syncs with
+    {"type": "oi_sync", "symbol": ..., "version": <its version>}.
+
+    Chain analytics (PCR, max pain, buildup) go out separately as
+    `oi_analytics`, only when a value other than the trend series changed;
+    greeks have their own `greeks_update` push (core.greeks).
+
+    A failed or empty poll keeps the last good chain and publishes
+    `oi_status` with `stale: true` (and again with `stale: false` once a
+    poll succeeds), rather than replacing the chain.
+    """
+
+    def __init__(self, manager, fetch: ChainFetcher, interval: float = 5.0):
+        self.manager = manager
+        self.fetch = fetch
+        self.interval = interval
+        self.refcounts: Dict[str, int] = {}
+        self.state: Dict[str, ChainState] = {}
+        self.task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self.task is None:
+            self.task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+
+    def track(self, symbol: str):
+        self.refcounts[symbol] = self.refcounts.get(symbol, 0) + 1
+
+    def untrack(self, symbol: str):
+        count = self.refcounts.get(symbol, 0) - 1
+        if count > 0:
+            self.refcounts[symbol] = count
+            return
+        self.refcounts.pop(symbol, None)
+        self.state.pop(symbol, None)
+
+    async def _run(self):
+        while True:
+            symbols = list(self.refcounts)
+            if symbols:
+                await asyncio.gather(*(self._poll(s) for s in symbols), return_exceptions=True)
+            await asyncio.sleep(self.interval)
+
+    async def _poll(self, symbol: str):
+        try:
+            chain = await self.fetch(symbol)
+            error = None if chain and isinstance(chain.get('strikes'), list) else "no chain data"
+        except Exception as e:
+            logger.error(f"OI poll failed for {symbol}: {e}")
+            chain, error = None, f"{type(e).__name__}: {e}"
+        if symbol not in self.refcounts:
+            return
+
+        state = self.state.setdefault(symbol, ChainState())
+        was_stale = state.error is not None
+        state.error = error
+        if was_stale != (error is not None):
+            await self.manager.broadcast_to_symbol(symbol, self.status_message(symbol))
+        if error:
+            return
+
+        strikes = {row['strike']: row for row in chain['strikes'] if 'strike' in row}
+        meta = {k: v for k, v in chain.items() if k != 'strikes' and k not in DERIVED_KEYS}
+
+        analytics = chain.get('analytics')
+        if analytics and self._analytics_changed(state.analytics, analytics):
+            state.analytics = analytics
+            await self.manager.broadcast_to_symbol(symbol, self.analytics_message(symbol))
+
+        full = strikes.keys() != state.strikes.keys()
+        changed = [k for k, row in strikes.items() if state.strikes.get(k) != row]
+        if not full and not changed and meta == state.meta:
+            return
+
+        base_version = state.version
+        state.version += 1
+        if full:
+            state.full_version = state.version
+            state.strike_versions = {k: state.version for k in strikes}
+        else:
+            for k in changed:
+                state.strike_versions[k] = state.version
+        state.strikes = strikes
+        state.meta = meta
+
+        message = self._message(symbol, state, base_version, full, changed)
+        message["timestamp"] = chain.get("timestamp")
+        await self.manager.broadcast_to_symbol(symbol, message)
+
+    @staticmethod
+    def _analytics_changed(old: Optional[Dict[str, Any]], new: Dict[str, Any]) -> bool:
+        if old is None:
+            return True
+        return any(old.get(k) != v for k, v in new.items() if k not in TREND_KEYS)
+
+    def status_message(self, symbol: str) -> Optional[Dict[str, Any]]:
+        state = self.state.get(symbol)
+        if state is None:
+            return None
+        return {"type": "oi_status", "symbol": symbol, "stale": state.error is not None,
+                "error": state.error, "version": state.version}
+
+    def analytics_message(self, symbol: str) -> Optional[Dict[str, Any]]:
+        state = self.state.get(symbol)
+        if state is None or state.analytics is None:
+            return None
+        return {"type": "oi_analytics", "symbol": symbol, "analytics": state.analytics}
+
+    @staticmethod
+    def _message(symbol: str, state: ChainState, base_version: int, full: bool, keys) -> Dict[str, Any]:
+        return {
+            **state.meta,
+            "type": "oi_update",
+            "symbol": symbol,
+            "version": state.version,
+            "base_version": base_version,
+            "full": full,
+            "strikes": [state.strikes[k] for k in sorted(state.strikes if full else keys)]
+        }
+
+    def message_since(self, symbol: str, version: int = 0) -> Optional[Dict[str, Any]]:
+        """Snapshot (version 0 or too old) or the strikes changed after `version`."""
+        state = self.state.get(symbol)
+        if state is None or state.version == 0:
+            return None
+        full = version <= 0 or version < state.full_version or version > state.version
+        keys = [k for k, v in state.strike_versions.items() if v > version]
+        return self._message(symbol, state, version if not full else 0, full, keys)
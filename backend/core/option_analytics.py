@@ -0,0 +1,203 @@
+import operator
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+import numpy as np
+
+BUILDUP_LABELS = np.array(['neutral', 'long_buildup', 'short_buildup', 'short_covering', 'long_unwinding'])
+
+
+# Row key = expiry code * EXPIRY_STRIDE + strike; exact in float64 for any listed strike
+EXPIRY_STRIDE = 1e8
+
+CHAIN_COLUMNS = ("strike", "ce_oi", "pe_oi", "ce_change", "pe_change", "ce_ltp", "pe_ltp")
+_row_values = operator.itemgetter(*CHAIN_COLUMNS)
+
+
+def chain_arrays(strikes: List[dict]) -> Dict[str, np.ndarray]:
+    """Column arrays for a normalized strike list (one row per strike and expiry)."""
+    try:
+        matrix = np.array([_row_values(row) for row in strikes], dtype=np.float64)
+    except (KeyError, TypeError, ValueError):
+        matrix = np.array([[row.get(name) or 0 for name in CHAIN_COLUMNS] for row in strikes], dtype=np.float64)
+    matrix = matrix.reshape(len(strikes), len(CHAIN_COLUMNS))
+    cols = {name: matrix[:, i] for i, name in enumerate(CHAIN_COLUMNS)}
+    cols["expiry"] = np.array([row.get('expiry') or '' for row in strikes], dtype=object)
+    return cols
+
+
+def _grouped_cumsums(x: np.ndarray, starts: np.ndarray, group: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(exclusive prefix, inclusive prefix, group total) of x, restarting at every group start."""
+    inclusive = np.cumsum(x)
+    exclusive = inclusive - x
+    base = exclusive[starts][group]
+    totals = np.add.reduceat(x, starts)[group]
+    return exclusive - base, inclusive - base, totals
+
+
+def buildup_codes(price_change: np.ndarray, oi_change: np.ndarray) -> np.ndarray:
+    """Index into BUILDUP_LABELS for each (premium change, OI change) pair."""
+    codes = np.zeros(price_change.shape, dtype=np.int8)
+    up, down = price_change > 0, price_change < 0
+    oi_up, oi_down = oi_change > 0, oi_change < 0
+    codes[up & oi_up] = 1
+    codes[down & oi_up] = 2
+    codes[up & oi_down] = 3
+    codes[down & oi_down] = 4
+    return codes
+
+
+def oi_price_sentiment(spot_move: float, net_oi_change: float) -> str:
+    """Widget 3 reading of spot direction against net (put - call) OI added."""
+    if spot_move == 0 or net_oi_change == 0:
+        return 'neutral'
+    if net_oi_change < 0:
+        # Calls being written, whether price rises into them or falls away.
+        return 'bearish_buildup'
+    return 'bullish_buildup' if spot_move > 0 else 'short_covering'
+
+
+def analyze_arrays(cols: Dict[str, np.ndarray], spot: Optional[float]) -> Dict[str, Any]:
+    """
+    PCR, max pain, ATM strike and straddle for every expiry in one pass.
+
+    Rows are sorted by (expiry, strike) once; all per-expiry quantities then
+    come from grouped prefix sums, so max pain is O(n log n) over the whole
+    chain instead of O(strikes^2) per expiry.
+    """
+    expiry_ids, group = np.unique(cols["expiry"], return_inverse=True)
+    order = np.lexsort((cols["strike"], group))
+    group = group[order]
+    k = cols["strike"][order]
+    ce_oi = cols["ce_oi"][order]
+    pe_oi = cols["pe_oi"][order]
+    starts = np.flatnonzero(np.r_[True, group[1:] != group[:-1]])
+
+    # Pain at K_j: calls below expire worth (K_j - K_i), puts above worth (K_i - K_j).
+    c_excl, _, _ = _grouped_cumsums(ce_oi, starts, group)
+    ck_excl, _, _ = _grouped_cumsums(ce_oi * k, starts, group)
+    _, p_incl, p_total = _grouped_cumsums(pe_oi, starts, group)
+    _, pk_incl, pk_total = _grouped_cumsums(pe_oi * k, starts, group)
+    pain = (k * c_excl - ck_excl) + ((pk_total - pk_incl) - k * (p_total - p_incl))
+    # Sorting by (group, value) keeps each group's index range, so the first
+    # row of every range is that group's minimum.
+    max_pain_idx = np.lexsort((pain, group))[starts]
+
+    ce_total = np.add.reduceat(ce_oi, starts)
+    pe_total = np.add.reduceat(pe_oi, starts)
+    pcr = np.divide(pe_total, ce_total, out=np.zeros_like(pe_total), where=ce_total > 0)
+
+    if spot is None:
+        spot_by_group = k[max_pain_idx][group]
+    else:
+        spot_by_group = np.full(k.shape, float(spot))
+    atm_idx = np.lexsort((np.abs(k - spot_by_group), group))[starts]
+    straddle = cols["ce_ltp"][order][atm_idx] + cols["pe_ltp"][order][atm_idx]
+
+    return {
+        str(expiry_ids[g]): {
+            "pcr": round(float(pcr[g]), 4),
+            "max_pain": float(k[max_pain_idx[g]]),
+            "atm_strike": float(k[atm_idx[g]]),
+            "straddle": round(float(straddle[g]), 2),
+        }
+        for g in range(len(starts))
+    }
+
+
+class OptionAnalytics:
+    """
+    Per-symbol chain analytics with the short history the sentiment widgets
+    need (PCR trend, OI change vs. price). Call `attach` once per fresh chain.
+    """
+
+    def __init__(self, history: int = 720, trend_window: float = 300.0):
+        self.trend_window = trend_window
+        self.pcr_history: Dict[str, Deque[Tuple[int, float]]] = {}
+        self.oi_price_history: Dict[str, Deque[Tuple[int, float, int]]] = {}
+        # symbol -> (sorted row keys, CE ltp, PE ltp) of the previous chain
+        self.prev_ltp: Dict[str, Tuple[np.ndarray, np.ndarray, np.ndarray]] = {}
+        self.expiry_codes: Dict[str, int] = {}
+        self.history = history
+
+    def row_keys(self, cols: Dict[str, np.ndarray]) -> np.ndarray:
+        """One float key per (expiry, strike) row, stable across chain snapshots."""
+        expiries, inverse = np.unique(cols["expiry"], return_inverse=True)
+        codes = np.array([self.expiry_codes.setdefault(e, len(self.expiry_codes)) for e in expiries],
+                         dtype=np.float64)
+        return codes[inverse] * EXPIRY_STRIDE + cols["strike"]
+
+    def analyze(self, chain: Dict[str, Any], spot: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        strikes = chain.get('strikes') or []
+        if not strikes:
+            return None
+        symbol = str(chain.get('symbol', '')).upper()
+        spot = chain.get('spot') or spot
+        cols = chain_arrays(strikes)
+        per_expiry = analyze_arrays(cols, spot)
+
+        total_ce_oi = cols["ce_oi"].sum()
+        total_pe_oi = cols["pe_oi"].sum()
+        total_ce_change = cols["ce_change"].sum()
+        total_pe_change = cols["pe_change"].sum()
+        pcr = float(total_pe_oi / total_ce_oi) if total_ce_oi > 0 else 0.0
+
+        now = time.time()
+        pcr_points = self.pcr_history.setdefault(symbol, deque(maxlen=self.history))
+        pcr_points.append((int(now), round(pcr, 4)))
+        pcr_change = None
+        for ts, value in pcr_points:
+            if now - ts <= self.trend_window:
+                pcr_change = round(pcr - value, 4)
+                break
+
+        oi_points = self.oi_price_history.setdefault(symbol, deque(maxlen=self.history))
+        prev_spot = oi_points[-1][1] if oi_points else None
+        if spot is not None:
+            oi_points.append((int(now), float(spot), int(total_pe_change - total_ce_change)))
+
+        # Premium change per row vs. the previous chain, matched by (expiry, strike).
+        strike = cols["strike"]
+        keys = self.row_keys(cols)
+        prev = self.prev_ltp.get(symbol)
+        ce_move = np.zeros_like(strike)
+        pe_move = np.zeros_like(strike)
+        if prev is not None and len(prev[0]):
+            pos = np.clip(np.searchsorted(prev[0], keys), 0, len(prev[0]) - 1)
+            matched = prev[0][pos] == keys
+            ce_move[matched] = cols["ce_ltp"][matched] - prev[1][pos][matched]
+            pe_move[matched] = cols["pe_ltp"][matched] - prev[2][pos][matched]
+        sort = np.argsort(keys, kind='stable')
+        self.prev_ltp[symbol] = (keys[sort], cols["ce_ltp"][sort], cols["pe_ltp"][sort])
+
+        spot_move = float(spot) - prev_spot if spot is not None and prev_spot is not None else 0.0
+
+        nearest = per_expiry.get(str(chain.get('expiry') or ''), next(iter(per_expiry.values())))
+        return {
+            "spot": spot,
+            "pcr": round(pcr, 4),
+            "pcr_change_5m": pcr_change,
+            "pcr_trend": [list(point) for point in list(pcr_points)[-60:]],
+            "max_pain": nearest["max_pain"],
+            "atm_strike": nearest["atm_strike"],
+            "straddle": nearest["straddle"],
+            "total_ce_change": int(total_ce_change),
+            "total_pe_change": int(total_pe_change),
+            "oi_vs_price": oi_price_sentiment(spot_move, float(total_pe_change - total_ce_change)),
+            "oi_price_trend": [list(point) for point in list(oi_points)[-60:]],
+            "expiries": per_expiry,
+            "strike_buildup": {
+                "strikes": strike.tolist(),
+                "ce": BUILDUP_LABELS[buildup_codes(ce_move, cols["ce_change"])].tolist(),
+                "pe": BUILDUP_LABELS[buildup_codes(pe_move, cols["pe_change"])].tolist()
+            }
+        }
+
+    def attach(self, chain: Optional[Dict[str, Any]], spot: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        if chain and isinstance(chain.get('strikes'), list):
+            chain['analytics'] = self.analyze(chain, spot)
+        return chain
+
+
+option_analytics = OptionAnalytics()
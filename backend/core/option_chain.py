@@ -0,0 +1,58 @@
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional
+
+from config import DATA_PROVIDER_CONFIG
+from core.cache import TTLCache
+from core.bar_store import bar_store
+from core.option_analytics import option_analytics
+
+logger = logging.getLogger(__name__)
+
+IST = timezone(timedelta(hours=5, minutes=30))
+
+
+def seconds_until_ist_midnight() -> float:
+    now = datetime.now(IST)
+    midnight = (now + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+    return max((midnight - now).total_seconds(), 1.0)
+
+
+class OptionChainService:
+    """
+    Cached front door for option-chain data.
+
+    Chains come from the provider registry's 'options' route (primary,
+    hedged with the fallback) and are cached per (symbol, expiry) for
+    `chain_ttl` seconds with analytics attached. Concurrent misses for the
+    same key share one upstream request.
+    """
+
+    def __init__(self, chain_ttl: float = 5.0):
+        self.chains = TTLCache(ttl=chain_ttl)
+
+    async def get_chain(self, symbol: str, expiry: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        from data.providers import provider_registry
+        from core.greeks import greeks_engine
+        from core.tape import tape_recorder
+
+        async def load():
+            chain = await provider_registry.fetch('options', 'get_option_chain', symbol, expiry)
+            if chain:
+                tape_recorder.record_chain(symbol, chain)
+            spot = bar_store.last_price(symbol)
+            return greeks_engine.attach(option_analytics.attach(chain, spot), spot)
+
+        return await self.chains.get_or_load((symbol.upper(), expiry), load)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "chain_hits": self.chains.hits,
+            "chain_misses": self.chains.misses,
+            "cached_chains": len(self.chains.entries)
+        }
+
+
+option_chain_service = OptionChainService(
+    chain_ttl=DATA_PROVIDER_CONFIG['options'].get('chain_ttl_seconds', 5)
+)
@@ -0,0 +1,446 @@
+import asyncio
+import logging
+import time
+import uuid
+from collections import deque
+from heapq import heappop, heappush
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from config import PAPER_TRADING_CONFIG
+
+logger = logging.getLogger(__name__)
+
+BUY = 'BUY'
+SELL = 'SELL'
+MARKET = 'MARKET'
+LIMIT = 'LIMIT'
+
+OPEN = 'OPEN'
+FILLED = 'FILLED'
+CANCELLED = 'CANCELLED'
+
+
+class Order:
+    __slots__ = ('id', 'symbol', 'side', 'qty', 'type', 'limit_price', 'status',
+                 'fill_price', 'created_ms', 'filled_ms')
+
+    def __init__(self, id: str, symbol: str, side: str, qty: int, type: str,
+                 limit_price: Optional[float], created_ms: int):
+        self.id = id
+        self.symbol = symbol
+        self.side = side
+        self.qty = qty
+        self.type = type
+        self.limit_price = limit_price
+        self.status = OPEN
+        self.fill_price: Optional[float] = None
+        self.created_ms = created_ms
+        self.filled_ms: Optional[int] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'Order':
+        order = cls(data['id'], data['symbol'], data['side'], int(data['qty']), data['type'],
+                    data.get('limit_price'), int(data.get('created_ms') or 0))
+        order.status = data.get('status', OPEN)
+        order.fill_price = data.get('fill_price')
+        order.filled_ms = data.get('filled_ms')
+        return order
+
+
+class Position:
+    """Net position in one symbol; qty is signed (negative = short)."""
+
+    __slots__ = ('symbol', 'qty', 'avg_price', 'realized', 'ltp', 'unrealized')
+
+    def __init__(self, symbol: str):
+        self.symbol = symbol
+        self.qty = 0
+        self.avg_price = 0.0
+        self.realized = 0.0
+        self.ltp: Optional[float] = None
+        self.unrealized = 0.0
+
+    def fill(self, qty: int, price: float) -> float:
+        """Apply a signed fill; returns the P&L it realized."""
+        realized = 0.0
+        if self.qty == 0 or (self.qty > 0) == (qty > 0):
+            total = abs(self.qty) + abs(qty)
+            self.avg_price = (self.avg_price * abs(self.qty) + price * abs(qty)) / total
+        else:
+            closed = min(abs(qty), abs(self.qty))
+            realized = closed * (price - self.avg_price) * (1 if self.qty > 0 else -1)
+            if abs(qty) > abs(self.qty):
+                # Flipped through flat: the remainder opens at the fill price
+                self.avg_price = price
+        self.qty += qty
+        if self.qty == 0:
+            self.avg_price = 0.0
+        self.realized += realized
+        return realized
+
+    def mark(self, price: float) -> float:
+        """Mark to price; returns the change in unrealized P&L."""
+        self.ltp = price
+        unrealized = self.qty * (price - self.avg_price)
+        delta = unrealized - self.unrealized
+        self.unrealized = unrealized
+        return delta
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.symbol,
+            "symbol": self.symbol,
+            "qty": self.qty,
+            "avg_price": round(self.avg_price, 4),
+            "realized_pnl": round(self.realized, 2),
+            "unrealized_pnl": round(self.unrealized, 2),
+            "ltp": self.ltp
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'Position':
+        position = cls(data['symbol'])
+        position.qty = int(data.get('qty', 0))
+        position.avg_price = float(data.get('avg_price', 0.0))
+        position.realized = float(data.get('realized_pnl', 0.0))
+        if data.get('ltp') is not None:
+            position.mark(float(data['ltp']))
+        return position
+
+
+class PaperTradingEngine:
+    """
+    In-memory paper execution against the live tick stream.
+
+    Orders are validated and acknowledged synchronously, without touching
+    SQLite. Market orders fill at the last known price, or on the next tick;
+    resting limit orders sit in per-symbol price heaps, so a tick only
+    touches the orders it makes marketable. Every tick re-marks the
+    position in that symbol and keeps the account's unrealized total
+    incrementally, so the cost per tick does not grow with the number of
+    positions. Changed orders, positions and the account are flushed to
+    SQLite every `flush_interval` seconds in one transaction.
+
+    State is per process: with several uvicorn workers, orders are held by
+    the worker that accepted them.
+    """
+
+    def __init__(self, config: Dict[str, Any], account_id: str = 'paper'):
+        self.enabled = config.get('enabled', True) and config.get('trading_enabled', True)
+        self.initial_balance = float(config.get('initial_balance', 1000000))
+        self.max_position_size = float(config.get('max_position_size', 0)) or None
+        self.account_id = account_id
+        self.flush_interval = config.get('flush_interval_seconds', 1.0)
+        self.balance = self.initial_balance
+        # Running totals, so account() stays O(1) however many positions are open
+        self.realized = 0.0
+        self.unrealized = 0.0
+        self.open_positions = 0
+        self.positions: Dict[str, Position] = {}
+        self.orders: Dict[str, Order] = {}
+        # Filled / cancelled orders once persisted, newest last
+        self.recent: deque = deque(maxlen=1000)
+        self.open_orders: Dict[str, Set[str]] = {}
+        # symbol -> heaps of (-price | price, seq, order id); cancelled entries are skipped lazily
+        self.bids: Dict[str, List[Tuple[float, int, str]]] = {}
+        self.asks: Dict[str, List[Tuple[float, int, str]]] = {}
+        self.pending_market: Dict[str, List[str]] = {}
+        self.last_prices: Dict[str, float] = {}
+        self.seq = 0
+        self.dirty_orders: Set[str] = set()
+        self.dirty_positions: Set[str] = set()
+        self.account_dirty = False
+        self.watchers: Set[Any] = set()
+        self.manager = None
+        self.feed = None
+        self.fed: Set[str] = set()
+        self.db = None
+        self.task: Optional[asyncio.Task] = None
+
+    async def start(self, db, manager=None):
+        self.db = db
+        self.manager = manager
+        await self.load()
+        if self.task is None:
+            self.task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+        await self.flush()
+
+    def set_feed(self, feed):
+        """Live tick source (DataEngine); symbols with orders or positions are kept streaming."""
+        self.feed = feed
+        for symbol in [s for s, p in self.positions.items() if p.qty] + list(self.open_orders):
+            self._track(symbol)
+
+    async def load(self):
+        account = await self.db.get_account(self.account_id)
+        if account:
+            self.balance = float(account.get('balance', self.initial_balance))
+        for data in await self.db.get_positions():
+            position = Position.from_dict(data)
+            if position.qty or position.realized:
+                self.positions[position.symbol] = position
+                self.realized += position.realized
+                self.unrealized += position.unrealized
+                self.open_positions += position.qty != 0
+        for data in await self.db.get_open_orders():
+            order = Order.from_dict(data)
+            self.orders[order.id] = order
+            self._rest(order)
+        if self.positions or self.orders:
+            logger.info(f"Paper trading restored {len(self.positions)} positions, {len(self.orders)} open orders")
+
+    # Orders
+
+    def place_order(self, symbol: str, side: str, qty: Any, type: str = MARKET,
+                    limit_price: Any = None) -> Dict[str, Any]:
+        """Validate and accept an order; raises ValueError with the reject reason."""
+        if not self.enabled:
+            raise ValueError("paper trading is disabled")
+        symbol = (symbol or '').upper()
+        side = (side or '').upper()
+        type = (type or MARKET).upper()
+        if not symbol:
+            raise ValueError("symbol is required")
+        if side not in (BUY, SELL):
+            raise ValueError(f"side must be {BUY} or {SELL}")
+        if type not in (MARKET, LIMIT):
+            raise ValueError(f"type must be {MARKET} or {LIMIT}")
+        try:
+            qty = int(qty)
+        except (TypeError, ValueError):
+            raise ValueError("qty must be an integer")
+        if qty <= 0:
+            raise ValueError("qty must be positive")
+        if type == LIMIT:
+            try:
+                limit_price = float(limit_price)
+            except (TypeError, ValueError):
+                raise ValueError("limit_price is required for LIMIT orders")
+            if limit_price <= 0:
+                raise ValueError("limit_price must be positive")
+        else:
+            limit_price = None
+        self._check_size(symbol, qty if side == BUY else -qty, limit_price)
+
+        now_ms = int(time.time() * 1000)
+        order = Order(uuid.uuid4().hex[:16], symbol, side, qty, type, limit_price, now_ms)
+        self.orders[order.id] = order
+        self.dirty_orders.add(order.id)
+        price = self.last_prices.get(symbol)
+        if price is None:
+            price = self._last_price(symbol)
+        if price is not None and self._marketable(order, price):
+            self._fill(order, price, now_ms)
+        else:
+            self._rest(order)
+        self._track(symbol)
+        return order.to_dict()
+
+    def cancel_order(self, order_id: str) -> Dict[str, Any]:
+        order = self.orders.get(order_id)
+        if order is None:
+            raise ValueError(f"unknown order {order_id}")
+        if order.status != OPEN:
+            raise ValueError(f"order {order_id} is {order.status}")
+        order.status = CANCELLED
+        self._unrest(order)
+        self.dirty_orders.add(order.id)
+        if self.watchers:
+            self._notify({"type": "order_update", "order": order.to_dict()})
+        self._untrack(order.symbol)
+        return order.to_dict()
+
+    def _check_size(self, symbol: str, signed_qty: int, limit_price: Optional[float]):
+        if self.max_position_size is None:
+            return
+        price = limit_price or self.last_prices.get(symbol) or self._last_price(symbol)
+        if price is None:
+            return
+        position = self.positions.get(symbol)
+        resulting = (position.qty if position else 0) + signed_qty
+        if abs(resulting) * price > self.max_position_size:
+            raise ValueError(f"position value {abs(resulting) * price:.0f} exceeds max_position_size "
+                             f"{self.max_position_size:.0f}")
+
+    @staticmethod
+    def _last_price(symbol: str) -> Optional[float]:
+        from core.bar_store import bar_store
+        return bar_store.last_price(symbol)
+
+    @staticmethod
+    def _marketable(order: Order, price: float) -> bool:
+        if order.type == MARKET:
+            return True
+        return price <= order.limit_price if order.side == BUY else price >= order.limit_price
+
+    def _rest(self, order: Order):
+        self.open_orders.setdefault(order.symbol, set()).add(order.id)
+        if order.type == MARKET:
+            self.pending_market.setdefault(order.symbol, []).append(order.id)
+            return
+        self.seq += 1
+        if order.side == BUY:
+            heappush(self.bids.setdefault(order.symbol, []), (-order.limit_price, self.seq, order.id))
+        else:
+            heappush(self.asks.setdefault(order.symbol, []), (order.limit_price, self.seq, order.id))
+
+    def _unrest(self, order: Order):
+        ids = self.open_orders.get(order.symbol)
+        if ids is not None:
+            ids.discard(order.id)
+            if not ids:
+                del self.open_orders[order.symbol]
+                self.bids.pop(order.symbol, None)
+                self.asks.pop(order.symbol, None)
+                self.pending_market.pop(order.symbol, None)
+
+    def _fill(self, order: Order, price: float, ts_ms: int):
+        order.status = FILLED
+        order.fill_price = price
+        order.filled_ms = ts_ms
+        self._unrest(order)
+        self.dirty_orders.add(order.id)
+
+        position = self.positions.get(order.symbol)
+        if position is None:
+            position = self.positions[order.symbol] = Position(order.symbol)
+        was_open = position.qty != 0
+        realized = position.fill(order.qty if order.side == BUY else -order.qty, price)
+        self.balance += realized
+        self.realized += realized
+        self.open_positions += (position.qty != 0) - was_open
+        self.unrealized += position.mark(self.last_prices.get(order.symbol, price))
+        self.dirty_positions.add(order.symbol)
+        self.account_dirty = True
+        if self.watchers:
+            self._notify({"type": "order_update", "order": order.to_dict(),
+                          "position": position.to_dict(), "account": self.account()})
+        if position.qty == 0:
+            self._untrack(order.symbol)
+
+    # Ticks
+
+    def on_tick(self, symbol: str, price: float, ts_ms: int):
+        symbol = symbol.upper()
+        self.last_prices[symbol] = price
+        if symbol in self.open_orders:
+            self._match(symbol, price, ts_ms)
+        position = self.positions.get(symbol)
+        if position is None or position.qty == 0:
+            return
+        self.unrealized += position.mark(price)
+        if self.watchers:
+            self._notify({
+                "type": "position_update",
+                "symbol": symbol,
+                "ltp": price,
+                "qty": position.qty,
+                "unrealized_pnl": round(position.unrealized, 2),
+                "equity": round(self.balance + self.unrealized, 2)
+            })
+
+    def _match(self, symbol: str, price: float, ts_ms: int):
+        market = self.pending_market.pop(symbol, None)
+        if market:
+            for order_id in market:
+                order = self.orders.get(order_id)
+                if order is not None and order.status == OPEN:
+                    self._fill(order, price, ts_ms)
+        bids = self.bids.get(symbol)
+        while bids and -bids[0][0] >= price:
+            order = self.orders.get(heappop(bids)[2])
+            if order is not None and order.status == OPEN:
+                self._fill(order, price, ts_ms)
+        asks = self.asks.get(symbol)
+        while asks and asks[0][0] <= price:
+            order = self.orders.get(heappop(asks)[2])
+            if order is not None and order.status == OPEN:
+                self._fill(order, price, ts_ms)
+
+    def _track(self, symbol: str):
+        if self.feed is not None and symbol not in self.fed:
+            self.fed.add(symbol)
+            asyncio.create_task(self.feed.acquire(symbol))
+
+    def _untrack(self, symbol: str):
+        position = self.positions.get(symbol)
+        if symbol in self.fed and symbol not in self.open_orders and not (position and position.qty):
+            self.fed.discard(symbol)
+            self.feed.release(symbol)
+
+    # Clients
+
+    def watch(self, websocket):
+        self.watchers.add(websocket)
+
+    def unwatch(self, websocket):
+        self.watchers.discard(websocket)
+
+    def _notify(self, message: Dict[str, Any]):
+        if self.manager is not None:
+            self.manager.send_many(self.watchers, message)
+
+    def account(self) -> Dict[str, Any]:
+        return {
+            "id": self.account_id,
+            "initial_balance": self.initial_balance,
+            "balance": round(self.balance, 2),
+            "equity": round(self.balance + self.unrealized, 2),
+            "realized_pnl": round(self.realized, 2),
+            "unrealized_pnl": round(self.unrealized, 2),
+            "open_positions": self.open_positions,
+            "open_orders": sum(len(ids) for ids in self.open_orders.values())
+        }
+
+    def get_positions(self) -> List[Dict[str, Any]]:
+        return [p.to_dict() for p in self.positions.values() if p.qty or p.realized]
+
+    def get_orders(self, status: Optional[str] = None, limit: int = 200) -> List[Dict[str, Any]]:
+        orders = list(self.recent) + [o.to_dict() for o in self.orders.values()]
+        if status is not None:
+            orders = [o for o in orders if o['status'] == status.upper()]
+        return orders[-limit:]
+
+    # Persistence
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def flush(self):
+        if self.db is None or not (self.dirty_orders or self.dirty_positions or self.account_dirty):
+            return
+        orders = [self.orders[i].to_dict() for i in self.dirty_orders]
+        positions = [self.positions[s].to_dict() for s in self.dirty_positions]
+        account = self.account() if self.account_dirty else None
+        # Changes made while the write is in flight land in fresh sets for the next flush
+        dirty = self.dirty_orders, self.dirty_positions, self.account_dirty
+        self.dirty_orders, self.dirty_positions, self.account_dirty = set(), set(), False
+        try:
+            await self.db.write_paper_state(account, positions, orders)
+        except BaseException as e:
+            # Not written: keep everything dirty (and the orders in memory) for the next flush
+            self.dirty_orders |= dirty[0]
+            self.dirty_positions |= dirty[1]
+            self.account_dirty = self.account_dirty or dirty[2]
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            logger.error(f"Failed to persist paper trading state ({len(orders)} orders), retrying next flush: {e}")
+            return
+        # Filled and cancelled orders only need to reach SQLite once
+        for order in orders:
+            if order['status'] != OPEN and self.orders.pop(order['id'], None) is not None:
+                self.recent.append(order)
+
+
+paper_engine = PaperTradingEngine(PAPER_TRADING_CONFIG)
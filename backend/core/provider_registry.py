@@ -0,0 +1,238 @@
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List, Optional
+
+from core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+PROVIDER_SECONDS = metrics.histogram('provider_call_seconds', 'Provider method latency', ('provider', 'method'))
+PROVIDER_CALLS = metrics.counter('provider_calls_total', 'Provider method calls by outcome',
+                                 ('provider', 'method', 'outcome'))
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class ProviderHealth:
+    """
+    Outcome tracking and circuit breaker for one provider.
+
+    `failure_threshold` consecutive failures (errors, timeouts or empty
+    results) open the circuit for `cooldown` seconds; after that a single
+    trial request is let through (half-open) and its outcome closes or
+    re-opens the circuit.
+    """
+
+    __slots__ = ('failure_threshold', 'cooldown', 'state', 'consecutive_failures', 'opened_at',
+                 'trial_inflight', 'successes', 'failures', 'latency_ewma', 'last_error')
+
+    def __init__(self, failure_threshold: int = 3, cooldown: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.trial_inflight = False
+        self.successes = 0
+        self.failures = 0
+        self.latency_ewma: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+    def available(self, now: float) -> bool:
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN and now - self.opened_at >= self.cooldown:
+            self.state = HALF_OPEN
+        return self.state == HALF_OPEN and not self.trial_inflight
+
+    def record_success(self, latency: float):
+        self.successes += 1
+        self.consecutive_failures = 0
+        self.state = CLOSED
+        self.trial_inflight = False
+        self.latency_ewma = latency if self.latency_ewma is None else 0.8 * self.latency_ewma + 0.2 * latency
+
+    def record_failure(self, error: str, now: float):
+        self.failures += 1
+        self.consecutive_failures += 1
+        self.last_error = error
+        self.trial_inflight = False
+        if self.state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            if self.state != OPEN:
+                logger.warning(f"Circuit opened after {self.consecutive_failures} failures: {error}")
+            self.state = OPEN
+            self.opened_at = now
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "successes": self.successes,
+            "failures": self.failures,
+            "consecutive_failures": self.consecutive_failures,
+            "latency_ms": round(self.latency_ewma * 1000, 1) if self.latency_ewma is not None else None,
+            "last_error": self.last_error
+        }
+
+
+class ProviderRegistry:
+    """
+    Named async data providers plus per-kind routing from DATA_PROVIDER_CONFIG.
+
+    `fetch(kind, method, ...)` calls the configured provider for `kind`
+    ('historical', 'options', ...). If it has not answered within the kind's
+    `hedge_after_ms` budget, or fails first, the fallback is started as
+    well and the first non-empty answer wins; the slower request is
+    cancelled. Providers whose circuit is open are skipped, so a dead
+    source costs nothing until its cooldown ends.
+    """
+
+    def __init__(self, config: Dict[str, Any], failure_threshold: int = 3, cooldown: float = 30.0):
+        self.config = config
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.providers: Dict[str, Any] = {}
+        self.health: Dict[str, ProviderHealth] = {}
+        # name -> None once initialized, or the error that stopped it
+        self.initialized: Dict[str, Optional[str]] = {}
+
+    def register(self, name: str, provider: Any):
+        self.providers[name] = provider
+        self.health[name] = ProviderHealth(self.failure_threshold, self.cooldown)
+
+    def get(self, name: str) -> Optional[Any]:
+        return self.providers.get(name)
+
+    def route(self, kind: str, method: Optional[str] = None) -> List[str]:
+        """Configured, registered providers for kind (implementing method, if given), primary first."""
+        section = self.config.get(kind)
+        if not isinstance(section, dict) or not section.get('enabled', True):
+            return []
+        names = []
+        for name in (section.get('provider'), section.get('fallback')):
+            provider = self.providers.get(name)
+            if provider is None or name in names:
+                continue
+            supports = getattr(provider, 'supports', None)
+            if method is None or (supports(method) if supports else callable(getattr(provider, method, None))):
+                names.append(name)
+        return names
+
+    async def _call(self, name: str, method: str, args: tuple) -> Any:
+        health = self.health[name]
+        started = time.monotonic()
+        labels = (name, method)
+        try:
+            result = await getattr(self.providers[name], method)(*args)
+        except asyncio.CancelledError:
+            health.trial_inflight = False
+            PROVIDER_CALLS.inc(labels + ('cancelled',))
+            raise
+        except Exception as e:
+            health.record_failure(f"{type(e).__name__}: {e}", time.monotonic())
+            logger.error(f"Provider {name}.{method} failed: {e}")
+            PROVIDER_CALLS.inc(labels + ('error',))
+            return None
+        elapsed = time.monotonic() - started
+        PROVIDER_SECONDS.observe(elapsed, labels)
+        if result:
+            health.record_success(elapsed)
+            PROVIDER_CALLS.inc(labels + ('ok',))
+        else:
+            health.record_failure("empty result", time.monotonic())
+            PROVIDER_CALLS.inc(labels + ('empty',))
+        return result
+
+    async def fetch(self, kind: str, method: str, *args) -> Any:
+        section = self.config.get(kind) or {}
+        hedge_after = section.get('hedge_after_ms', 1500) / 1000
+        deadline = time.monotonic() + section.get('timeout_seconds', 15)
+
+        names = self.route(kind, method)
+        now = time.monotonic()
+        candidates = [name for name in names if self.health[name].available(now)]
+        if not candidates:
+            # Every circuit is open: better a probe than a guaranteed miss.
+            candidates = names[:1]
+        if not candidates:
+            return None
+
+        pending: Dict[asyncio.Task, str] = {}
+
+        def launch():
+            name = candidates.pop(0)
+            if self.health[name].state == HALF_OPEN:
+                self.health[name].trial_inflight = True
+            pending[asyncio.create_task(self._call(name, method, args))] = name
+
+        launch()
+        try:
+            while pending:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    for task, name in pending.items():
+                        self.health[name].record_failure("timeout", time.monotonic())
+                    return None
+                wait = min(hedge_after, remaining) if candidates else remaining
+                done, _ = await asyncio.wait(pending, timeout=wait, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    pending.pop(task)
+                    result = task.result()
+                    if result:
+                        return result
+                # Hedge: the leader is over budget, or it came back empty.
+                if candidates:
+                    launch()
+            return None
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def routed(self) -> List[str]:
+        names = []
+        for kind in self.config:
+            for name in self.route(kind):
+                if name not in names:
+                    names.append(name)
+        return names
+
+    async def initialize(self, timeout: float = 30.0) -> Dict[str, Optional[str]]:
+        """Initialize every provider some route uses, concurrently; returns name -> error (None if ok)."""
+        async def init(name: str):
+            initialize = getattr(self.providers[name], 'initialize', None)
+            started = time.monotonic()
+            try:
+                if initialize is not None:
+                    await asyncio.wait_for(initialize(), timeout)
+                self.initialized[name] = None
+                logger.info(f"Provider {name} ready in {time.monotonic() - started:.2f}s")
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}" if str(e) else type(e).__name__
+                self.initialized[name] = error
+                logger.error(f"Provider {name} failed to initialize: {error}")
+
+        await asyncio.gather(*(init(name) for name in self.routed()))
+        return dict(self.initialized)
+
+    async def aclose(self):
+        for name, provider in self.providers.items():
+            close = getattr(provider, 'aclose', None)
+            if close is None:
+                continue
+            try:
+                await close()
+            except Exception as e:
+                logger.error(f"Error closing provider {name}: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "routes": {kind: self.route(kind) for kind, section in self.config.items()
+                       if isinstance(section, dict) and 'provider' in section},
+            "providers": {
+                name: {**health.stats(), "initialized": name in self.initialized and self.initialized[name] is None,
+                       "init_error": self.initialized.get(name)}
+                for name, health in self.health.items()
+            }
+        }
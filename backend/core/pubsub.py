@@ -0,0 +1,252 @@
+import asyncio
+import json
+import logging
+import os
+from typing import Awaitable, Callable, Dict, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# (bar_time or None, open, high, low, close, volume, ts_ms)
+Bar = Tuple[Optional[int], float, float, float, float, int, int]
+BarHandler = Callable[[str, Bar], Awaitable[None]]
+# (peer, symbol, wanted): a worker gained or lost interest in a symbol
+InterestHandler = Callable[[str, str, bool], Awaitable[None]]
+
+LOCAL_PEER = 'local'
+
+
+class LocalBus:
+    """
+    In-process feed bus (the default).
+
+    This process is always the feed: upstream bars go straight to its own
+    subscribers and its interest changes straight to its own DataEngine.
+    """
+
+    name = 'local'
+
+    def __init__(self):
+        self.is_leader = True
+        self.on_bar: Optional[BarHandler] = None
+        self.on_interest: Optional[InterestHandler] = None
+
+    async def start(self, on_bar: BarHandler, on_interest: InterestHandler):
+        self.on_bar = on_bar
+        self.on_interest = on_interest
+
+    async def stop(self):
+        pass
+
+    async def publish_bar(self, symbol: str, bar: Bar):
+        await self.on_bar(symbol, bar)
+
+    async def set_interest(self, symbol: str, wanted: bool):
+        await self.on_interest(LOCAL_PEER, symbol, wanted)
+
+    def stats(self) -> Dict:
+        return {"bus": self.name, "role": "feed"}
+
+
+def _frame(message: dict) -> bytes:
+    return json.dumps(message, separators=(',', ':')).encode() + b'\n'
+
+
+class UnixSocketBus:
+    """
+    Feed bus shared by the uvicorn workers on one host.
+
+    Workers race for an exclusive flock on `lock_path`; the winner becomes the
+    feed, owns the upstream streams and serves `socket_path`. Every other
+    worker connects as a follower, forwards the symbols its clients want and
+    receives each bar as a JSON line to fan out locally. The kernel drops the
+    lock when the feed process exits, so a follower that loses its
+    connection simply re-runs the election and either takes over or
+    reconnects and re-sends its interest set.
+    """
+
+    name = 'unix'
+
+    def __init__(self, socket_path: str, lock_path: str, retry_seconds: float = 1.0,
+                 max_peer_buffer: int = 4 * 1024 * 1024):
+        self.socket_path = socket_path
+        self.lock_path = lock_path
+        self.retry_seconds = retry_seconds
+        self.max_peer_buffer = max_peer_buffer
+        self.is_leader = False
+        self.lock_fd: Optional[int] = None
+        self.server: Optional[asyncio.AbstractServer] = None
+        self.peers: Dict[str, asyncio.StreamWriter] = {}
+        self.peer_seq = 0
+        self.upstream: Optional[asyncio.StreamWriter] = None
+        self.interest: Set[str] = set()
+        self.task: Optional[asyncio.Task] = None
+        self.on_bar: Optional[BarHandler] = None
+        self.on_interest: Optional[InterestHandler] = None
+
+    async def start(self, on_bar: BarHandler, on_interest: InterestHandler):
+        self.on_bar = on_bar
+        self.on_interest = on_interest
+        if self.task is None:
+            self.task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+        for writer in list(self.peers.values()):
+            writer.close()
+        self.peers.clear()
+        if self.server:
+            self.server.close()
+            self.server = None
+            try:
+                os.unlink(self.socket_path)
+            except OSError:
+                pass
+        if self.upstream:
+            self.upstream.close()
+            self.upstream = None
+        if self.lock_fd is not None:
+            os.close(self.lock_fd)
+            self.lock_fd = None
+
+    def _try_lock(self) -> bool:
+        import fcntl
+
+        fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        self.lock_fd = fd
+        return True
+
+    async def _run(self):
+        while True:
+            if self._try_lock():
+                await self._lead()
+                return
+            try:
+                await self._follow()
+            except (ConnectionError, FileNotFoundError, OSError) as e:
+                logger.debug(f"Feed bus connection unavailable: {e}")
+            except Exception as e:
+                # Anything else must not end the task: this worker would never get bars or lead again
+                logger.error(f"Feed bus follower failed: {e}")
+            await asyncio.sleep(self.retry_seconds)
+
+    async def _lead(self):
+        try:
+            os.unlink(self.socket_path)
+        except OSError:
+            pass
+        self.server = await asyncio.start_unix_server(self._serve_peer, path=self.socket_path)
+        self.is_leader = True
+        logger.info(f"Elected feed process (pid {os.getpid()}) on {self.socket_path}")
+        for symbol in list(self.interest):
+            await self.on_interest(LOCAL_PEER, symbol, True)
+
+    async def _serve_peer(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.peer_seq += 1
+        peer = f"peer-{self.peer_seq}"
+        self.peers[peer] = writer
+        symbols: Set[str] = set()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                message = json.loads(line)
+                if message.get('t') != 'interest':
+                    continue
+                symbol, wanted = message['s'], bool(message['on'])
+                if wanted:
+                    symbols.add(symbol)
+                else:
+                    symbols.discard(symbol)
+                await self.on_interest(peer, symbol, wanted)
+        except asyncio.CancelledError:
+            pass
+        except ConnectionError as e:
+            logger.debug(f"Feed bus {peer} disconnected: {e}")
+        except Exception as e:
+            # Malformed frame or a failing interest handler: drop this peer, keep serving the rest.
+            logger.warning(f"Dropping feed bus {peer}: {type(e).__name__}: {e}")
+        finally:
+            self.peers.pop(peer, None)
+            writer.close()
+            for symbol in symbols:
+                await self.on_interest(peer, symbol, False)
+
+    async def _follow(self):
+        reader, writer = await asyncio.open_unix_connection(self.socket_path)
+        self.upstream = writer
+        logger.info(f"Following feed process on {self.socket_path}")
+        try:
+            for symbol in list(self.interest):
+                writer.write(_frame({"t": "interest", "s": symbol, "on": True}))
+            await writer.drain()
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    message = json.loads(line)
+                    if message.get('t') != 'bar':
+                        continue
+                    symbol, bar = message['s'], tuple(message['b'])
+                except (ValueError, KeyError, TypeError, AttributeError) as e:
+                    logger.warning(f"Skipping malformed feed bus frame: {e}")
+                    continue
+                try:
+                    await self.on_bar(symbol, bar)
+                except Exception as e:
+                    logger.error(f"Error handling feed bus bar for {symbol}: {e}")
+        finally:
+            self.upstream = None
+            writer.close()
+            logger.warning("Lost connection to feed process")
+
+    async def publish_bar(self, symbol: str, bar: Bar):
+        if self.peers:
+            frame = _frame({"t": "bar", "s": symbol, "b": bar})
+            for peer, writer in list(self.peers.items()):
+                if writer.transport.get_write_buffer_size() > self.max_peer_buffer:
+                    # A stalled worker reconnects and re-sends its interest set.
+                    logger.warning(f"Dropping stalled feed bus {peer}")
+                    self.peers.pop(peer, None)
+                    writer.close()
+                    continue
+                writer.write(frame)
+        await self.on_bar(symbol, bar)
+
+    async def set_interest(self, symbol: str, wanted: bool):
+        if wanted:
+            self.interest.add(symbol)
+        else:
+            self.interest.discard(symbol)
+        if self.is_leader:
+            await self.on_interest(LOCAL_PEER, symbol, wanted)
+        elif self.upstream is not None:
+            self.upstream.write(_frame({"t": "interest", "s": symbol, "on": wanted}))
+
+    def stats(self) -> Dict:
+        return {
+            "bus": self.name,
+            "role": "feed" if self.is_leader else "follower",
+            "pid": os.getpid(),
+            "peers": len(self.peers) if self.is_leader else None,
+            "connected": self.is_leader or self.upstream is not None
+        }
+
+
+def create_bus(config: Dict):
+    if config.get('bus', 'local') == 'unix':
+        return UnixSocketBus(
+            socket_path=config['socket_path'],
+            lock_path=config['lock_path'],
+            retry_seconds=config.get('retry_seconds', 1.0)
+        )
+    return LocalBus()
@@ -0,0 +1,301 @@
+import math
+from typing import Dict, List, Optional
+
+import numpy as np
+
+INTERVAL_SECONDS = {
+    '1': 60,
+    '3': 180,
+    '5': 300,
+    '15': 900,
+    '30': 1800,
+    '60': 3600,
+    'D': 86400
+}
+
+# NSE cash session, 09:15-15:30 IST, as seconds past midnight UTC
+NSE_SESSION_OPEN_UTC = 3 * 3600 + 45 * 60
+NSE_SESSION_CLOSE_UTC = 10 * 3600
+SESSION_MINUTES = (NSE_SESSION_CLOSE_UTC - NSE_SESSION_OPEN_UTC) // 60
+
+
+def interval_to_seconds(interval: str) -> int:
+    if interval in INTERVAL_SECONDS:
+        return INTERVAL_SECONDS[interval]
+    return int(interval) * 60 if interval.isdigit() else 3600
+
+
+def session_bucket(ts: int, seconds: int) -> int:
+    """Start of the `seconds`-wide bucket holding ts, with buckets anchored at the NSE open."""
+    return ts - ((ts - NSE_SESSION_OPEN_UTC) % seconds)
+
+
+def _weekday(ts: int) -> int:
+    # 1970-01-01 was a Thursday; 0 = Monday
+    return (ts // 86400 + 3) % 7
+
+
+def is_market_open(ts: int) -> bool:
+    """NSE cash session check on weekdays (exchange holidays are not modelled)."""
+    return _weekday(ts) < 5 and NSE_SESSION_OPEN_UTC <= ts % 86400 < NSE_SESSION_CLOSE_UTC
+
+
+def last_session_close(ts: int) -> int:
+    """Epoch seconds of the most recent weekday 15:30 IST close at or before ts."""
+    close = ts - ts % 86400 + NSE_SESSION_CLOSE_UTC
+    if close > ts:
+        close -= 86400
+    while _weekday(close) >= 5:
+        close -= 86400
+    return close
+
+
+def is_fresh(last_bar_time: int, interval: str, now: int) -> bool:
+    """Whether stored history ending at last_bar_time can be served without refetching."""
+    seconds = interval_to_seconds(interval)
+    if now - last_bar_time <= 2 * seconds:
+        return True
+    if is_market_open(now):
+        return False
+    # Market closed: fine as long as it reaches the last session's close.
+    return last_bar_time + seconds >= last_session_close(now) - seconds
+
+
+def has_gaps(times, interval: str) -> bool:
+    """
+    Whether intraday bars are missing between the first and last of times
+    (ascending epoch seconds). The only jump allowed is from a session's
+    last bar to a later day's opening bar; daily bars are not checked.
+    """
+    seconds = interval_to_seconds(interval)
+    if len(times) < 2 or not is_intraday(interval):
+        return False
+    t = np.asarray(times, dtype=np.int64)
+    jump = np.diff(t) > seconds
+    if not jump.any():
+        return False
+    prev, following = t[:-1][jump], t[1:][jump]
+    closed = prev % 86400 + seconds >= NSE_SESSION_CLOSE_UTC
+    opened = following % 86400 == NSE_SESSION_OPEN_UTC
+    return not (closed & opened & (following // 86400 > prev // 86400)).all()
+
+
+def is_intraday(interval: str) -> bool:
+    """Intervals shorter than one session, which can be derived from 1-minute bars."""
+    return interval_to_seconds(interval) < SESSION_MINUTES * 60
+
+
+def base_minutes_needed(interval: str, n_bars: int) -> int:
+    """1-minute bars required to derive n_bars of interval, counting whole sessions."""
+    seconds = interval_to_seconds(interval)
+    if seconds <= 60:
+        return n_bars
+    bars_per_session = math.ceil(SESSION_MINUTES * 60 / seconds)
+    # One extra session covers the partially formed current day.
+    return (math.ceil(n_bars / bars_per_session) + 1) * SESSION_MINUTES
+
+
+class BarSeries:
+    """
+    Columnar OHLCV series for one (symbol, interval).
+
+    Parallel NumPy arrays with spare capacity, so appending a bar or updating
+    the forming one is O(1) amortized. `session_aligned` series bucket bars
+    from the NSE open; others continue the spacing of their last seeded bar
+    (daily bars and anything fetched directly from upstream).
+    """
+
+    __slots__ = ('interval', 'interval_seconds', 'session_aligned', 'seeded_bars', 'size',
+                 'time', 'open', 'high', 'low', 'close', 'volume')
+
+    def __init__(self, interval: str, seeded_bars: int = 0, capacity: int = 256, session_aligned: bool = False):
+        self.interval = interval
+        self.interval_seconds = interval_to_seconds(interval)
+        self.session_aligned = session_aligned
+        self.seeded_bars = seeded_bars
+        self.size = 0
+        self.time = np.zeros(capacity, dtype=np.int64)
+        self.open = np.zeros(capacity, dtype=np.float64)
+        self.high = np.zeros(capacity, dtype=np.float64)
+        self.low = np.zeros(capacity, dtype=np.float64)
+        self.close = np.zeros(capacity, dtype=np.float64)
+        self.volume = np.zeros(capacity, dtype=np.float64)
+
+    @classmethod
+    def from_arrays(cls, interval: str, time, open_, high, low, close, volume,
+                    seeded_bars: int, session_aligned: bool = False) -> 'BarSeries':
+        n = len(time)
+        series = cls(interval, seeded_bars, capacity=max(256, n + n // 4), session_aligned=session_aligned)
+        series.time[:n] = time
+        series.open[:n] = open_
+        series.high[:n] = high
+        series.low[:n] = low
+        series.close[:n] = close
+        series.volume[:n] = volume
+        series.size = n
+        return series
+
+    @classmethod
+    def from_candles(cls, interval: str, candles: List[dict], session_aligned: bool = False) -> 'BarSeries':
+        """Series seeded from upstream candles; seeded_bars is the number of usable rows received."""
+        rows = [(c['time'], c['open'], c['high'], c['low'], c['close'], c['volume'])
+                for c in candles if isinstance(c.get('time'), (int, float))]
+        matrix = np.array(rows, dtype=np.float64).reshape(len(rows), 6)
+        return cls.from_arrays(interval, matrix[:, 0].astype(np.int64), matrix[:, 1], matrix[:, 2],
+                               matrix[:, 3], matrix[:, 4], matrix[:, 5], len(rows), session_aligned)
+
+    def __len__(self) -> int:
+        return self.size
+
+    def _columns(self):
+        return (self.time, self.open, self.high, self.low, self.close, self.volume)
+
+    def _grow(self):
+        capacity = len(self.time) * 2
+        for name in ('time', 'open', 'high', 'low', 'close', 'volume'):
+            column = getattr(self, name)
+            grown = np.zeros(capacity, dtype=column.dtype)
+            grown[:self.size] = column[:self.size]
+            setattr(self, name, grown)
+
+    def append(self, bar_time: int, open_: float, high: float, low: float, close: float, volume: float):
+        if self.size == len(self.time):
+            self._grow()
+        i = self.size
+        self.time[i] = bar_time
+        self.open[i] = open_
+        self.high[i] = high
+        self.low[i] = low
+        self.close[i] = close
+        self.volume[i] = volume
+        self.size += 1
+
+    def put(self, bar_time: int, open_: float, high: float, low: float, close: float, volume: float):
+        """Insert or overwrite the bar at bar_time (exact snapshots, e.g. the 1-minute base)."""
+        if self.size and self.time[self.size - 1] == bar_time:
+            i = self.size - 1
+            self.high[i] = high
+            self.low[i] = low
+            self.close[i] = close
+            self.volume[i] = volume
+        elif not self.size or bar_time > self.time[self.size - 1]:
+            self.append(bar_time, open_, high, low, close, volume)
+
+    def apply(self, bar_time: int, open_: float, high: float, low: float, close: float,
+              volume: float, volume_delta: Optional[float]):
+        """Fold a 1-minute snapshot into the forming bar, opening a new bar when it crosses a bucket."""
+        if not self.size:
+            return
+        i = self.size - 1
+        last_time = int(self.time[i])
+        if bar_time < last_time:
+            return
+        if self.session_aligned:
+            bucket = session_bucket(bar_time, self.interval_seconds)
+        else:
+            # Continue the spacing of the upstream history (daily bars etc.).
+            bucket = last_time + ((bar_time - last_time) // self.interval_seconds) * self.interval_seconds
+        if bucket == last_time:
+            if high > self.high[i]:
+                self.high[i] = high
+            if low < self.low[i]:
+                self.low[i] = low
+            self.close[i] = close
+            if volume_delta is not None:
+                self.volume[i] += volume_delta
+        elif bucket > last_time:
+            self.append(bucket, open_, high, low, close, volume)
+
+    def trim(self, max_bars: int):
+        if self.size <= max_bars:
+            return
+        drop = self.size - max_bars
+        for column in self._columns():
+            column[:max_bars] = column[drop:self.size]
+        self.size = max_bars
+
+    def last_close(self) -> Optional[float]:
+        return float(self.close[self.size - 1]) if self.size else None
+
+    def columns(self, n_bars: int) -> Dict[str, list]:
+        """The last n_bars as {"time": [...], "open": [...], ...}, straight from the arrays."""
+        start = max(self.size - n_bars, 0)
+        end = self.size
+        return {
+            "time": self.time[start:end].tolist(),
+            "open": self.open[start:end].tolist(),
+            "high": self.high[start:end].tolist(),
+            "low": self.low[start:end].tolist(),
+            "close": self.close[start:end].tolist(),
+            "volume": self.volume[start:end].astype(np.int64).tolist()
+        }
+
+    def candles(self, n_bars: int) -> List[dict]:
+        start = max(self.size - n_bars, 0)
+        end = self.size
+        return [
+            {"time": t, "open": o, "high": h, "low": l, "close": c, "volume": v}
+            for t, o, h, l, c, v in zip(
+                self.time[start:end].tolist(), self.open[start:end].tolist(), self.high[start:end].tolist(),
+                self.low[start:end].tolist(), self.close[start:end].tolist(),
+                self.volume[start:end].astype(np.int64).tolist()
+            )
+        ]
+
+
+def resample(base: BarSeries, interval: str, seeded_bars: int) -> BarSeries:
+    """Aggregate a 1-minute series into session-aligned `interval` bars in one vectorized pass."""
+    seconds = interval_to_seconds(interval)
+    n = base.size
+    if n == 0:
+        return BarSeries(interval, seeded_bars, session_aligned=True)
+    t = base.time[:n]
+    buckets = t - ((t - NSE_SESSION_OPEN_UTC) % seconds)
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], n] - 1
+    return BarSeries.from_arrays(
+        interval,
+        buckets[starts],
+        base.open[:n][starts],
+        np.maximum.reduceat(base.high[:n], starts),
+        np.minimum.reduceat(base.low[:n], starts),
+        base.close[:n][ends],
+        np.add.reduceat(base.volume[:n], starts),
+        seeded_bars,
+        session_aligned=True
+    )
+
+
+class SymbolBars:
+    """
+    One symbol's 1-minute base series plus every intraday timeframe derived from it.
+
+    Derived timeframes are built by `resample` on first use and then kept
+    current from each 1-minute snapshot in O(1) per timeframe, so switching
+    timeframe never goes upstream.
+    """
+
+    __slots__ = ('base', 'derived')
+
+    def __init__(self, base: BarSeries):
+        self.base = base
+        self.derived: Dict[str, BarSeries] = {}
+
+    def timeframe(self, interval: str) -> BarSeries:
+        if interval == '1':
+            return self.base
+        series = self.derived.get(interval)
+        if series is None:
+            series = self.derived[interval] = resample(self.base, interval, self.base.seeded_bars)
+        return series
+
+    def apply(self, bar_time: int, open_: float, high: float, low: float, close: float,
+              volume: float, volume_delta: Optional[float]):
+        self.base.put(bar_time, open_, high, low, close, volume)
+        for series in self.derived.values():
+            series.apply(bar_time, open_, high, low, close, volume, volume_delta)
+
+    def trim(self, max_bars: int, max_base_bars: int):
+        self.base.trim(max_base_bars)
+        for series in self.derived.values():
+            series.trim(max_bars)
@@ -0,0 +1,80 @@
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+STARTING = 'starting'
+READY = 'ready'
+DEGRADED = 'degraded'
+
+Warmup = Tuple[str, Callable[[], Awaitable[Any]]]
+
+
+class StartupPhase:
+    """
+    Background startup: initialize providers concurrently, then warm caches.
+
+    Runs as a task from lifespan so the server accepts connections at once;
+    a request that arrives early joins the same in-flight initialization
+    instead of starting its own. `/api/health` reports the state: 'starting'
+    until everything has finished, then 'ready', or 'degraded' when a
+    provider or warm-up failed.
+    """
+
+    def __init__(self, concurrency: int = 4):
+        self.concurrency = concurrency
+        self.state = STARTING
+        self.started_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.providers: Dict[str, Optional[str]] = {}
+        self.warmed: Dict[str, Optional[str]] = {}
+        self.task: Optional[asyncio.Task] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.state != STARTING
+
+    def start(self, warmups: List[Warmup],
+              initialize: Optional[Callable[[], Awaitable[Dict[str, Optional[str]]]]] = None):
+        if self.task is None:
+            self.task = asyncio.create_task(self._run(initialize, warmups))
+
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+
+    async def _run(self, initialize, warmups: List[Warmup]):
+        if initialize is not None:
+            try:
+                self.providers = await initialize()
+            except Exception as e:
+                logger.error(f"Provider initialization failed: {e}")
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def warm(name: str, load: Callable[[], Awaitable[Any]]):
+            async with semaphore:
+                try:
+                    result = await load()
+                    self.warmed[name] = None if result else "empty result"
+                except Exception as e:
+                    self.warmed[name] = f"{type(e).__name__}: {e}"
+
+        await asyncio.gather(*(warm(name, load) for name, load in warmups))
+        failed = [name for name, error in {**self.providers, **self.warmed}.items() if error]
+        self.state = DEGRADED if failed else READY
+        self.finished_at = time.time()
+        logger.info(f"Startup {self.state} in {self.finished_at - self.started_at:.2f}s"
+                    + (f" (failed: {', '.join(failed)})" if failed else ""))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "status": self.state,
+            "uptime_seconds": round(time.time() - self.started_at, 1),
+            "startup_seconds": round(self.finished_at - self.started_at, 2) if self.finished_at else None,
+            "providers": {name: error or "ok" for name, error in self.providers.items()},
+            "warmup": {name: error or "ok" for name, error in self.warmed.items()}
+        }
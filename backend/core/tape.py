@@ -0,0 +1,211 @@
+"""
+Append-only recording of upstream market data ("tapes"), for replay.
+
+    python -m core.tape recordings/20260105-091500-1234.tape   # summary
+
+Layout: the MAGIC header, then records of
+
+    <B kind><I payload length><q ts_ms> payload
+
+    SYMBOL  <H id> utf-8 name            (once per symbol, before its first use)
+    BAR     <H id><q bar_time><4d ohlc><q volume>
+    CHAIN   <H id> zlib(JSON option chain)
+
+All little-endian. A record cut short by a crash is ignored on read.
+"""
+import asyncio
+import json
+import logging
+import mmap
+import os
+import struct
+import sys
+import time
+import zlib
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from config import REPLAY_CONFIG
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'TAPE\x01\x00'
+SYMBOL, BAR, CHAIN = 1, 2, 3
+
+HEADER = struct.Struct('<BIq')
+SYMBOL_ID = struct.Struct('<H')
+BAR_BODY = struct.Struct('<Hq4dq')
+
+# (kind, ts_ms, symbol, payload): payload is (bar_time, open, high, low, close, volume)
+# for BAR and the compressed chain bytes for CHAIN (see decode_chain)
+Record = Tuple[int, int, str, Any]
+
+
+def decode_chain(payload: bytes) -> Dict[str, Any]:
+    return json.loads(zlib.decompress(payload))
+
+
+class TapeRecorder:
+    """
+    Records every upstream bar and option-chain snapshot to a tape.
+
+    Recording calls only pack into an in-memory buffer; a background task
+    hands the buffer to a thread for the file write every `flush_interval`
+    seconds, so the tick path never blocks on disk. Each start opens a new
+    file, `<record_dir>/<utc time>-<pid>.tape`.
+    """
+
+    def __init__(self, record_dir: str, flush_interval: float = 1.0):
+        self.record_dir = record_dir
+        self.flush_interval = flush_interval
+        self.path: Optional[str] = None
+        self.file = None
+        self.buffer = bytearray()
+        self.symbol_ids: Dict[str, int] = {}
+        self.records = 0
+        self.bytes_written = 0
+        self.task: Optional[asyncio.Task] = None
+
+    @property
+    def active(self) -> bool:
+        return self.file is not None
+
+    def start(self):
+        if self.file is not None:
+            return
+        os.makedirs(self.record_dir, exist_ok=True)
+        stamp = datetime.now(timezone.utc).strftime('%Y%m%d-%H%M%S')
+        self.path = os.path.join(self.record_dir, f"{stamp}-{os.getpid()}.tape")
+        self.file = open(self.path, 'ab')
+        self.buffer += MAGIC
+        self.task = asyncio.create_task(self._run())
+        logger.info(f"Recording market data to {self.path}")
+
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+        if self.file is not None:
+            await self.flush()
+            self.file.close()
+            self.file = None
+            logger.info(f"Closed tape {self.path}: {self.records} records, {self.bytes_written} bytes")
+
+    def _symbol_id(self, symbol: str, ts_ms: int) -> int:
+        symbol_id = self.symbol_ids.get(symbol)
+        if symbol_id is None:
+            symbol_id = self.symbol_ids[symbol] = len(self.symbol_ids)
+            self._append(SYMBOL, ts_ms, SYMBOL_ID.pack(symbol_id) + symbol.encode())
+        return symbol_id
+
+    def _append(self, kind: int, ts_ms: int, payload: bytes):
+        self.buffer += HEADER.pack(kind, len(payload), ts_ms)
+        self.buffer += payload
+        self.records += 1
+
+    def record_bar(self, symbol: str, ts_ms: int, bar_time: int, open_: float, high: float, low: float,
+                   close: float, volume: int):
+        if self.file is None:
+            return
+        symbol_id = self._symbol_id(symbol, ts_ms)
+        self._append(BAR, ts_ms, BAR_BODY.pack(symbol_id, bar_time, open_, high, low, close, volume))
+
+    def record_chain(self, symbol: str, chain: Dict[str, Any]):
+        if self.file is None:
+            return
+        ts_ms = int(time.time() * 1000)
+        symbol_id = self._symbol_id(symbol, ts_ms)
+        body = zlib.compress(json.dumps(chain, separators=(',', ':'), default=str).encode(), 6)
+        self._append(CHAIN, ts_ms, SYMBOL_ID.pack(symbol_id) + body)
+
+    def _write(self, data: bytes):
+        self.file.write(data)
+        self.file.flush()
+
+    async def flush(self):
+        if not self.buffer or self.file is None:
+            return
+        data, self.buffer = bytes(self.buffer), bytearray()
+        await asyncio.to_thread(self._write, data)
+        self.bytes_written += len(data)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except OSError as e:
+                logger.error(f"Tape write failed: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "recording": self.active,
+            "path": self.path,
+            "records": self.records,
+            "bytes_written": self.bytes_written,
+            "buffered_bytes": len(self.buffer)
+        }
+
+
+class TapeReader:
+    """Sequential reader over a memory-mapped tape; records are decoded straight from the map."""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def __iter__(self) -> Iterator[Record]:
+        with open(self.path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size < len(MAGIC):
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                if data[:len(MAGIC)] != MAGIC:
+                    raise ValueError(f"{self.path} is not a tape")
+                yield from self._records(data)
+
+    @staticmethod
+    def _records(data) -> Iterator[Record]:
+        symbols: Dict[int, str] = {}
+        offset = len(MAGIC)
+        end = len(data)
+        header_size = HEADER.size
+        while offset + header_size <= end:
+            kind, length, ts_ms = HEADER.unpack_from(data, offset)
+            start = offset + header_size
+            offset = start + length
+            if offset > end:
+                break
+            if kind == BAR:
+                symbol_id, *bar = BAR_BODY.unpack_from(data, start)
+                yield BAR, ts_ms, symbols[symbol_id], bar
+            elif kind == CHAIN:
+                (symbol_id,) = SYMBOL_ID.unpack_from(data, start)
+                yield CHAIN, ts_ms, symbols[symbol_id], data[start + SYMBOL_ID.size:offset]
+            elif kind == SYMBOL:
+                (symbol_id,) = SYMBOL_ID.unpack_from(data, start)
+                symbols[symbol_id] = data[start + SYMBOL_ID.size:offset].decode()
+
+    def summary(self) -> Dict[str, Any]:
+        counts: Dict[str, Dict[str, int]] = {}
+        first = last = None
+        for kind, ts_ms, symbol, _ in self:
+            first = ts_ms if first is None else first
+            last = ts_ms
+            entry = counts.setdefault(symbol, {"bars": 0, "chains": 0})
+            entry["bars" if kind == BAR else "chains"] += 1
+        return {
+            "path": self.path,
+            "bytes": os.path.getsize(self.path),
+            "start_ms": first,
+            "end_ms": last,
+            "duration_seconds": round((last - first) / 1000, 1) if first is not None else 0,
+            "symbols": counts
+        }
+
+
+tape_recorder = TapeRecorder(REPLAY_CONFIG['record_dir'], REPLAY_CONFIG['flush_interval_seconds'])
+
+
+if __name__ == '__main__':
+    for path in sys.argv[1:]:
+        print(json.dumps(TapeReader(path).summary(), indent=2))
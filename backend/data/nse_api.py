@@ -1,63 +1,169 @@
-import requests
+import asyncio
+import httpx
 import random
 import time
 import logging
-from typing import Dict, Any, Optional
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional
+
+from core.metrics import UPSTREAM_HTTP_ERRORS, UPSTREAM_HTTP_SECONDS
+
+try:
+    import h2  # noqa: F401 - enables HTTP/2 in httpx
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
 
 logger = logging.getLogger(__name__)
 
-_SESSION = requests.Session()
 
-def requests_get_with_retry(url, headers=None, cookies=None, max_retries=4, backoff_factor=1.0, timeout=10):
-    last_exc = None
-    for attempt in range(1, max_retries + 1):
-        try:
-            resp = _SESSION.get(url, headers=headers, cookies=cookies, timeout=timeout)
-            if resp.status_code == 200:
-                return resp
-            else:
-                resp.raise_for_status()
-        except Exception as exc:
-            last_exc = exc
-            sleep_seconds = backoff_factor * (2 ** (attempt - 1)) + random.uniform(0, 0.5)
-            logger.warning(f"Request to {url} failed (attempt {attempt}/{max_retries}): {exc}. Retrying in {sleep_seconds:.1f}s")
-            time.sleep(sleep_seconds)
-            continue
-    raise last_exc
-
-def get_nse_cookies():
-    baseurl = "https://www.nseindia.com/"
-    headers = {
-        'user-agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/80.0.3987.149 Safari/537.36',
-        'accept-language': 'en,gu;q=0.9,hi;q=0.8',
+def _retryable(exc: Exception) -> bool:
+    """Transport failures, throttling and server errors; any other 4xx will not change on retry."""
+    if isinstance(exc, httpx.HTTPStatusError):
+        status = exc.response.status_code
+        return status == 429 or status >= 500
+    return isinstance(exc, httpx.TransportError)
+
+
+class NSEAPI:
+    BASE_URL = "https://www.nseindia.com"
+    INDICES = {"NIFTY", "BANKNIFTY", "FINNIFTY", "MIDCPNIFTY", "NIFTYNXT50"}
+    SYMBOL_ALIASES = {
+        'NIFTY 50': 'NIFTY',
+        'BANK NIFTY': 'BANKNIFTY',
+        'CNXFINANCE': 'FINNIFTY',
+        'FIN NIFTY': 'FINNIFTY'
     }
-    try:
-        resp = requests_get_with_retry(baseurl, headers=headers, max_retries=3, backoff_factor=0.8, timeout=8)
-        return dict(resp.cookies)
-    except Exception as e:
-        logger.warning(f"Failed to get NSE cookies: {e}")
-        return {}
-
-def fetch_nse_oi_data(symbol="NIFTY"):
-    try:
-        cookies = get_nse_cookies()
-        if symbol in ["NIFTY", "BANKNIFTY", "CNXFINANCE"]:
-            url = f"https://www.nseindia.com/api/option-chain-indices?symbol={symbol}"
-        else:
-            url = f"https://www.nseindia.com/api/option-chain-equities?symbol={symbol}"
-
-        headers = {
-            'user-agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/80.0.3987.149 Safari/537.36',
+
+    def __init__(self):
+        self.headers = {
+            'user-agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
             'accept-language': 'en,gu;q=0.9,hi;q=0.8',
             'referer': 'https://www.nseindia.com/market-data/option-chain',
         }
+        self.client: Optional[httpx.AsyncClient] = None
+        self.cookie_lock = asyncio.Lock()
+        # Bumped on every cookie refresh so concurrent 401/403s trigger one refresh, not N.
+        self.cookie_generation = 0
+
+    def _client(self) -> httpx.AsyncClient:
+        # The client's cookie jar carries the NSE session cookies between requests.
+        if self.client is None or self.client.is_closed:
+            self.client = httpx.AsyncClient(
+                http2=HTTP2_AVAILABLE,
+                headers=self.headers,
+                limits=httpx.Limits(max_connections=10, max_keepalive_connections=5),
+                timeout=10,
+                follow_redirects=True
+            )
+        return self.client
+
+    async def aclose(self):
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+            self.cookie_generation = 0
+
+    async def initialize(self):
+        """Open the pooled client and fetch session cookies before the first chain request."""
+        if self.cookie_generation == 0:
+            await self._refresh_cookies(0)
 
-        resp = requests_get_with_retry(url, headers=headers, cookies=cookies, max_retries=4, backoff_factor=0.8, timeout=10)
-        return resp.json()
-    except Exception as e:
-        logger.error(f"Error fetching NSE OI data for {symbol}: {e}")
-        return None
+    async def _refresh_cookies(self, seen_generation: int):
+        async with self.cookie_lock:
+            if self.cookie_generation != seen_generation:
+                return  # another request refreshed while we waited
+            client = self._client()
+            client.cookies.clear()
+            resp = await client.get(f"{self.BASE_URL}/", timeout=8)
+            resp.raise_for_status()
+            self.cookie_generation += 1
+            logger.debug(f"Refreshed NSE cookies (generation {self.cookie_generation})")
+
+    async def get_json(self, url: str, max_retries: int = 4, backoff_factor: float = 0.8) -> Any:
+        last_exc = None
+        labels = ('nse', url.split('?', 1)[0].rsplit('/', 1)[-1] or '/')
+        for attempt in range(1, max_retries + 1):
+            started = time.perf_counter()
+            try:
+                if self.cookie_generation == 0:
+                    await self._refresh_cookies(0)
+                generation = self.cookie_generation
+                resp = await self._client().get(url)
+                if resp.status_code in (401, 403):
+                    # Session cookies expired: refresh them and retry straight away.
+                    await self._refresh_cookies(generation)
+                    resp = await self._client().get(url)
+                resp.raise_for_status()
+                UPSTREAM_HTTP_SECONDS.observe(time.perf_counter() - started, labels)
+                return resp.json()
+            except Exception as exc:
+                last_exc = exc
+                UPSTREAM_HTTP_ERRORS.inc(labels)
+                if attempt == max_retries or not _retryable(exc):
+                    break
+                sleep_seconds = backoff_factor * (2 ** (attempt - 1)) + random.uniform(0, 0.5)
+                logger.warning(f"Request to {url} failed (attempt {attempt}/{max_retries}): {exc}. Retrying in {sleep_seconds:.1f}s")
+                await asyncio.sleep(sleep_seconds)
+        raise last_exc
+
+    def _nse_symbol(self, symbol: str) -> str:
+        clean_symbol = symbol.upper().replace("NSE:", "").strip()
+        return self.SYMBOL_ALIASES.get(clean_symbol, clean_symbol)
+
+    async def fetch_oi_data(self, symbol: str = "NIFTY") -> Optional[Dict[str, Any]]:
+        nse_symbol = self._nse_symbol(symbol)
+        kind = "indices" if nse_symbol in self.INDICES else "equities"
+        url = f"{self.BASE_URL}/api/option-chain-{kind}?symbol={nse_symbol}"
+        try:
+            return await self.get_json(url)
+        except Exception as e:
+            logger.error(f"Error fetching NSE OI data for {symbol}: {e}")
+            return None
+
+    @staticmethod
+    def expiries(data: Dict[str, Any]) -> List[str]:
+        return (data or {}).get('records', {}).get('expiryDates', []) or []
+
+    @staticmethod
+    def normalize_oi_data(data: Dict[str, Any], symbol: str, expiry: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Map an NSE option-chain response onto the strike schema of generate_mock_oi_data."""
+        records = (data or {}).get('records') or {}
+        rows = records.get('data') or []
+        if not rows:
+            return None
+        expiries = records.get('expiryDates') or []
+        if expiry is None and expiries:
+            expiry = expiries[0]
+
+        strikes = []
+        for row in rows:
+            if expiry is not None and row.get('expiryDate') != expiry:
+                continue
+            ce = row.get('CE') or {}
+            pe = row.get('PE') or {}
+            strike = float(row.get('strikePrice', 0))
+            strikes.append({
+                "strike": int(strike) if strike.is_integer() else strike,
+                "ce_oi": int(ce.get('openInterest') or 0),
+                "pe_oi": int(pe.get('openInterest') or 0),
+                "ce_change": int(ce.get('changeinOpenInterest') or 0),
+                "pe_change": int(pe.get('changeinOpenInterest') or 0),
+                "ce_ltp": float(ce.get('lastPrice') or 0),
+                "pe_ltp": float(pe.get('lastPrice') or 0),
+            })
+        strikes.sort(key=lambda s: s["strike"])
+        total_ce_oi = sum(s["ce_oi"] for s in strikes)
+        total_pe_oi = sum(s["pe_oi"] for s in strikes)
+        return {
+            "symbol": symbol,
+            "expiry": expiry,
+            "expiries": expiries,
+            "spot": records.get('underlyingValue'),
+            "pcr": round(total_pe_oi / total_ce_oi if total_ce_oi > 0 else 0, 2),
+            "strikes": strikes,
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "source": "nse"
+        }
 
-nse_api = {
-    'fetch_oi_data': fetch_nse_oi_data
-}
+nse_api = NSEAPI()
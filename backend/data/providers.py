@@ -0,0 +1,139 @@
+import logging
+from abc import ABC
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from config import DATA_PROVIDER_CONFIG
+from core.cache import TTLCache
+from core.option_chain import IST, seconds_until_ist_midnight
+from core.provider_registry import ProviderRegistry
+
+logger = logging.getLogger(__name__)
+
+
+class DataProvider(ABC):
+    """
+    Async market-data source (see LIVE_DATA_INTEGRATION.md).
+
+    Providers override the methods they support; the registry routes each
+    request kind only to providers that do. Candles are lists
+    of {"time", "open", "high", "low", "close", "volume"} dicts and option
+    chains use the strike schema of generate_mock_oi_data.
+    """
+
+    name = 'custom'
+
+    async def get_historical_ohlcv(self, symbol: str, interval: str, n_bars: int) -> Optional[List[dict]]:
+        """Not supported unless overridden (supports() is then False, and None means no data)."""
+        return None
+
+    async def get_option_chain(self, symbol: str, expiry: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Not supported unless overridden (supports() is then False, and None means no data)."""
+        return None
+
+    async def initialize(self):
+        """Open connections / sessions ahead of the first request."""
+
+    async def aclose(self):
+        pass
+
+    def supports(self, method: str) -> bool:
+        return getattr(type(self), method, None) is not getattr(DataProvider, method, None)
+
+
+class TradingViewProvider(DataProvider):
+    name = 'tradingview'
+
+    async def initialize(self):
+        from data.tv_api import tv_api
+        await tv_api.initialize()
+
+    async def get_historical_ohlcv(self, symbol: str, interval: str, n_bars: int) -> Optional[List[dict]]:
+        from data.tv_api import tv_api
+        return await tv_api.get_hist_candles(symbol, interval, n_bars)
+
+
+class NSEProvider(DataProvider):
+    name = 'nse'
+
+    def __init__(self, ttl: float = 5.0):
+        # One NSE response carries every expiry; cache it once and slice per expiry.
+        self.raw = TTLCache(ttl=ttl)
+
+    async def initialize(self):
+        from data.nse_api import nse_api
+        await nse_api.initialize()
+
+    async def get_option_chain(self, symbol: str, expiry: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        from data.nse_api import nse_api
+
+        raw = await self.raw.get_or_load(symbol.upper(), lambda: nse_api.fetch_oi_data(symbol))
+        if not raw:
+            return None
+        expiries = nse_api.expiries(raw)
+        if expiry not in expiries:
+            expiry = expiries[0] if expiries else None
+        return nse_api.normalize_oi_data(raw, symbol, expiry)
+
+    async def aclose(self):
+        from data.nse_api import nse_api
+        await nse_api.aclose()
+
+
+class TrendlyneProvider(DataProvider):
+    name = 'trendlyne'
+
+    def __init__(self):
+        self.expiries = TTLCache(ttl=3600)
+
+    async def initialize(self):
+        from data.trendlyne_api import trendlyne_api
+        await trendlyne_api.initialize()
+
+    async def get_expiries(self, symbol: str) -> Tuple[Optional[int], List[str]]:
+        """(stock id, expiry list), cached until IST midnight."""
+        from data.trendlyne_api import trendlyne_api
+
+        async def load():
+            stock_id = await trendlyne_api.get_stock_id(symbol)
+            if not stock_id:
+                return None
+            expiries = await trendlyne_api.get_expiry_dates(stock_id)
+            return (stock_id, expiries) if expiries else None
+
+        key = (symbol.upper(), datetime.now(IST).date())
+        result = await self.expiries.get_or_load(key, load, ttl=seconds_until_ist_midnight())
+        return result if result else (None, [])
+
+    async def get_option_chain(self, symbol: str, expiry: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        from data.trendlyne_api import trendlyne_api
+
+        stock_id, expiries = await self.get_expiries(symbol)
+        if not stock_id or not expiries:
+            return None
+        if expiry is None or expiry not in expiries:
+            expiry = expiries[0]
+        data = await trendlyne_api.get_oi_data(stock_id, expiry, datetime.now(IST).strftime("%H:%M"))
+        if not data:
+            return None
+        return trendlyne_api.normalize_oi_data(data, symbol, expiry)
+
+    async def aclose(self):
+        from data.trendlyne_api import trendlyne_api
+        await trendlyne_api.aclose()
+
+
+def build_registry(config: Dict[str, Any]) -> ProviderRegistry:
+    breaker = config.get('circuit_breaker', {})
+    registry = ProviderRegistry(
+        config,
+        failure_threshold=breaker.get('failure_threshold', 3),
+        cooldown=breaker.get('cooldown_seconds', 30)
+    )
+    registry.register('tradingview', TradingViewProvider())
+    registry.register('nse', NSEProvider(ttl=config['options'].get('chain_ttl_seconds', 5)))
+    registry.register('trendlyne', TrendlyneProvider())
+    return registry
+
+
+provider_registry = build_registry(DATA_PROVIDER_CONFIG)
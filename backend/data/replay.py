@@ -0,0 +1,195 @@
+import asyncio
+import logging
+import math
+import time
+from typing import Any, Dict, List, Optional, Set
+
+from core.tape import CHAIN, TapeReader, decode_chain
+from data.providers import DataProvider
+
+logger = logging.getLogger(__name__)
+
+
+def parse_speed(speed: Any) -> float:
+    """Replay speed multiplier; 0 means no pacing ('max')."""
+    if isinstance(speed, str) and speed.strip().lower() in ('max', 'inf', '0'):
+        return 0.0
+    value = float(speed)
+    if value <= 0 or math.isinf(value):
+        return 0.0
+    return value
+
+
+class ReplaySession:
+    """
+    Replay clock over one recorded tape, shared by the stream and the providers.
+
+    Records are read in order from the memory-mapped tape and paced so that
+    tape time advances `speed` times faster than wall time (no pacing at all
+    when speed is 0). The providers answer from what has been replayed so
+    far: 1-minute history up to the clock and the latest option chain. With
+    `loop` the tape starts over, shifted by whole days so bar times keep
+    increasing and stay session-aligned.
+    """
+
+    def __init__(self, path: str, speed: float = 1.0, loop: bool = False, max_bars: int = 20000):
+        self.path = path
+        self.max_bars = max_bars
+        self.speed = speed
+        self.loop = loop
+        self.reader = TapeReader(path)
+        # symbol -> {bar_time: [bar_time, open, high, low, close, volume]}, oldest first
+        self.bars: Dict[str, Dict[int, list]] = {}
+        self.chains: Dict[str, bytes] = {}
+        self.clock_ms: Optional[int] = None
+        self.replayed = 0
+        self.passes = 0
+        self.lag_ms = 0.0
+        self.finished = False
+
+    async def run(self, emit):
+        """Feed every BAR record to `emit(symbol, ohlc)` at the replay pace."""
+        shift = 0
+        while True:
+            first_ts = first_bar = last_bar = None
+            started = time.monotonic()
+            for kind, ts_ms, symbol, payload in self.reader:
+                if first_ts is None:
+                    first_ts = ts_ms
+                if self.speed:
+                    delay = (ts_ms - first_ts) / 1000 / self.speed - (time.monotonic() - started)
+                    self.lag_ms = max(-delay * 1000, 0.0)
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                self.clock_ms = ts_ms + shift * 1000
+                self.replayed += 1
+                if kind == CHAIN:
+                    self.chains[symbol.upper()] = payload
+                    continue
+                bar_time, open_, high, low, close, volume = payload
+                first_bar = bar_time if first_bar is None else first_bar
+                last_bar = bar_time
+                bar_time += shift
+                bars = self.bars.setdefault(symbol.upper(), {})
+                bars[bar_time] = [bar_time, open_, high, low, close, volume]
+                if len(bars) > self.max_bars + 1024:
+                    self.bars[symbol.upper()] = dict(list(bars.items())[-self.max_bars:])
+                await emit(symbol, {"timestamp": bar_time, "open": open_, "high": high, "low": low,
+                                    "close": close, "volume": volume})
+                if not self.speed and self.replayed % 256 == 0:
+                    # Unpaced: still let clients and the fan-out run
+                    await asyncio.sleep(0)
+            self.passes += 1
+            if not self.loop or first_bar is None:
+                break
+            shift += math.ceil((last_bar - first_bar + 60) / 86400) * 86400
+        self.finished = True
+        logger.info(f"Replay of {self.path} finished after {self.replayed} records")
+
+    def candles(self, symbol: str, n_bars: int) -> List[dict]:
+        bars = list(self.bars.get(symbol, {}).values())[-n_bars:]
+        return [{"time": t, "open": o, "high": h, "low": l, "close": c, "volume": v} for t, o, h, l, c, v in bars]
+
+    def chain(self, symbol: str, expiry: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        payload = self.chains.get(symbol)
+        if payload is None:
+            return None
+        chain = decode_chain(payload)
+        if expiry and chain.get('expiry') != expiry:
+            return None
+        return chain
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "path": self.path,
+            "speed": self.speed or 'max',
+            "loop": self.loop,
+            "records_replayed": self.replayed,
+            "passes": self.passes,
+            "clock_ms": self.clock_ms,
+            "lag_ms": round(self.lag_ms, 1),
+            "finished": self.finished
+        }
+
+
+class ReplayHistoricalProvider(DataProvider):
+    """1-minute history as replayed so far (the bar store derives every intraday interval from it)."""
+
+    name = 'replay'
+
+    def __init__(self, session: ReplaySession):
+        self.session = session
+
+    async def get_historical_ohlcv(self, symbol: str, interval: str, n_bars: int) -> Optional[List[dict]]:
+        if interval != '1':
+            return None
+        return self.session.candles(symbol.upper(), n_bars) or None
+
+
+class ReplayOptionChainProvider(DataProvider):
+    """The most recent option chain recorded at or before the replay clock."""
+
+    name = 'replay-options'
+
+    def __init__(self, session: ReplaySession):
+        self.session = session
+
+    async def get_option_chain(self, symbol: str, expiry: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        return self.session.chain(symbol.upper(), expiry)
+
+
+class ReplayStream:
+    """
+    Stand-in for data.tv_stream.TradingViewStream that plays a tape.
+
+    The session runs once, from the first start(); bars for symbols that
+    are currently added go to `on_bar` (DataEngine._on_bar), so replayed
+    ticks take exactly the live path: feed bus, bar store, fan-out.
+    """
+
+    def __init__(self, on_bar, session: ReplaySession, **kwargs):
+        self.on_bar = on_bar
+        self.session = session
+        self.symbols: Set[str] = set()
+        self.task: Optional[asyncio.Task] = None
+        self.connected = True
+        self.reconnects = 0
+
+    async def start(self):
+        if self.task is None:
+            self.task = asyncio.create_task(self.session.run(self._emit))
+
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+
+    async def add_symbol(self, symbol: str):
+        self.symbols.add(symbol)
+
+    async def remove_symbol(self, symbol: str):
+        self.symbols.discard(symbol)
+
+    async def _emit(self, symbol: str, ohlc: dict):
+        if symbol in self.symbols:
+            await self.on_bar(symbol, ohlc)
+
+
+def install(path: str, speed: Any = 1.0, loop: bool = False) -> ReplaySession:
+    """Serve history, option chains and the live stream from a tape; call before app startup."""
+    from functools import partial
+
+    import data.tv_stream
+    from config import DATA_PROVIDER_CONFIG
+    from data.providers import provider_registry
+
+    session = ReplaySession(path, parse_speed(speed), loop)
+    provider_registry.register('tradingview', ReplayHistoricalProvider(session))
+    provider_registry.register('nse', ReplayOptionChainProvider(session))
+    provider_registry.register('trendlyne', ReplayOptionChainProvider(session))
+    # Replay stands in for the multiplexed session stream
+    DATA_PROVIDER_CONFIG['live_feed']['mode'] = 'session'
+    data.tv_stream.TradingViewStream = partial(ReplayStream, session=session)
+    logger.info(f"Replaying {path} at {'max' if not session.speed else session.speed}x speed")
+    return session
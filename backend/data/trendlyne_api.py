@@ -1,7 +1,17 @@
 import httpx
 import logging
+from datetime import datetime, timezone
+import time
 from typing import Optional, List, Dict, Any
 
+from core.metrics import UPSTREAM_HTTP_ERRORS, UPSTREAM_HTTP_SECONDS
+
+try:
+    import h2  # noqa: F401 - enables HTTP/2 in httpx
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
 logger = logging.getLogger(__name__)
 
 class TrendlyneAPI:
@@ -20,6 +30,27 @@ class TrendlyneAPI:
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
         }
         self.stock_id_cache = {}
+        self.client: Optional[httpx.AsyncClient] = None
+
+    def _client(self) -> httpx.AsyncClient:
+        # One pooled keep-alive client for every request, instead of a new
+        # connection (and TLS handshake) per call.
+        if self.client is None or self.client.is_closed:
+            self.client = httpx.AsyncClient(
+                http2=HTTP2_AVAILABLE,
+                headers=self.headers,
+                limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+                timeout=15
+            )
+        return self.client
+
+    async def initialize(self):
+        self._client()
+
+    async def aclose(self):
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
 
     async def get_stock_id(self, symbol: str) -> Optional[int]:
         clean_symbol = symbol.upper().replace("NSE:", "").strip()
@@ -34,24 +65,23 @@ class TrendlyneAPI:
         params = {'query': symbol.lower()}
 
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(url, params=params, headers=self.headers, timeout=10)
-                if response.status_code == 200:
-                    data = response.json()
-                    logger.debug(f"Trendlyne Search Response for {symbol}: {data}")
-                    if data and 'body' in data and 'data' in data['body']:
-                        stock_id = None
-                        for item in data['body']['data']:
-                            if item.get('stock_code', '').lower() == symbol.lower():
-                                stock_id = item['stock_id']
-                                break
-
-                        if not stock_id and len(data['body']['data']) > 0:
-                             logger.warning(f"No exact stock_code match for {symbol}, found codes: {[i.get('stock_code') for i in data['body']['data']]}")
-
-                        if stock_id:
-                            self.stock_id_cache[symbol] = stock_id
-                            return stock_id
+            response = await self._client().get(url, params=params, timeout=10)
+            if response.status_code == 200:
+                data = response.json()
+                logger.debug(f"Trendlyne Search Response for {symbol}: {data}")
+                if data and 'body' in data and 'data' in data['body']:
+                    stock_id = None
+                    for item in data['body']['data']:
+                        if item.get('stock_code', '').lower() == symbol.lower():
+                            stock_id = item['stock_id']
+                            break
+
+                    if not stock_id and len(data['body']['data']) > 0:
+                         logger.warning(f"No exact stock_code match for {symbol}, found codes: {[i.get('stock_code') for i in data['body']['data']]}")
+
+                    if stock_id:
+                        self.stock_id_cache[symbol] = stock_id
+                        return stock_id
         except Exception as e:
             logger.error(f"Error looking up stock ID for {symbol}: {e}")
         return None
@@ -60,14 +90,19 @@ class TrendlyneAPI:
         url = f"{self.base_url}/search-contract-expiry-dates/"
         params = {'stock_pk': stock_id}
 
+        labels = ('trendlyne', 'expiry-dates')
+        started = time.perf_counter()
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(url, params=params, headers=self.headers, timeout=10)
-                if response.status_code == 200:
-                    data = response.json()
-                    if data and 'body' in data and 'data' in data['body']:
-                        return data['body']['data'].get('all_exp_list', [])
+            response = await self._client().get(url, params=params, timeout=10)
+            UPSTREAM_HTTP_SECONDS.observe(time.perf_counter() - started, labels)
+            if response.status_code == 200:
+                data = response.json()
+                if data and 'body' in data and 'data' in data['body']:
+                    return data['body']['data'].get('all_exp_list', [])
+            else:
+                UPSTREAM_HTTP_ERRORS.inc(labels)
         except Exception as e:
+            UPSTREAM_HTTP_ERRORS.inc(labels)
             logger.error(f"Error getting expiry dates for stock_id {stock_id}: {e}")
         return []
 
@@ -81,15 +116,55 @@ class TrendlyneAPI:
             'format': 'json'
         }
 
+        labels = ('trendlyne', 'live-oi-data')
+        started = time.perf_counter()
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(url, params=params, headers=self.headers, timeout=15)
-                if response.status_code == 200:
-                    data = response.json()
-                    logger.debug(f"Trendlyne OI Response for stock_id {stock_id}: {data}")
-                    return data
+            response = await self._client().get(url, params=params, timeout=15)
+            UPSTREAM_HTTP_SECONDS.observe(time.perf_counter() - started, labels)
+            if response.status_code == 200:
+                data = response.json()
+                logger.debug(f"Trendlyne OI Response for stock_id {stock_id}: {data}")
+                return data
+            UPSTREAM_HTTP_ERRORS.inc(labels)
         except Exception as e:
+            UPSTREAM_HTTP_ERRORS.inc(labels)
             logger.error(f"Error fetching OI data from Trendlyne: {e}")
         return None
 
+    @staticmethod
+    def normalize_oi_data(data: Dict[str, Any], symbol: str, expiry: Optional[str] = None) -> Dict[str, Any]:
+        """Map a live-oi-data response onto the strike schema of generate_mock_oi_data."""
+        body = data.get('body', {}) if isinstance(data, dict) else {}
+        oi_data = body.get('oiData') if isinstance(body, dict) else None
+        if not isinstance(oi_data, dict) or not oi_data:
+            # Unknown shape: hand back the upstream payload untouched.
+            return data
+
+        strikes = []
+        for strike, row in oi_data.items():
+            try:
+                strike_price = float(strike)
+            except (TypeError, ValueError):
+                continue
+            strikes.append({
+                "strike": int(strike_price) if strike_price.is_integer() else strike_price,
+                "ce_oi": int(float(row.get('callOi') or 0)),
+                "pe_oi": int(float(row.get('putOi') or 0)),
+                "ce_change": int(float(row.get('callOiChange') or 0)),
+                "pe_change": int(float(row.get('putOiChange') or 0)),
+                "ce_ltp": float(row.get('callLtp') or 0),
+                "pe_ltp": float(row.get('putLtp') or 0),
+            })
+        strikes.sort(key=lambda s: s["strike"])
+        total_ce_oi = sum(s["ce_oi"] for s in strikes)
+        total_pe_oi = sum(s["pe_oi"] for s in strikes)
+        return {
+            "symbol": symbol,
+            "expiry": expiry,
+            "pcr": round(total_pe_oi / total_ce_oi if total_ce_oi > 0 else 0, 2),
+            "strikes": strikes,
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "source": "trendlyne"
+        }
+
 trendlyne_api = TrendlyneAPI()
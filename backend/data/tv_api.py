@@ -3,8 +3,14 @@ import asyncio
 import os
 import contextlib
 import io
-from datetime import datetime
+import sys
+import threading
+import time
+from typing import Iterable, List, Optional, Tuple
 from tradingview_scraper.symbols.stream import Streamer
+from config import DATA_PROVIDER_CONFIG
+from core.candles import CandleColumns, columns_from_frame, columns_from_rows, rows_from_columns
+from core.metrics import metrics
 
 try:
     from tvDatafeed import TvDatafeed, Interval
@@ -14,27 +20,117 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+HISTORY_SECONDS = metrics.histogram('tv_history_seconds', 'TradingView history fetch latency', ('source',))
+HISTORY_FAILURES = metrics.counter('tv_history_failures_total', 'TradingView history fetches that failed', ('source',))
+
+_quiet_lock = threading.Lock()
+_quiet_depth = 0
+_quiet_saved = None
+
+
+@contextlib.contextmanager
+def quiet_stdout():
+    """contextlib.redirect_stdout for concurrent threads: stdout is swapped by the first and restored by the last."""
+    global _quiet_depth, _quiet_saved
+    with _quiet_lock:
+        if _quiet_depth == 0:
+            _quiet_saved = sys.stdout
+            sys.stdout = io.StringIO()
+        _quiet_depth += 1
+    try:
+        yield
+    finally:
+        with _quiet_lock:
+            _quiet_depth -= 1
+            if _quiet_depth == 0:
+                sys.stdout = _quiet_saved
+                _quiet_saved = None
+
+
+# Packets read per history fetch before giving up (the library's own limit when it collects for export)
+HISTORY_MAX_PACKETS = 16
+# The requested history arrives in a timescale_update; live bar updates follow as du packets
+HISTORY_PACKETS = ('timescale_update',)
+LIVE_PACKETS = ('timescale_update', 'du')
+
+
+def ohlc_rows(packet: dict, kinds: Tuple[str, ...] = HISTORY_PACKETS) -> List[dict]:
+    """OHLC rows of the Streamer series in a raw packet of one of `kinds`."""
+    if not isinstance(packet, dict) or packet.get('m') not in kinds:
+        return []
+    params = packet.get('p') or []
+    if len(params) < 2 or not isinstance(params[1], dict):
+        return []
+    series = params[1].get('sds_1')
+    if not isinstance(series, dict):
+        return []
+    rows = []
+    for entry in series.get('s') or []:
+        v = entry.get('v') or []
+        if len(v) < 5:
+            continue
+        rows.append({"timestamp": v[0], "open": v[1], "high": v[2], "low": v[3], "close": v[4],
+                     "volume": v[5] if len(v) > 5 else 0})
+    return rows
+
+
+def first_ohlc(packets: Iterable[dict], max_packets: int = HISTORY_MAX_PACKETS,
+               deadline: Optional[float] = None) -> Optional[List[dict]]:
+    """Rows of the first timescale_update within max_packets packets, or None once either limit is hit."""
+    for count, packet in enumerate(packets, 1):
+        rows = ohlc_rows(packet)
+        if rows:
+            return rows
+        if count >= max_packets or (deadline is not None and time.monotonic() >= deadline):
+            break
+    return None
+
+
 class TradingViewAPI:
     def __init__(self):
+        # Construction is free; the tvDatafeed login happens in initialize(),
+        # off the event loop, during the startup phase.
+        self.tv = None
+        self.ready = False
+        self.init_lock = asyncio.Lock()
+        # Each history fetch opens its own Streamer socket (the library closes it once
+        # drained), so fetches for different symbols run in parallel up to this bound.
+        # tvDatafeed keeps its socket on the instance, so its fallback stays serial.
+        self.history_limit = asyncio.Semaphore(DATA_PROVIDER_CONFIG['historical']['max_concurrent'])
+        self.tv_lock = asyncio.Lock()
+        self.symbol_map = {
+            'NIFTY': {'symbol': 'NIFTY', 'exchange': 'NSE'},
+            'BANKNIFTY': {'symbol': 'BANKNIFTY', 'exchange': 'NSE'},
+            'FINNIFTY': {'symbol': 'CNXFINANCE', 'exchange': 'NSE'},
+            'INDIA VIX': {'symbol': 'INDIAVIX', 'exchange': 'NSE'}
+        }
+
+    def _connect(self):
         username = os.getenv('TV_USERNAME')
         password = os.getenv('TV_PASSWORD')
         if TvDatafeed:
             self.tv = TvDatafeed(username, password) if username and password else TvDatafeed()
             logger.info("TradingViewAPI initialized with tvDatafeed")
         else:
-            self.tv = None
             logger.warning("tvDatafeed not installed, falling back to Streamer only")
 
-        self.streamer = Streamer(export_result=False)
-        self.symbol_map = {
-            'NIFTY': {'symbol': 'NIFTY', 'exchange': 'NSE'},
-            'BANKNIFTY': {'symbol': 'BANKNIFTY', 'exchange': 'NSE'},
-            'FINNIFTY': {'symbol': 'CNXFINANCE', 'exchange': 'NSE'},
-            'INDIA VIX': {'symbol': 'INDIAVIX', 'exchange': 'NSE'}
-        }
-
-    async def get_hist_candles(self, symbol: str, interval: str = '1', n_bars: int = 100):
+    async def initialize(self):
+        """Log in to tvDatafeed once; concurrent callers wait for the same attempt."""
+        if self.ready:
+            return
+        async with self.init_lock:
+            if not self.ready:
+                await asyncio.to_thread(self._connect)
+                self.ready = True
+
+    async def get_hist_candles(self, symbol: str, interval: str = '1', n_bars: int = 100) -> Optional[List[dict]]:
+        cols = await self.get_hist_columns(symbol, interval, n_bars)
+        return rows_from_columns(cols) if cols is not None and len(cols['time']) else None
+
+    async def get_hist_columns(self, symbol: str, interval: str = '1', n_bars: int = 100) -> Optional[CandleColumns]:
+        """Historical candles as parallel NumPy arrays (see core.candles)."""
         try:
+            await self.initialize()
             tv_symbol = symbol
             tv_exchange = 'NSE'
 
@@ -55,44 +151,38 @@ class TradingViewAPI:
                 if interval == '60': tf = '1h'
                 elif interval == 'D': tf = '1d'
 
+                timeout = DATA_PROVIDER_CONFIG['historical']['timeout_seconds']
+
                 def do_stream():
-                    with contextlib.redirect_stdout(io.StringIO()):
-                        return self.streamer.stream(
+                    with quiet_stdout():
+                        streamer = Streamer(export_result=False)
+                        # A silent socket cannot hold the thread past the fetch deadline
+                        streamer.stream_obj.ws.settimeout(timeout)
+                        stream = streamer.stream(
                             exchange=tv_exchange,
                             symbol=tv_symbol,
                             timeframe=tf,
                             numb_price_candles=n_bars
                         )
-
-                stream = await asyncio.to_thread(do_stream)
-
-                data = None
-                for item in stream:
-                    if 'ohlc' in item:
-                        data = item
-                        break
-
-                if data and 'ohlc' in data:
-                    candles = []
-                    for row in data['ohlc']:
-                        ts = row.get('timestamp') or row.get('datetime')
-                        if not isinstance(ts, (int, float)):
-                            try:
-                                ts = int(datetime.fromisoformat(ts.replace('Z', '+00:00')).timestamp())
-                            except:
-                                pass
-
-                        candles.append({
-                            "time": ts,
-                            "open": float(row['open']),
-                            "high": float(row['high']),
-                            "low": float(row['low']),
-                            "close": float(row['close']),
-                            "volume": int(float(row.get('volume', 0)))
-                        })
-                    logger.info(f"Retrieved {len(candles)} candles via Streamer")
-                    return candles
+                        try:
+                            return first_ohlc(stream, deadline=time.monotonic() + timeout)
+                        finally:
+                            stream.close()
+                            streamer.stream_obj.ws.close()
+
+                async with self.history_limit:
+                    started = time.perf_counter()
+                    # Socket reads block; the whole fetch stays off the event loop
+                    rows = await asyncio.to_thread(do_stream)
+
+                if rows:
+                    cols = columns_from_rows(rows)
+                    HISTORY_SECONDS.observe(time.perf_counter() - started, ('streamer',))
+                    logger.debug(f"Retrieved {len(cols['time'])} candles via Streamer")
+                    return cols
+                HISTORY_FAILURES.inc(('streamer',))
             except Exception as e:
+                HISTORY_FAILURES.inc(('streamer',))
                 logger.warning(f"Streamer failed for {tv_symbol}: {e}")
 
             # Fallback to tvDatafeed
@@ -104,26 +194,22 @@ class TradingViewAPI:
                     elif interval == '60': tv_interval = Interval.in_1_hour
                     elif interval == 'D': tv_interval = Interval.in_daily
 
-                    df = await asyncio.to_thread(self.tv.get_hist, symbol=tv_symbol, exchange=tv_exchange, interval=tv_interval, n_bars=n_bars)
+                    async with self.tv_lock:
+                        started = time.perf_counter()
+                        df = await asyncio.to_thread(self.tv.get_hist, symbol=tv_symbol, exchange=tv_exchange, interval=tv_interval, n_bars=n_bars)
                     if df is not None and not df.empty:
-                        candles = []
-                        for ts, row in df.iterrows():
-                            candles.append({
-                                "time": int(ts.timestamp()),
-                                "open": float(row['open']),
-                                "high": float(row['high']),
-                                "low": float(row['low']),
-                                "close": float(row['close']),
-                                "volume": int(float(row.get('volume', 0)))
-                            })
-                        logger.info(f"Retrieved {len(candles)} candles via tvDatafeed")
-                        return candles
+                        cols = columns_from_frame(df)
+                        HISTORY_SECONDS.observe(time.perf_counter() - started, ('tvdatafeed',))
+                        logger.debug(f"Retrieved {len(cols['time'])} candles via tvDatafeed")
+                        return cols
+                    HISTORY_FAILURES.inc(('tvdatafeed',))
                 except Exception as e:
+                    HISTORY_FAILURES.inc(('tvdatafeed',))
                     logger.warning(f"tvDatafeed failed: {e}")
 
             return None
         except Exception as e:
-            logger.error(f"Error in get_hist_candles: {e}")
+            logger.error(f"Error in get_hist_columns: {e}")
             return None
 
 tv_api = TradingViewAPI()
@@ -0,0 +1,184 @@
+import asyncio
+import json
+import logging
+import random
+import re
+import string
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from websockets.asyncio.client import connect
+
+from core.symbol_mapper import symbol_mapper
+
+logger = logging.getLogger(__name__)
+
+BarCallback = Callable[[str, dict], Awaitable[None]]
+
+_FRAME_RE = re.compile(r'~m~\d+~m~')
+
+
+def _session_id(prefix: str) -> str:
+    return prefix + ''.join(random.choices(string.ascii_lowercase + string.digits, k=12))
+
+
+def _frame(payload: str) -> str:
+    return f"~m~{len(payload)}~m~{payload}"
+
+
+class TradingViewStream:
+    """
+    One long-lived TradingView chart session multiplexing every streamed symbol.
+
+    Each symbol is a series on the shared chart session. Bar updates are handed
+    to `on_bar` through a bounded queue; when the consumer falls behind the
+    reader stops pulling frames off the socket instead of buffering without
+    limit. Dropped connections are re-established with jittered exponential
+    backoff and all current symbols are re-subscribed.
+    """
+
+    URL = "wss://data.tradingview.com/socket.io/websocket?from=chart%2F&type=chart"
+    HEADERS = {
+        "Origin": "https://www.tradingview.com",
+        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+    }
+
+    def __init__(self, on_bar: BarCallback, timeframe: str = '1', queue_size: int = 1024,
+                 backoff_base: float = 1.0, backoff_cap: float = 60.0):
+        self.on_bar = on_bar
+        self.timeframe = timeframe
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.series: Dict[str, str] = {}  # symbol -> series id
+        self.series_symbols: Dict[str, str] = {}  # series id -> symbol
+        self.series_counter = 0
+        self.chart_session: Optional[str] = None
+        self.ws = None
+        self.connected = False
+        self.reconnects = 0
+        self.tasks: List[asyncio.Task] = []
+
+    async def start(self):
+        if self.tasks:
+            return
+        self.tasks = [
+            asyncio.create_task(self._run()),
+            asyncio.create_task(self._dispatch())
+        ]
+
+    async def stop(self):
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+
+    async def add_symbol(self, symbol: str):
+        if symbol in self.series:
+            return
+        self.series_counter += 1
+        series_id = f"sds_{self.series_counter}"
+        self.series[symbol] = series_id
+        self.series_symbols[series_id] = symbol
+        if self.connected:
+            try:
+                await self._create_series(symbol, series_id)
+            except Exception as e:
+                # The reconnect loop re-creates every series on the next session.
+                logger.warning(f"Could not add {symbol} to TradingView session: {e}")
+
+    async def remove_symbol(self, symbol: str):
+        series_id = self.series.pop(symbol, None)
+        if series_id is None:
+            return
+        self.series_symbols.pop(series_id, None)
+        if self.connected:
+            try:
+                await self._send("remove_series", [self.chart_session, series_id])
+            except Exception as e:
+                logger.warning(f"Could not remove {symbol} from TradingView session: {e}")
+
+    async def _send(self, method: str, params: list):
+        payload = json.dumps({"m": method, "p": params}, separators=(',', ':'))
+        await self.ws.send(_frame(payload))
+
+    async def _create_series(self, symbol: str, series_id: str):
+        symbol_ref = f"{series_id}_sym"
+        resolve = json.dumps({"symbol": symbol_mapper.get_tv_symbol(symbol), "adjustment": "splits"})
+        await self._send("resolve_symbol", [self.chart_session, symbol_ref, f"={resolve}"])
+        await self._send("create_series", [self.chart_session, series_id, "s1", symbol_ref, self.timeframe, 1, ""])
+
+    async def _run(self):
+        attempt = 0
+        while True:
+            try:
+                async with connect(self.URL, additional_headers=self.HEADERS, max_size=None) as ws:
+                    self.ws = ws
+                    self.chart_session = _session_id("cs_")
+                    await self._send("set_auth_token", ["unauthorized_user_token"])
+                    await self._send("chart_create_session", [self.chart_session, ""])
+                    self.connected = True
+                    for symbol, series_id in list(self.series.items()):
+                        await self._create_series(symbol, series_id)
+                    logger.info(f"TradingView session open with {len(self.series)} symbols")
+                    attempt = 0
+                    async for raw in ws:
+                        await self._handle(raw)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"TradingView session dropped: {e}")
+            finally:
+                self.connected = False
+                self.ws = None
+
+            self.reconnects += 1
+            delay = random.uniform(0, min(self.backoff_cap, self.backoff_base * (2 ** attempt)))
+            attempt += 1
+            logger.info(f"Reconnecting TradingView session in {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+    async def _handle(self, raw: str):
+        for payload in _FRAME_RE.split(raw):
+            if not payload:
+                continue
+            if payload.startswith('~h~'):
+                await self.ws.send(_frame(payload))
+                continue
+            try:
+                message = json.loads(payload)
+            except ValueError:
+                continue
+            if message.get('m') not in ('du', 'timescale_update'):
+                continue
+            params = message.get('p', [])
+            if len(params) < 2 or not isinstance(params[1], dict):
+                continue
+            for series_id, update in params[1].items():
+                symbol = self.series_symbols.get(series_id)
+                if symbol is None or not isinstance(update, dict):
+                    continue
+                bars = update.get('s') or []
+                if not bars:
+                    continue
+                v = bars[-1].get('v') or []
+                if len(v) < 5:
+                    continue
+                # Blocks while the consumer is behind, which pauses socket reads.
+                await self.queue.put((symbol, {
+                    "timestamp": int(v[0]),
+                    "open": v[1],
+                    "high": v[2],
+                    "low": v[3],
+                    "close": v[4],
+                    "volume": v[5] if len(v) > 5 else 0
+                }))
+
+    async def _dispatch(self):
+        while True:
+            symbol, bar = await self.queue.get()
+            if symbol not in self.series:
+                continue
+            try:
+                await self.on_bar(symbol, bar)
+            except Exception as e:
+                logger.error(f"Error dispatching bar for {symbol}: {e}")
@@ -1,33 +1,217 @@
 import asyncio
 import logging
-import json
-import io
-import contextlib
+import time
 from datetime import datetime
-from tradingview_scraper.symbols.stream import Streamer
+from core.bar_store import bar_store
+from core.fanout import tick_values
+from core.pubsub import create_bus
+from core.footprint import footprint_engine
+from core.market_structure import market_structure
+from core.greeks import greeks_engine
+from core.paper_trading import paper_engine
+from core.tape import tape_recorder
+from core.metrics import metrics
+from sqlite_db import timeseries_writer
+from config import DATA_PROVIDER_CONFIG, FEED_BUS_CONFIG
 
 logger = logging.getLogger(__name__)
 
+UPSTREAM_BARS = metrics.counter('upstream_bars_total', 'Bar updates received from upstream (feed process)', ('symbol',))
+TICKS = metrics.counter('ticks_total', 'Bar updates applied and fanned out by this worker', ('symbol',))
+TICK_SECONDS = metrics.histogram('tick_processing_seconds', 'Bar store, analytics, paper fills and fan-out per tick')
+BROADCAST_SECONDS = metrics.histogram('broadcast_seconds', 'Time to queue one message for every subscriber', ('kind',))
+STREAMER_ITERATION_SECONDS = metrics.histogram('streamer_iteration_seconds',
+                                               'Blocking wait for the next Streamer item (poll mode)')
+
 class DataEngine:
-    def __init__(self, manager):
+    """
+    Live bars for the symbols this worker's clients subscribe to.
+
+    Upstream streams belong to whichever process the feed bus elects (always
+    this one with the default in-process bus). Workers register interest in
+    symbols over the bus; the feed persists every bar once and publishes it
+    back to all workers, which update their own bar store and footprint and
+    fan out to their own clients.
+    """
+
+    def __init__(self, manager, bus=None):
         self.manager = manager
-        self.streamer = Streamer(export_result=False)
+        self.bus = bus or create_bus(FEED_BUS_CONFIG)
+        # 'session' multiplexes every symbol over one long-lived TradingView socket;
+        # 'poll' re-opens a Streamer per symbol and iteration.
+        self.mode = DATA_PROVIDER_CONFIG['live_feed'].get('mode', 'session')
+        self.upstream = None
+        if self.mode == 'session':
+            from data.tv_stream import TradingViewStream
+            self.upstream = TradingViewStream(self._on_bar)
+        self.streaming = set()
         self.running_tasks = {}
         self.lock = asyncio.Lock()
+        # Subscriber refcounts; a symbol is torn down once its count has stayed
+        # at zero for the grace period, so quick re-subscribes reuse the stream.
+        self.refcounts = {}
+        self.teardown_tasks = {}
+        self.grace_seconds = DATA_PROVIDER_CONFIG['live_feed'].get('teardown_grace_seconds', 30)
+        # Symbols this worker has registered on the bus, and (feed only) the workers wanting each symbol
+        self.wanted = set()
+        self.interest = {}
+
+    async def start(self):
+        await self.bus.start(self._apply_bar, self._on_interest)
+
+    async def acquire(self, symbol: str):
+        self.refcounts[symbol] = self.refcounts.get(symbol, 0) + 1
+        pending = self.teardown_tasks.pop(symbol, None)
+        if pending:
+            pending.cancel()
+        if symbol not in self.wanted:
+            self.wanted.add(symbol)
+            await self.bus.set_interest(symbol, True)
+
+    def release(self, symbol: str):
+        count = self.refcounts.get(symbol, 0) - 1
+        if count > 0:
+            self.refcounts[symbol] = count
+            return
+        self.refcounts.pop(symbol, None)
+        if symbol in self.wanted and symbol not in self.teardown_tasks:
+            self.teardown_tasks[symbol] = asyncio.create_task(self._teardown_later(symbol))
+
+    async def _teardown_later(self, symbol: str):
+        try:
+            await asyncio.sleep(self.grace_seconds)
+        except asyncio.CancelledError:
+            return
+        self.teardown_tasks.pop(symbol, None)
+        if self.refcounts.get(symbol, 0) == 0:
+            self.wanted.discard(symbol)
+            await self.bus.set_interest(symbol, False)
+
+    async def _on_interest(self, peer: str, symbol: str, wanted: bool):
+        # Feed side: stream a symbol while at least one worker wants it.
+        peers = self.interest.setdefault(symbol, set())
+        if wanted:
+            peers.add(peer)
+            await self.start_streaming(symbol)
+        else:
+            peers.discard(peer)
+            if not peers:
+                del self.interest[symbol]
+                await self.stop_streaming(symbol)
+
+    def stats(self):
+        return {
+            "mode": self.mode,
+            "active_streams": len(self.streaming),
+            "active_subscribers": sum(self.refcounts.values()),
+            "grace_seconds": self.grace_seconds,
+            "feed_bus": self.bus.stats(),
+            "streams": {
+                symbol: {
+                    "subscribers": self.refcounts.get(symbol, 0),
+                    "pending_teardown": symbol in self.teardown_tasks
+                }
+                for symbol in sorted(self.wanted)
+            },
+            "upstream": {
+                symbol: len(self.interest.get(symbol, ()))
+                for symbol in sorted(self.streaming)
+            }
+        }
 
     async def start_streaming(self, symbol: str):
         async with self.lock:
-            if symbol in self.running_tasks:
+            if symbol in self.streaming:
                 return
-            self.running_tasks[symbol] = asyncio.create_task(self._stream_loop(symbol))
+            self.streaming.add(symbol)
+            if self.upstream:
+                await self.upstream.start()
+                await self.upstream.add_symbol(symbol)
+            else:
+                self.running_tasks[symbol] = asyncio.create_task(self._stream_loop(symbol))
             logger.info(f"Started streaming for {symbol}")
 
     async def stop_streaming(self, symbol: str):
         async with self.lock:
-            if symbol in self.running_tasks:
-                self.running_tasks[symbol].cancel()
-                del self.running_tasks[symbol]
-                logger.info(f"Stopped streaming for {symbol}")
+            if symbol not in self.streaming:
+                return
+            self.streaming.discard(symbol)
+            if self.upstream:
+                await self.upstream.remove_symbol(symbol)
+            elif symbol in self.running_tasks:
+                self.running_tasks.pop(symbol).cancel()
+            logger.info(f"Stopped streaming for {symbol}")
+
+    async def shutdown(self):
+        for task in self.teardown_tasks.values():
+            task.cancel()
+        self.teardown_tasks.clear()
+        if self.upstream:
+            await self.upstream.stop()
+        for task in self.running_tasks.values():
+            task.cancel()
+        self.running_tasks.clear()
+        self.streaming.clear()
+        await self.bus.stop()
+
+    @staticmethod
+    def _bar_time(ohlc: dict):
+        ts = ohlc.get('timestamp') or ohlc.get('datetime')
+        if isinstance(ts, (int, float)):
+            return int(ts)
+        try:
+            return int(datetime.fromisoformat(ts.replace('Z', '+00:00')).timestamp())
+        except Exception:
+            return None
+
+    async def _on_bar(self, symbol: str, ohlc: dict):
+        # Upstream callback; only runs in the feed process.
+        open_, high, low, close = float(ohlc['open']), float(ohlc['high']), float(ohlc['low']), float(ohlc['close'])
+        volume = int(float(ohlc.get('volume', 0)))
+        bar_time = self._bar_time(ohlc)
+        now_ms = int(time.time() * 1000)
+        UPSTREAM_BARS.inc((symbol,))
+        if bar_time is not None:
+            timeseries_writer.add_bar(symbol, '1', bar_time, open_, high, low, close, volume)
+            timeseries_writer.add_tick(symbol, now_ms, close, volume)
+            tape_recorder.record_bar(symbol, now_ms, bar_time, open_, high, low, close, volume)
+        await self.bus.publish_bar(symbol, (bar_time, open_, high, low, close, volume, now_ms))
+
+    async def _apply_bar(self, symbol: str, bar):
+        # Runs in every worker for each bar the feed publishes.
+        started = time.perf_counter()
+        bar_time, open_, high, low, close, volume, ts_ms = bar
+        footprint = structure = None
+        if bar_time is not None:
+            bar_store.apply_tick(symbol, bar_time, open_, high, low, close, volume)
+            footprint = footprint_engine.on_tick(symbol, bar_time, close, volume)
+            structure = self._structure(symbol, bar_time, open_, high, low, close)
+        # Paper fills and mark-to-market run before fan-out so P&L keeps pace with the tick
+        paper_engine.on_tick(symbol, close, ts_ms)
+        # The hub builds the JSON dict or compact delta per client encoding
+        broadcast_started = time.perf_counter()
+        self.manager.broadcast_tick(symbol, ts_ms, tick_values(close, open_, high, low, volume))
+        BROADCAST_SECONDS.observe(time.perf_counter() - broadcast_started, ('tick',))
+        if footprint:
+            footprint["symbol"] = symbol
+            await self.manager.broadcast_to_symbol(symbol, footprint)
+        if structure:
+            structure["symbol"] = symbol
+            await self.manager.broadcast_to_symbol(symbol, structure)
+        # Chain Greeks at the new spot (cached); None unless a greeks_update push is due
+        greeks = greeks_engine.on_spot(symbol, close)
+        if greeks:
+            await self.manager.broadcast_to_symbol(symbol, greeks)
+        TICKS.inc((symbol,))
+        TICK_SECONDS.observe(time.perf_counter() - started)
+
+    @staticmethod
+    def _structure(symbol: str, bar_time: int, open_: float, high: float, low: float, close: float):
+        # Levels are rebuilt from history once the bar store holds (deeper) 1-minute history
+        base = bar_store.base_series(symbol)
+        if base is not None and base.seeded_bars > market_structure.seeded_bars(symbol):
+            return market_structure.seed(symbol, base)
+        return market_structure.on_bar(symbol, bar_time, open_, high, low, close)
 
     async def _stream_loop(self, symbol: str):
         tv_symbol = symbol
@@ -38,33 +222,35 @@ class DataEngine:
             tv_symbol = parts[1].upper()
 
         while True:
+            streamer = None
             try:
-                def get_stream():
-                    with contextlib.redirect_stdout(io.StringIO()):
-                        return self.streamer.stream(
+                from tradingview_scraper.symbols.stream import Streamer
+                from data.tv_api import LIVE_PACKETS, ohlc_rows, quiet_stdout
+
+                def open_stream():
+                    # The Streamer closes its socket when its stream ends, so each pass opens a new one
+                    with quiet_stdout():
+                        opened = Streamer(export_result=False)
+                        return opened, opened.stream(
                             exchange=tv_exchange,
                             symbol=tv_symbol,
                             timeframe='1m',
                             numb_price_candles=1
                         )
 
-                stream = await asyncio.to_thread(get_stream)
+                streamer, stream = await asyncio.to_thread(open_stream)
 
-                for item in stream:
-                    if 'ohlc' in item:
+                while True:
+                    waited = time.perf_counter()
+                    # Socket reads block; keep them off the event loop
+                    item = await asyncio.to_thread(next, stream, None)
+                    STREAMER_ITERATION_SECONDS.observe(time.perf_counter() - waited)
+                    if item is None:
+                        break
+                    rows = ohlc_rows(item, LIVE_PACKETS)
+                    if rows:
                         # This is the last candle
-                        ohlc = item['ohlc'][-1]
-                        tick_data = {
-                            "type": "live_tick",
-                            "symbol": symbol,
-                            "ltp": float(ohlc['close']),
-                            "open": float(ohlc['open']),
-                            "high": float(ohlc['high']),
-                            "low": float(ohlc['low']),
-                            "volume": int(float(ohlc.get('volume', 0))),
-                            "timestamp": datetime.now().isoformat()
-                        }
-                        await self.manager.broadcast_to_symbol(symbol, tick_data)
+                        await self._on_bar(symbol, rows[-1])
 
                     await asyncio.sleep(0.5) # Throttle
             except asyncio.CancelledError:
@@ -72,5 +258,9 @@ class DataEngine:
             except Exception as e:
                 logger.error(f"Error in stream loop for {symbol}: {e}")
                 await asyncio.sleep(5) # Backoff
+            finally:
+                if streamer is not None:
+                    # Wakes a read still blocked in its worker thread
+                    streamer.stream_obj.ws.abort()
 
 data_engine = None # Will be initialized in server.py
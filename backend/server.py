@@ -1,5 +1,5 @@
-from fastapi import FastAPI, APIRouter, WebSocket, WebSocketDisconnect
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, APIRouter, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 import os
@@ -7,6 +7,7 @@ import logging
 import json
 import asyncio
 import random
+import time
 import uuid
 from datetime import datetime, timezone
 from contextlib import asynccontextmanager
@@ -14,8 +15,23 @@ from pathlib import Path
 from pydantic import BaseModel, Field, ConfigDict
 from typing import List, Dict, Any, Optional
 
-from sqlite_db import sqlite_db
+from sqlite_db import sqlite_db, timeseries_writer
 from data_engine import DataEngine
+from core.bar_store import bar_store
+from core.resampler import base_minutes_needed, has_gaps, is_fresh
+from core.fanout import FanoutHub, negotiate_encoding, tick_message, tick_values
+from core.option_chain import option_chain_service
+from core.oi_poller import OIPoller
+from core.option_analytics import option_analytics
+from core.footprint import footprint_engine
+from core.startup import StartupPhase
+from core.candles import rows_to_lists
+from core.paper_trading import paper_engine
+from core.greeks import greeks_engine
+from core.market_structure import market_structure
+from core.tape import tape_recorder
+from core.metrics import metrics, profiler
+from config import WS_CONFIG, DATA_PROVIDER_CONFIG, WARMUP_CONFIG, STRUCTURE_CONFIG, REPLAY_CONFIG, BATCH_CONFIG
 
 # Configure logging
 logging.basicConfig(
@@ -30,74 +46,253 @@ load_dotenv(ROOT_DIR / '.env')
 # Mock logic toggle
 USE_MOCK_DATA = os.environ.get('USE_MOCK_DATA', 'false').lower() == 'true'
 
+# Set in lifespan when REPLAY_FILE plays a recorded tape instead of the live providers
+replay_session = None
+
 # WebSocket connection manager
 class ConnectionManager:
     def __init__(self):
-        self.active_connections: List[WebSocket] = []
-        self.subscriptions: Dict[WebSocket, List[str]] = {}
+        self.hub = FanoutHub(
+            max_queue=WS_CONFIG['send_queue_size'],
+            slow_consumer_policy=WS_CONFIG['slow_consumer_policy'],
+            flush_interval=WS_CONFIG['conflation_flush_ms'] / 1000,
+            journal_size=WS_CONFIG['replay_buffer_size']
+        )
         self.data_engine = None
+        self.oi_poller = None
+
+    @property
+    def active_connections(self) -> List[WebSocket]:
+        return list(self.hub.channels)
 
     def set_data_engine(self, engine: DataEngine):
         self.data_engine = engine
 
+    def set_oi_poller(self, poller: OIPoller):
+        self.oi_poller = poller
+
     async def connect(self, websocket: WebSocket):
         try:
             # Important: Accept the connection before doing anything else
             await websocket.accept()
-            self.active_connections.append(websocket)
-            self.subscriptions[websocket] = []
-            logger.info(f"WebSocket connected. Total connections: {len(self.active_connections)}")
+            encoding = negotiate_encoding(websocket.query_params.get("encoding"))
+            self.hub.register(websocket, encoding)
+            logger.info(f"WebSocket connected ({encoding}). Total connections: {len(self.hub.channels)}")
         except Exception as e:
             logger.error(f"Error during websocket accept: {e}")
             raise
 
     def disconnect(self, websocket: WebSocket):
-        if websocket in self.active_connections:
-            self.active_connections.remove(websocket)
-        if websocket in self.subscriptions:
-            del self.subscriptions[websocket]
-        logger.info(f"WebSocket disconnected. Total connections: {len(self.active_connections)}")
+        released = self.hub.unregister(websocket)
+        paper_engine.unwatch(websocket)
+        for symbol in released:
+            if self.data_engine:
+                self.data_engine.release(symbol)
+            if self.oi_poller:
+                self.oi_poller.untrack(symbol)
+        logger.info(f"WebSocket disconnected. Total connections: {len(self.hub.channels)}")
+
+    async def subscribe(self, websocket: WebSocket, symbols: List[str], rates: Optional[Dict[str, float]] = None,
+                        last_seqs: Optional[Dict[str, int]] = None, epoch: Optional[str] = None,
+                        interval: str = "1"):
+        added, removed = self.hub.set_subscriptions(websocket, symbols, rates)
+        self.hub.send(websocket, {
+            "type": "subscribed",
+            "symbols": symbols,
+            "encoding": self.hub.encoding(websocket),
+            "epoch": self.hub.journal.epoch
+        })
+        # Catch up before awaiting anything, so no live message can overtake the replay
+        for symbol in added:
+            self.catch_up(websocket, symbol, (last_seqs or {}).get(symbol), epoch, interval)
+        for symbol in removed:
+            if self.data_engine:
+                self.data_engine.release(symbol)
+            if self.oi_poller:
+                self.oi_poller.untrack(symbol)
+        for symbol in added:
+            if self.data_engine:
+                await self.data_engine.acquire(symbol)
+            if self.oi_poller:
+                self.oi_poller.track(symbol)
+        return added, removed
+
+    def catch_up(self, websocket: WebSocket, symbol: str, last_seq: Optional[int], epoch: Optional[str],
+                 interval: str):
+        """Replay what a reconnecting client missed, or send the latest snapshot."""
+        if last_seq is not None and self.hub.resume(websocket, symbol, last_seq, epoch):
+            return
+        journal = self.hub.journal
+        tick = journal.last_tick(symbol)
+        self.hub.send(websocket, {
+            "type": "snapshot",
+            "symbol": symbol,
+            "epoch": journal.epoch,
+            "seq": journal.last_seq(symbol),
+            # Set when the client asked to resume but the gap was no longer buffered
+            "reset": last_seq is not None,
+            "tick": tick_message(symbol, tick[1], tick[2], tick[0]) if tick else None,
+            "interval": interval,
+            "candles": bar_store.peek(symbol, interval, WS_CONFIG['snapshot_bars']),
+            "structure": market_structure.get_levels(symbol)
+        })
+        self.send_oi_snapshot(websocket, symbol)
+
+    def send_oi_snapshot(self, websocket: WebSocket, symbol: str, version: int = 0):
+        if self.oi_poller:
+            message = self.oi_poller.message_since(symbol, version)
+            if message:
+                self.hub.send(websocket, message)
+            analytics = self.oi_poller.analytics_message(symbol)
+            if analytics:
+                self.hub.send(websocket, analytics)
+            status = self.oi_poller.status_message(symbol)
+            if status and status["stale"]:
+                self.hub.send(websocket, status)
 
     async def send_personal_message(self, message: dict, websocket: WebSocket):
-        try:
-            await websocket.send_json(message)
-        except Exception:
-            pass
+        self.hub.send(websocket, message)
 
     async def broadcast(self, message: dict):
-        for connection in self.active_connections:
-            try:
-                await connection.send_json(message)
-            except Exception:
-                pass
+        self.hub.broadcast(message)
+
+    def send_many(self, websockets, message: dict):
+        self.hub.send_many(websockets, message)
 
     async def broadcast_to_symbol(self, symbol: str, message: dict):
-        for connection, symbols in self.subscriptions.items():
-            if symbol in symbols:
-                try:
-                    await connection.send_json(message)
-                except Exception:
-                    pass
+        self.hub.publish(symbol, message)
+
+    def broadcast_tick(self, symbol: str, ts_ms: int, values: tuple):
+        self.hub.publish_tick(symbol, ts_ms, values)
 
 manager = ConnectionManager()
+startup = StartupPhase(concurrency=WARMUP_CONFIG['concurrency'])
+
+def warmup_tasks():
+    n_bars = WARMUP_CONFIG['n_bars']
+    # Deepest history first, so the other intraday intervals derive from that one seed
+    intervals = sorted(WARMUP_CONFIG['candle_intervals'], key=lambda i: base_minutes_needed(i, n_bars), reverse=True)
+
+    async def warm_candles(symbol: str):
+        results = [await bar_store.get_candles(symbol, interval, n_bars, load_candles) for interval in intervals]
+        return all(results)
+
+    tasks = []
+    for symbol in WARMUP_CONFIG['watchlist']:
+        tasks.append((f"candles:{symbol}", lambda s=symbol: warm_candles(s)))
+        if WARMUP_CONFIG['option_chains']:
+            tasks.append((f"oi:{symbol}", lambda s=symbol: option_chain_service.get_chain(s)))
+    return tasks
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup: Initialize SQLite
     logger.info("Starting up: Initializing database")
     await sqlite_db.init_db()
+    timeseries_writer.start()
+    await paper_engine.start(sqlite_db, manager)
+
+    # A recorded tape replaces the upstream providers and stream; otherwise optionally record them
+    global replay_session
+    if REPLAY_CONFIG['file'] and not USE_MOCK_DATA:
+        from data.replay import install
+        replay_session = install(REPLAY_CONFIG['file'], REPLAY_CONFIG['speed'], REPLAY_CONFIG['loop'])
+    elif REPLAY_CONFIG['record'] and not USE_MOCK_DATA:
+        tape_recorder.start()
+
+    # Providers log in / open sessions concurrently in the background, then
+    # the watchlist caches are warmed; /api/health reports progress.
+    if not USE_MOCK_DATA:
+        from data.providers import provider_registry
+        startup.start(warmup_tasks(), lambda: provider_registry.initialize(WARMUP_CONFIG['init_timeout_seconds']))
+    else:
+        startup.start([])
 
     # Initialize DataEngine
     engine = DataEngine(manager)
-    manager.set_data_engine(engine)
+    if not USE_MOCK_DATA:
+        await engine.start()
+        manager.set_data_engine(engine)
+        paper_engine.set_feed(engine)
+
+    # One option-chain poll per subscribed underlying, pushed to clients over /ws
+    oi_poller = OIPoller(
+        manager,
+        fetch=fetch_oi_chain,
+        interval=DATA_PROVIDER_CONFIG['options'].get('poll_interval_seconds', 5)
+    )
+    manager.set_oi_poller(oi_poller)
+    oi_poller.start()
     
     yield
     # Shutdown
     logger.info("Shutting down")
+    await startup.stop()
+    await oi_poller.stop()
+    await engine.shutdown()
+    await tape_recorder.stop()
+    await paper_engine.stop()
+    await timeseries_writer.stop()
+    await sqlite_db.close()
+    if not USE_MOCK_DATA:
+        from data.providers import provider_registry
+        await provider_registry.aclose()
 
 # Create the main app
 app = FastAPI(lifespan=lifespan)
 
+HTTP_SECONDS = metrics.histogram('http_request_seconds', 'REST request latency', ('method', 'route'))
+HTTP_REQUESTS = metrics.counter('http_requests_total', 'REST requests by status', ('method', 'route', 'status'))
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    started = time.perf_counter()
+    response = await call_next(request)
+    # Route templates, not raw paths, keep the label set bounded
+    route = getattr(request.scope.get("route"), "path", "unmatched")
+    HTTP_SECONDS.observe(time.perf_counter() - started, (request.method, route))
+    HTTP_REQUESTS.inc((request.method, route, str(response.status_code)))
+    return response
+
+def collect_runtime_metrics():
+    """Scrape-time gauges and counters read from state the server already keeps."""
+    queues = manager.hub.queue_stats()
+    yield "ws_connections", "gauge", "Open /ws connections", [({}, queues["connections"])]
+    yield "ws_send_queue_depth", "gauge", "Queued outbound frames across clients (sum) and on the fullest client (max)", [
+        ({"stat": "sum"}, queues["queued"]), ({"stat": "max"}, queues["max_depth"])
+    ]
+    yield "ws_dropped_frames_total", "counter", "Frames dropped for slow consumers", [({}, queues["dropped"])]
+    yield "symbol_subscribers", "gauge", "Clients subscribed per symbol", [
+        ({"symbol": symbol}, len(channels)) for symbol, channels in manager.hub.subscribers.items()
+    ]
+    caches = {"option_chains": option_chain_service.chains}
+    if not USE_MOCK_DATA:
+        from data.providers import provider_registry
+        for name, provider in provider_registry.providers.items():
+            for attr in ("raw", "expiries"):
+                cache = getattr(provider, attr, None)
+                if cache is not None and hasattr(cache, "hits"):
+                    caches[f"{name}_{attr}"] = cache
+    yield "cache_hits_total", "counter", "TTL cache hits", [({"cache": n}, c.hits) for n, c in caches.items()]
+    yield "cache_misses_total", "counter", "TTL cache misses", [({"cache": n}, c.misses) for n, c in caches.items()]
+    yield "cache_entries", "gauge", "TTL cache entries", [({"cache": n}, len(c.entries)) for n, c in caches.items()]
+    yield "greeks_cache_hits_total", "counter", "Greeks (spot, chain version) cache hits", [({}, greeks_engine.hits)]
+    yield "greeks_iv_solves_total", "counter", "Implied-volatility solves", [({}, greeks_engine.solves)]
+    engine = manager.data_engine
+    if engine:
+        yield "upstream_streams", "gauge", "Symbols streamed from upstream by this process", [({}, len(engine.streaming))]
+        upstream = engine.upstream
+        if upstream is not None and hasattr(upstream, "queue"):
+            yield "upstream_queue_depth", "gauge", "Bar updates waiting in the upstream stream queue", [
+                ({}, upstream.queue.qsize())
+            ]
+        if upstream is not None:
+            yield "upstream_reconnects_total", "counter", "Upstream stream reconnects", [({}, upstream.reconnects)]
+    if tape_recorder.active:
+        yield "tape_records_total", "counter", "Records written to the market-data tape", [({}, tape_recorder.records)]
+
+metrics.collector(collect_runtime_metrics)
+
 # API Routes
 api_router = APIRouter(prefix="/api")
 
@@ -106,19 +301,142 @@ async def root():
     return {"message": "Trading Dashboard API"}
 
 @api_router.get("/market/candles")
-async def get_candles(symbol: str = "NIFTY", interval: str = "1", n_bars: int = 100):
-    if USE_MOCK_DATA:
-        candles = generate_mock_candles(symbol, interval, n_bars)
-    else:
+async def get_candles(symbol: str = "NIFTY", interval: str = "1", n_bars: int = 100, format: str = "rows"):
+    # format=columnar returns {"time": [...], "open": [...], ...} instead of one object per candle
+    columnar = format == "columnar"
+    # JSONResponse serializes directly, skipping FastAPI's per-value jsonable_encoder walk
+    return JSONResponse({
+        "symbol": symbol,
+        "interval": interval,
+        "format": "columnar" if columnar else "rows",
+        "candles": await fetch_candles(symbol, interval, n_bars, columnar)
+    })
+
+async def fetch_candles(symbol: str, interval: str, n_bars: int, columnar: bool):
+    candles = None
+    if not USE_MOCK_DATA:
         try:
-            from data.tv_api import tv_api
-            candles = await tv_api.get_hist_candles(symbol, interval, n_bars)
-            if not candles:
-                candles = generate_mock_candles(symbol, interval, n_bars)
+            candles = await bar_store.get_candles(symbol, interval, n_bars, load_candles, columnar)
+            if columnar and candles and not candles['time']:
+                candles = None
         except Exception as e:
             logger.error(f"Error fetching real candles: {e}")
-            candles = generate_mock_candles(symbol, interval, n_bars)
-    return {"symbol": symbol, "interval": interval, "candles": candles}
+    if not candles:
+        candles = generate_mock_candles(symbol, interval, n_bars)
+        if columnar:
+            candles = rows_to_lists(candles)
+    return candles
+
+BATCH_SYMBOLS = metrics.counter('batch_symbols_total', 'Symbols served by the batch endpoints', ('endpoint', 'source'))
+
+def parse_symbols(symbols: str) -> List[str]:
+    names = list(dict.fromkeys(s.strip() for s in symbols.split(',') if s.strip()))
+    if not names:
+        raise ValueError("symbols is required")
+    if len(names) > BATCH_CONFIG['max_symbols']:
+        raise ValueError(f"at most {BATCH_CONFIG['max_symbols']} symbols per request")
+    return names
+
+async def stream_batch(endpoint: str, symbols: List[str], cached, fetch):
+    """
+    NDJSON, one line per symbol: every cache hit straight away, then each
+    miss as its fetch completes. Misses are fetched concurrently, at most
+    BATCH_CONFIG['concurrency'] at a time, so a watchlist loads in about
+    the time of its slowest symbol rather than the sum.
+    """
+    misses = []
+    for symbol in symbols:
+        result = None if USE_MOCK_DATA else cached(symbol)
+        if result is None:
+            misses.append(symbol)
+            continue
+        BATCH_SYMBOLS.inc((endpoint, 'cache'))
+        yield json.dumps({"symbol": symbol, "cached": True, **result}) + "\n"
+
+    limiter = asyncio.Semaphore(BATCH_CONFIG['concurrency'])
+
+    async def bounded(symbol: str):
+        async with limiter:
+            try:
+                result = await fetch(symbol)
+            except Exception as e:
+                logger.error(f"Batch {endpoint} failed for {symbol}: {e}")
+                result = {"error": str(e)}
+        BATCH_SYMBOLS.inc((endpoint, 'error' if 'error' in result else 'fetch'))
+        return {"symbol": symbol, "cached": False, **result}
+
+    # Fetches outlive a client that disconnects mid-stream; they still seed the bar store
+    tasks = [asyncio.create_task(bounded(symbol)) for symbol in misses]
+    for done in asyncio.as_completed(tasks):
+        yield json.dumps(await done) + "\n"
+
+@api_router.get("/market/candles/batch")
+async def get_candles_batch(symbols: str, interval: str = "1", n_bars: int = 100, format: str = "rows"):
+    # symbols=NIFTY,BANKNIFTY,...; each line is {"symbol", "cached", "interval", "candles"}
+    try:
+        names = parse_symbols(symbols)
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+    columnar = format == "columnar"
+
+    def cached(symbol: str):
+        candles = bar_store.peek(symbol, interval, n_bars, columnar)
+        if candles is None or (columnar and not candles['time']):
+            return None
+        return {"interval": interval, "candles": candles}
+
+    async def fetch(symbol: str):
+        return {"interval": interval, "candles": await fetch_candles(symbol, interval, n_bars, columnar)}
+
+    return StreamingResponse(stream_batch('candles', names, cached, fetch), media_type="application/x-ndjson")
+
+def daily_quote(candles: List[dict]) -> Dict[str, Any]:
+    # Today's daily bar is kept current from live ticks; change is against the previous session's close
+    today = candles[-1]
+    prev_close = candles[-2]['close'] if len(candles) > 1 else today['open']
+    change = today['close'] - prev_close
+    return {
+        "time": today['time'],
+        "ltp": today['close'],
+        "open": today['open'],
+        "high": today['high'],
+        "low": today['low'],
+        "prev_close": prev_close,
+        "volume": today['volume'],
+        "change": round(change, 2),
+        "change_percent": round(change / prev_close * 100, 2) if prev_close else None
+    }
+
+@api_router.get("/market/quotes")
+async def get_quotes(symbols: str):
+    # symbols=NIFTY,BANKNIFTY,...; each line is {"symbol", "cached", "ltp", "change", ...}
+    try:
+        names = parse_symbols(symbols)
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+
+    def cached(symbol: str):
+        candles = bar_store.peek(symbol, 'D', 2)
+        return daily_quote(candles) if candles else None
+
+    async def fetch(symbol: str):
+        return daily_quote(await fetch_candles(symbol, 'D', 2, False))
+
+    return StreamingResponse(stream_batch('quotes', names, cached, fetch), media_type="application/x-ndjson")
+
+async def load_candles(symbol: str, interval: str, n_bars: int):
+    # Persisted history first; upstream only when it is missing, stale or has holes (e.g. a restart mid-session)
+    stored = await sqlite_db.get_bars(symbol, interval, limit=n_bars)
+    if len(stored) >= n_bars and is_fresh(stored[-1]['time'], interval, int(datetime.now(timezone.utc).timestamp())) \
+            and not has_gaps([c['time'] for c in stored], interval):
+        return stored
+
+    from data.providers import provider_registry
+    candles = await provider_registry.fetch('historical', 'get_historical_ohlcv', symbol, interval, n_bars)
+    if candles:
+        timeseries_writer.add_bars(symbol, interval, candles)
+        return candles
+    return stored or None
 
 def generate_mock_candles(symbol: str, interval: str = "1", n_bars: int = 100):
     base_price = 22150 if "NIFTY" in symbol else 10000
@@ -143,24 +461,46 @@ def generate_mock_candles(symbol: str, interval: str = "1", n_bars: int = 100):
         base_price = close_price
     return candles
 
+@api_router.get("/market/footprint")
+async def get_footprint(symbol: str = "NIFTY", interval: str = "5", n_bars: int = 50):
+    return {
+        "symbol": symbol,
+        "interval": interval,
+        "price_step": footprint_engine.step_for(symbol),
+        "bars": footprint_engine.get_bars(symbol, interval, n_bars)
+    }
+
+@api_router.get("/market/structure")
+async def get_structure(symbol: str = "NIFTY"):
+    # Levels need the previous session; seed the 1-minute base that deep on first request
+    await bar_store.get_candles(symbol, '1', STRUCTURE_CONFIG['history_minutes'], load_candles)
+    base = bar_store.base_series(symbol)
+    message = market_structure.seed(symbol, base) if base is not None else None
+    if message:
+        # Subscribers replace the live-only levels they were sent so far
+        message["symbol"] = symbol
+        await manager.broadcast_to_symbol(symbol, message)
+    return {"symbol": symbol, "levels": market_structure.get_levels(symbol)}
+
 @api_router.get("/market/oi-data")
-async def get_oi_data(symbol: str = "NIFTY"):
+async def get_oi_data(symbol: str = "NIFTY", expiry: Optional[str] = None):
     try:
         if not USE_MOCK_DATA:
-            from data.trendlyne_api import trendlyne_api
-            stock_id = await trendlyne_api.get_stock_id(symbol)
-            if stock_id:
-                expiries = await trendlyne_api.get_expiry_dates(stock_id)
-                if expiries:
-                    data = await trendlyne_api.get_oi_data(stock_id, expiries[0], datetime.now().strftime("%H:%M"))
-                    if data:
-                        return data
+            data = await option_chain_service.get_chain(symbol, expiry)
+            if data:
+                return data
     except Exception as e:
         logger.error(f"Error fetching real OI data: {e}")
     
     # Mock fallback
     return generate_mock_oi_data(symbol)
 
+async def fetch_oi_chain(symbol: str):
+    # OI poller source: never mock data in live mode, so a failed poll leaves the last good chain in place
+    if USE_MOCK_DATA:
+        return generate_mock_oi_data(symbol)
+    return await option_chain_service.get_chain(symbol)
+
 def generate_mock_oi_data(symbol: str = "NIFTY"):
     atm_strike = 22150
     strikes = []
@@ -180,19 +520,91 @@ def generate_mock_oi_data(symbol: str = "NIFTY"):
     total_ce_oi = sum(s["ce_oi"] for s in strikes)
     total_pe_oi = sum(s["pe_oi"] for s in strikes)
     pcr = round(total_pe_oi / total_ce_oi if total_ce_oi > 0 else 0, 2)
-    return {
+    return option_analytics.attach({
         "symbol": symbol,
         "pcr": pcr,
         "strikes": strikes,
         "timestamp": datetime.now(timezone.utc).isoformat()
-    }
+    }, atm_strike)
+
+class OrderRequest(BaseModel):
+    symbol: str
+    side: str
+    qty: int
+    type: str = "MARKET"
+    limit_price: Optional[float] = None
 
 @api_router.get("/account")
 async def get_account():
-    account_doc = await sqlite_db.get_account()
-    if not account_doc:
-        return {"balance": 1000000.0, "equity": 1000000.0}
-    return account_doc
+    return paper_engine.account()
+
+@api_router.get("/positions")
+async def get_positions():
+    positions = paper_engine.get_positions()
+    for position in positions:
+        # Delta / gamma at the last spot the Greeks engine saw (None without a chain)
+        greeks = greeks_engine.position_greeks(position["symbol"], position["qty"])
+        position["delta"] = greeks["delta"] if greeks else None
+        position["gamma"] = greeks["gamma"] if greeks else None
+    return {"positions": positions, "account": paper_engine.account()}
+
+@api_router.get("/orders")
+async def get_orders(status: Optional[str] = None, limit: int = 200):
+    return {"orders": paper_engine.get_orders(status, limit)}
+
+@api_router.post("/orders")
+async def place_order(request: OrderRequest):
+    try:
+        return paper_engine.place_order(request.symbol, request.side, request.qty, request.type, request.limit_price)
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+
+@api_router.delete("/orders/{order_id}")
+async def cancel_order(order_id: str):
+    try:
+        return paper_engine.cancel_order(order_id)
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=404 if "unknown" in str(e) else 409)
+
+@api_router.get("/health")
+async def get_health():
+    # 503 until the startup phase has finished, so load balancers hold traffic back
+    return JSONResponse(startup.stats(), status_code=200 if startup.ready else 503)
+
+@api_router.get("/streams")
+async def get_streams():
+    stats = manager.data_engine.stats() if manager.data_engine else {}
+    if not USE_MOCK_DATA:
+        from data.providers import provider_registry
+        stats["data_providers"] = provider_registry.stats()
+    return {
+        **stats,
+        "greeks": greeks_engine.stats(),
+        "journal": manager.hub.journal.stats(),
+        "tape": replay_session.stats() if replay_session else tape_recorder.stats(),
+        "connections": len(manager.hub.channels),
+        "subscribed_symbols": {s: len(c) for s, c in manager.hub.subscribers.items()}
+    }
+
+@api_router.get("/metrics")
+async def get_metrics():
+    # Prometheus text exposition format
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@api_router.get("/profiler")
+async def get_profiler():
+    return profiler.stats()
+
+@api_router.post("/profiler/start")
+async def start_profiler(interval_ms: Optional[float] = None):
+    # Samples the event loop thread (this one) until stopped
+    profiler.start(interval_ms / 1000 if interval_ms else None)
+    return profiler.stats()
+
+@api_router.post("/profiler/stop")
+async def stop_profiler():
+    # Collapsed stacks, ready for flamegraph.pl or speedscope
+    return PlainTextResponse(profiler.stop())
 
 # WebSocket endpoint
 @app.websocket("/ws")
@@ -207,22 +619,49 @@ async def websocket_endpoint(websocket: WebSocket):
             
             if message.get("type") == "subscribe":
                 symbols = message.get("symbols", [])
-                manager.subscriptions[websocket] = symbols
-
-                # Start data engine for these symbols if not already running
-                if manager.data_engine and not USE_MOCK_DATA:
-                    for s in symbols:
-                        await manager.data_engine.start_streaming(s)
-
-                await manager.send_personal_message({
-                    "type": "subscribed",
-                    "symbols": symbols
-                }, websocket)
+                rates = update_rates(symbols, message.get("max_rate"), message.get("rates"))
+                # Refcounted: starts streams for new symbols, releases dropped ones. New symbols
+                # get a snapshot, or only the missed messages when last_seq / epoch are resumable.
+                await manager.subscribe(websocket, symbols, rates, parse_last_seqs(symbols, message.get("last_seq")),
+                                        message.get("epoch"), str(message.get("interval", "1")))
 
                 # If mock data is enabled, start a local mock stream for this connection
                 if USE_MOCK_DATA:
                     asyncio.create_task(send_mock_updates(websocket, symbols))
             
+            elif message.get("type") == "oi_sync":
+                symbol = message.get("symbol")
+                if isinstance(symbol, str):
+                    manager.send_oi_snapshot(websocket, symbol, parse_oi_version(message.get("version")))
+
+            elif message.get("type") == "order":
+                # Orders placed over a socket also subscribe it to order/position updates
+                paper_engine.watch(websocket)
+                try:
+                    order = paper_engine.place_order(message.get("symbol"), message.get("side"), message.get("qty"),
+                                                     message.get("order_type", "MARKET"), message.get("limit_price"))
+                    reply = {"type": "order_ack", "order": order}
+                except ValueError as e:
+                    reply = {"type": "order_rejected", "error": str(e)}
+                if "client_id" in message:
+                    reply["client_id"] = message["client_id"]
+                await manager.send_personal_message(reply, websocket)
+
+            elif message.get("type") == "cancel_order":
+                try:
+                    paper_engine.cancel_order(message.get("order_id", ""))
+                except ValueError as e:
+                    await manager.send_personal_message({"type": "order_rejected", "error": str(e),
+                                                         "order_id": message.get("order_id")}, websocket)
+
+            elif message.get("type") == "account_subscribe":
+                paper_engine.watch(websocket)
+                await manager.send_personal_message({
+                    "type": "account",
+                    "account": paper_engine.account(),
+                    "positions": paper_engine.get_positions()
+                }, websocket)
+
             elif message.get("type") == "ping":
                 await manager.send_personal_message({"type": "pong"}, websocket)
                 
@@ -232,21 +671,47 @@ async def websocket_endpoint(websocket: WebSocket):
         logger.error(f"WebSocket error: {e}")
         manager.disconnect(websocket)
 
+def parse_last_seqs(symbols: List[str], last_seq: Any) -> Dict[str, int]:
+    """{symbol: seq} from a subscribe message's last_seq (a dict, or one int for a single symbol)."""
+    if isinstance(last_seq, int) and len(symbols) == 1:
+        last_seq = {symbols[0]: last_seq}
+    if not isinstance(last_seq, dict):
+        return {}
+    return {symbol: seq for symbol, seq in last_seq.items() if isinstance(seq, int) and symbol in symbols}
+
+def parse_oi_version(version: Any) -> int:
+    """Chain version from an oi_sync message; anything but an int asks for a full snapshot (0)."""
+    return version if isinstance(version, int) and not isinstance(version, bool) else 0
+
+def update_rates(symbols: List[str], max_rate: Any, per_symbol: Any) -> Dict[str, float]:
+    """Per-symbol live_tick rate caps (updates/second) from a subscribe message; max_rate is the default."""
+    per_symbol = per_symbol if isinstance(per_symbol, dict) else {}
+    rates = {}
+    for symbol in symbols:
+        rate = per_symbol.get(symbol, max_rate)
+        try:
+            rate = float(rate) if rate is not None else 0.0
+        except (TypeError, ValueError):
+            rate = 0.0
+        if rate > 0:
+            rates[symbol] = min(rate, WS_CONFIG['max_update_rate'])
+    return rates
+
 async def send_mock_updates(websocket: WebSocket, symbols: List[str]):
     try:
         while websocket in manager.active_connections:
             await asyncio.sleep(1)
+            ts_ms = int(time.time() * 1000)
             for symbol in symbols:
-                live_data = {
-                    "type": "live_tick",
-                    "symbol": symbol,
-                    "ltp": round(22150 + random.uniform(-50, 50), 2),
-                    "change": round(random.uniform(-100, 100), 2),
-                    "change_percent": round(random.uniform(-0.5, 0.5), 2),
-                    "volume": random.randint(1000000, 5000000),
-                    "timestamp": datetime.now(timezone.utc).isoformat()
-                }
-                await websocket.send_json(live_data)
+                ltp = round(22150 + random.uniform(-50, 50), 2)
+                paper_engine.on_tick(symbol, ltp, ts_ms)
+                values = tick_values(
+                    ltp,
+                    volume=random.randint(1000000, 5000000),
+                    change=round(random.uniform(-100, 100), 2),
+                    change_percent=round(random.uniform(-0.5, 0.5), 2)
+                )
+                manager.hub.send_tick(websocket, symbol, ts_ms, values)
     except Exception:
         pass
 
@@ -1,60 +1,313 @@
 import aiosqlite
+import asyncio
 import json
-import os
+import logging
+import time
 from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from config import TIMESERIES_CONFIG
+
+logger = logging.getLogger(__name__)
 
 DB_PATH = Path(__file__).parent / "trading.db"
 
 class SQLiteDB:
     def __init__(self):
         self.db_path = DB_PATH
+        self.db: Optional[aiosqlite.Connection] = None
+        # Serializes write transactions on the shared connection
+        self.write_lock = asyncio.Lock()
 
     async def init_db(self):
-        async with aiosqlite.connect(self.db_path) as db:
-            await db.execute("""
-                CREATE TABLE IF NOT EXISTS accounts (
-                    id TEXT PRIMARY KEY,
-                    data TEXT
-                )
-            """)
-            await db.execute("""
-                CREATE TABLE IF NOT EXISTS positions (
-                    id TEXT PRIMARY KEY,
-                    data TEXT
-                )
-            """)
-            await db.commit()
-
-    async def get_account(self):
-        async with aiosqlite.connect(self.db_path) as db:
-            db.row_factory = aiosqlite.Row
-            async with db.execute("SELECT data FROM accounts LIMIT 1") as cursor:
-                row = await cursor.fetchone()
-                if row:
-                    return json.loads(row['data'])
-                return None
+        if self.db is None:
+            self.db = await aiosqlite.connect(self.db_path)
+            self.db.row_factory = aiosqlite.Row
+            await self.db.execute("PRAGMA journal_mode=WAL")
+            await self.db.execute("PRAGMA synchronous=NORMAL")
+        db = self.db
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS accounts (
+                id TEXT PRIMARY KEY,
+                data TEXT
+            )
+        """)
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS positions (
+                id TEXT PRIMARY KEY,
+                data TEXT
+            )
+        """)
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS orders (
+                id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                data TEXT
+            )
+        """)
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS bars (
+                symbol TEXT NOT NULL,
+                interval TEXT NOT NULL,
+                ts INTEGER NOT NULL,
+                open REAL NOT NULL,
+                high REAL NOT NULL,
+                low REAL NOT NULL,
+                close REAL NOT NULL,
+                volume INTEGER NOT NULL,
+                PRIMARY KEY (symbol, interval, ts)
+            ) WITHOUT ROWID
+        """)
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS ticks (
+                symbol TEXT NOT NULL,
+                ts INTEGER NOT NULL,
+                price REAL NOT NULL,
+                volume INTEGER NOT NULL
+            )
+        """)
+        await db.execute("CREATE INDEX IF NOT EXISTS idx_ticks_symbol_ts ON ticks (symbol, ts)")
+        await db.commit()
+
+    async def close(self):
+        if self.db is not None:
+            await self.db.close()
+            self.db = None
+
+    async def get_account(self, account_id: str):
+        async with self.db.execute("SELECT data FROM accounts WHERE id = ?", (account_id,)) as cursor:
+            row = await cursor.fetchone()
+            if row:
+                return json.loads(row['data'])
+            return None
 
     async def update_account(self, account_data):
-        async with aiosqlite.connect(self.db_path) as db:
-            await db.execute(
+        async with self.write_lock:
+            await self.db.execute(
                 "INSERT OR REPLACE INTO accounts (id, data) VALUES (?, ?)",
                 (account_data['id'], json.dumps(account_data))
             )
-            await db.commit()
+            await self.db.commit()
 
     async def get_positions(self):
-        async with aiosqlite.connect(self.db_path) as db:
-            db.row_factory = aiosqlite.Row
-            async with db.execute("SELECT data FROM positions") as cursor:
-                rows = await cursor.fetchall()
-                return [json.loads(row['data']) for row in rows]
+        async with self.db.execute("SELECT data FROM positions") as cursor:
+            rows = await cursor.fetchall()
+            return [json.loads(row['data']) for row in rows]
 
     async def update_position(self, position_data):
-        async with aiosqlite.connect(self.db_path) as db:
-            await db.execute(
+        async with self.write_lock:
+            await self.db.execute(
                 "INSERT OR REPLACE INTO positions (id, data) VALUES (?, ?)",
                 (position_data['id'], json.dumps(position_data))
             )
-            await db.commit()
+            await self.db.commit()
+
+    async def get_open_orders(self):
+        async with self.db.execute("SELECT data FROM orders WHERE status = 'OPEN'") as cursor:
+            rows = await cursor.fetchall()
+            return [json.loads(row['data']) for row in rows]
+
+    async def write_paper_state(self, account_data: Optional[dict], positions: List[dict], orders: List[dict]):
+        """Paper trading changes since the last flush, in one transaction."""
+        async with self.write_lock:
+            try:
+                if account_data:
+                    await self.db.execute(
+                        "INSERT OR REPLACE INTO accounts (id, data) VALUES (?, ?)",
+                        (account_data['id'], json.dumps(account_data))
+                    )
+                if positions:
+                    await self.db.executemany(
+                        "INSERT OR REPLACE INTO positions (id, data) VALUES (?, ?)",
+                        [(p['id'], json.dumps(p)) for p in positions]
+                    )
+                if orders:
+                    await self.db.executemany(
+                        "INSERT OR REPLACE INTO orders (id, status, data) VALUES (?, ?, ?)",
+                        [(o['id'], o['status'], json.dumps(o)) for o in orders]
+                    )
+                await self.db.commit()
+            except BaseException:
+                # Nothing half-written is left for the next commit to pick up
+                await self.db.rollback()
+                raise
+
+    async def write_batch(self, bars: List[Tuple], ticks: List[Tuple]):
+        async with self.write_lock:
+            try:
+                if bars:
+                    await self.db.executemany(
+                        "INSERT OR REPLACE INTO bars (symbol, interval, ts, open, high, low, close, volume) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                        bars
+                    )
+                if ticks:
+                    await self.db.executemany(
+                        "INSERT INTO ticks (symbol, ts, price, volume) VALUES (?, ?, ?, ?)",
+                        ticks
+                    )
+                await self.db.commit()
+            except BaseException:
+                await self.db.rollback()
+                raise
+
+    async def prune_ticks(self, before_ms: int) -> int:
+        """Delete ticks older than before_ms (epoch milliseconds); returns the number removed."""
+        async with self.write_lock:
+            cursor = await self.db.execute("DELETE FROM ticks WHERE ts < ?", (before_ms,))
+            await self.db.commit()
+            return cursor.rowcount
+
+    async def get_bars(self, symbol: str, interval: str, start: Optional[int] = None,
+                       end: Optional[int] = None, limit: int = 5000) -> List[dict]:
+        """Bars in [start, end] (epoch seconds), oldest first; the newest `limit` when the range is open."""
+        query = "SELECT ts, open, high, low, close, volume FROM bars WHERE symbol = ? AND interval = ?"
+        params: list = [symbol.upper(), interval]
+        if start is not None:
+            query += " AND ts >= ?"
+            params.append(start)
+        if end is not None:
+            query += " AND ts <= ?"
+            params.append(end)
+        query += " ORDER BY ts DESC LIMIT ?"
+        params.append(limit)
+        async with self.db.execute(query, params) as cursor:
+            rows = await cursor.fetchall()
+        return [
+            {"time": r[0], "open": r[1], "high": r[2], "low": r[3], "close": r[4], "volume": r[5]}
+            for r in reversed(rows)
+        ]
+
+    async def get_ticks(self, symbol: str, start: int, end: int, limit: int = 100000) -> List[dict]:
+        """Ticks in [start, end] (epoch milliseconds), oldest first."""
+        async with self.db.execute(
+            "SELECT ts, price, volume FROM ticks WHERE symbol = ? AND ts BETWEEN ? AND ? ORDER BY ts LIMIT ?",
+            (symbol.upper(), start, end, limit)
+        ) as cursor:
+            rows = await cursor.fetchall()
+        return [{"ts": r[0], "price": r[1], "volume": r[2]} for r in rows]
+
+
+class TimeSeriesWriter:
+    """
+    Write-behind buffer for bars and ticks.
+
+    DataEngine only appends to in-memory buffers; a background task flushes
+    them in one transaction every `flush_interval` seconds (or sooner once
+    `max_pending` rows are waiting). Repeated updates to a forming bar within
+    one interval collapse into a single upsert.
+
+    A batch that fails to write is put back and retried on the next flush;
+    while writes keep failing at most `max_retained` rows are held, shedding
+    the oldest ticks first. Ticks older than `tick_retention_days` are
+    deleted every `prune_interval` seconds.
+    """
+
+    def __init__(self, db: SQLiteDB, flush_interval: float = 1.0, max_pending: int = 20000,
+                 max_retained: int = 200000, tick_retention_days: Optional[float] = 7,
+                 prune_interval: float = 3600):
+        self.db = db
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.max_retained = max_retained
+        self.tick_retention_days = tick_retention_days
+        self.prune_interval = prune_interval
+        self.bars: Dict[Tuple[str, str, int], Tuple] = {}
+        self.ticks: List[Tuple] = []
+        self.shed = 0
+        self.last_prune = 0.0
+        self.task: Optional[asyncio.Task] = None
+        self.wakeup = asyncio.Event()
+
+    def start(self):
+        if self.task is None:
+            self.task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+        await self.flush()
+
+    def add_bar(self, symbol: str, interval: str, ts: int, open_: float, high: float, low: float,
+                close: float, volume: int):
+        key = (symbol.upper(), interval, ts)
+        self.bars[key] = (key[0], interval, ts, open_, high, low, close, volume)
+        self._maybe_wake()
+
+    def add_bars(self, symbol: str, interval: str, candles: List[dict]):
+        for c in candles:
+            if isinstance(c.get('time'), (int, float)):
+                self.add_bar(symbol, interval, int(c['time']), c['open'], c['high'], c['low'], c['close'], c['volume'])
+
+    def add_tick(self, symbol: str, ts_ms: int, price: float, volume: int):
+        self.ticks.append((symbol.upper(), ts_ms, price, volume))
+        self._maybe_wake()
+
+    def _maybe_wake(self):
+        if len(self.ticks) + len(self.bars) >= self.max_pending:
+            self.wakeup.set()
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self.wakeup.clear()
+            await self.flush()
+            if self.tick_retention_days and time.monotonic() - self.last_prune >= self.prune_interval:
+                self.last_prune = time.monotonic()
+                await self.prune()
+
+    async def flush(self):
+        if not self.bars and not self.ticks:
+            return
+        bars, self.bars = self.bars, {}
+        ticks, self.ticks = self.ticks, []
+        try:
+            await self.db.write_batch(list(bars.values()), ticks)
+        except BaseException as e:
+            self._requeue(bars, ticks)
+            if not isinstance(e, Exception):
+                raise
+            logger.error(f"Failed to persist {len(bars)} bars / {len(ticks)} ticks, will retry: {e}")
+
+    def _requeue(self, bars: Dict[Tuple[str, str, int], Tuple], ticks: List[Tuple]):
+        # Updates buffered while the write was in flight are newer and win
+        bars.update(self.bars)
+        self.bars = bars
+        self.ticks = ticks + self.ticks
+        excess = len(self.bars) + len(self.ticks) - self.max_retained
+        if excess <= 0:
+            return
+        drop = min(excess, len(self.ticks))
+        del self.ticks[:drop]
+        excess -= drop
+        if excess > 0:
+            for key in sorted(self.bars, key=lambda k: k[2])[:excess]:
+                del self.bars[key]
+        self.shed += drop + max(excess, 0)
+        logger.warning(f"Write-behind buffer full; shed {drop + max(excess, 0)} oldest rows ({self.shed} total)")
+
+    async def prune(self):
+        cutoff = int((time.time() - self.tick_retention_days * 86400) * 1000)
+        try:
+            removed = await self.db.prune_ticks(cutoff)
+        except Exception as e:
+            logger.error(f"Failed to prune ticks: {e}")
+            return
+        if removed:
+            logger.info(f"Pruned {removed} ticks older than {self.tick_retention_days} days")
+
 
 sqlite_db = SQLiteDB()
+timeseries_writer = TimeSeriesWriter(
+    sqlite_db,
+    flush_interval=TIMESERIES_CONFIG['flush_interval_seconds'],
+    max_pending=TIMESERIES_CONFIG['max_pending'],
+    max_retained=TIMESERIES_CONFIG['max_retained'],
+    tick_retention_days=TIMESERIES_CONFIG['tick_retention_days'],
+    prune_interval=TIMESERIES_CONFIG['prune_interval_seconds']
+)
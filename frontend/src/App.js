@@ -1,4 +1,4 @@
-import React, { useState, useEffect, useMemo, useCallback } from 'react';
+import React, { useState, useEffect, useMemo, useCallback, useRef } from 'react';
 import { Routes, Route } from 'react-router-dom';
 import '@/App.css';
 import { TopBar } from './components/TopBar';
@@ -14,6 +14,31 @@ import { useWebSocket } from './hooks/useWebSocket';
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL || 'http://localhost:8000';
 const API = `${BACKEND_URL}/api`;
 
+// Apply an oi_update push: full snapshots replace the chain, deltas patch
+// only the strikes that changed since base_version.
+// Analytics arrive separately (oi_analytics) and are kept across snapshots.
+const mergeOiUpdate = (prev, update) => {
+  const { type, base_version: baseVersion, full, ...chain } = update;
+  if (full || !prev?.strikes) {
+    return prev?.symbol === chain.symbol ? { ...chain, analytics: prev.analytics } : chain;
+  }
+  const changed = new Map(update.strikes.map((row) => [row.strike, row]));
+  return {
+    ...prev,
+    ...chain,
+    strikes: prev.strikes.map((row) => changed.get(row.strike) || row),
+  };
+};
+
+// Apply a structure_update push: full updates replace every level, others
+// add or move levels by id and drop the removed ids.
+const mergeStructure = (prev, update) => {
+  const next = update.full ? {} : { ...prev };
+  (update.removed || []).forEach((id) => delete next[id]);
+  (update.added || []).forEach((level) => { next[level.id] = level; });
+  return next;
+};
+
 function App() {
   return (
     <Routes>
@@ -30,6 +55,11 @@ function Dashboard() {
   const [candles, setCandles] = useState([]);
   const [oiData, setOiData] = useState(null);
   const [account, setAccount] = useState(null);
+  const [structure, setStructure] = useState({});
+  const oiVersionRef = useRef(0);
+  // Last seq seen per symbol and the server epoch, so a reconnect only receives what it missed
+  const seqRef = useRef({});
+  const epochRef = useRef(null);
 
   const websocketUrl = useMemo(
     () => BACKEND_URL.replace('https://', 'wss://').replace('http://', 'ws://') + '/ws',
@@ -65,6 +95,16 @@ function Dashboard() {
     }
   }, [symbol]);
 
+  const fetchStructure = useCallback(async () => {
+    try {
+      const response = await fetch(`${API}/market/structure?symbol=${symbol}`);
+      const data = await response.json();
+      setStructure(mergeStructure({}, { full: true, added: data.levels }));
+    } catch (error) {
+      console.error('Error fetching market structure:', error);
+    }
+  }, [symbol]);
+
   const fetchAccount = useCallback(async () => {
     try {
       const response = await fetch(`${API}/account`);
@@ -76,32 +116,71 @@ function Dashboard() {
   }, []);
 
   useEffect(() => {
-    if (lastMessage?.type === 'live_tick') {
+    if (lastMessage?.symbol && lastMessage.seq != null) {
+      seqRef.current[lastMessage.symbol] = lastMessage.seq;
+    }
+    if (lastMessage?.type === 'subscribed') {
+      epochRef.current = lastMessage.epoch;
+    } else if (lastMessage?.type === 'snapshot' && lastMessage.symbol === symbol) {
+      if (lastMessage.tick) setLivePrice(lastMessage.tick);
+      if (lastMessage.candles && lastMessage.interval === interval) setCandles(lastMessage.candles);
+      if (lastMessage.structure) setStructure(mergeStructure({}, { full: true, added: lastMessage.structure }));
+    } else if (lastMessage?.type === 'structure_update' && lastMessage.symbol === symbol) {
+      setStructure((prev) => mergeStructure(prev, lastMessage));
+    } else if (lastMessage?.type === 'live_tick') {
       setLivePrice(lastMessage);
+    } else if (lastMessage?.type === 'oi_update' && lastMessage.symbol === symbol) {
+      if (!lastMessage.full && lastMessage.base_version !== oiVersionRef.current) {
+        // Missed an update: ask for everything that changed since our version
+        sendMessage({ type: 'oi_sync', symbol, version: oiVersionRef.current });
+        return;
+      }
+      oiVersionRef.current = lastMessage.version;
+      setOiData((prev) => mergeOiUpdate(prev, lastMessage));
+    } else if (lastMessage?.type === 'oi_analytics' && lastMessage.symbol === symbol) {
+      setOiData((prev) => ({ ...prev, symbol, analytics: lastMessage.analytics }));
+    } else if (lastMessage?.type === 'oi_status' && lastMessage.symbol === symbol) {
+      // The server keeps the last good chain while polls fail; only the flag changes
+      setOiData((prev) => (prev ? { ...prev, stale: lastMessage.stale, staleError: lastMessage.error } : prev));
     }
-  }, [lastMessage]);
+  }, [interval, lastMessage, sendMessage, symbol]);
+
+  useEffect(() => {
+    oiVersionRef.current = 0;
+  }, [symbol, readyState]);
 
   useEffect(() => {
     if (readyState === 1) {
       sendMessage({
         type: 'subscribe',
-        symbols: [symbol]
+        symbols: [symbol],
+        interval,
+        epoch: epochRef.current,
+        last_seq: seqRef.current
       });
     }
-  }, [readyState, sendMessage, symbol]);
+  }, [interval, readyState, sendMessage, symbol]);
 
   useEffect(() => {
     fetchCandles();
     fetchOIData();
     fetchAccount();
+    fetchStructure();
 
+    // Option-chain updates arrive as oi_update pushes over /ws
     const refreshTimer = setInterval(() => {
       fetchCandles();
-      fetchOIData();
     }, 5000);
 
     return () => clearInterval(refreshTimer);
-  }, [fetchAccount, fetchCandles, fetchOIData]);
+  }, [fetchAccount, fetchCandles, fetchOIData, fetchStructure]);
+
+  useEffect(() => {
+    // Fall back to REST polling for the chain while the socket is down
+    if (readyState === 1) return undefined;
+    const oiTimer = setInterval(fetchOIData, 5000);
+    return () => clearInterval(oiTimer);
+  }, [fetchOIData, readyState]);
 
   return (
     <div className="App">
@@ -122,6 +201,12 @@ function Dashboard() {
             <span className="pulse-label">Regime</span>
             <span className="pulse-value">{marketRegime.label}</span>
           </div>
+          {oiData?.stale && (
+            <div className="pulse-chip negative" title={oiData.staleError || ''}>
+              <span className="pulse-label">Option Chain</span>
+              <span className="pulse-value">Stale</span>
+            </div>
+          )}
         </div>
 
         <div className="dashboard-grid">
@@ -135,6 +220,7 @@ function Dashboard() {
             symbol={symbol}
             interval={interval}
             oiData={oiData}
+            structure={structure}
             onIntervalChange={setIntervalValue}
           />
 
@@ -3,6 +3,8 @@ import React from 'react';
 export const AnalyticsPanel = ({ oiData, symbol }) => {
   const pcr = oiData?.pcr || 0.85;
   const strikes = oiData?.strikes || [];
+  const analytics = oiData?.analytics || {};
+  const pcrChange = analytics.pcr_change_5m;
   
   // Calculate gauge position
   const getGaugePosition = (value) => {
@@ -89,7 +91,9 @@ export const AnalyticsPanel = ({ oiData, symbol }) => {
         </div>
         
         <div style={{ marginTop: '1rem', fontSize: '0.75rem', color: '#a8a8b8' }}>
-          <div>5min Change: <span style={{ color: '#ef4444' }}>-0.11</span></div>
+          <div>5min Change: <span style={{ color: pcrChange < 0 ? '#ef4444' : '#22c55e' }}>{pcrChange != null ? pcrChange.toFixed(2) : '--'}</span></div>
+          <div>Max Pain: <span style={{ color: '#00d4ff' }}>{analytics.max_pain ?? '--'}</span></div>
+          <div>ATM Straddle: <span style={{ color: '#00d4ff' }}>{analytics.straddle != null ? analytics.straddle.toFixed(2) : '--'}</span></div>
         </div>
       </div>
 
@@ -8,7 +8,14 @@ const intervalOptions = [
   { value: '60', label: '1 hour' },
 ];
 
-export const MainChart = ({ candles, interval, onIntervalChange, oiData, symbol }) => {
+const levelStyles = {
+  pdh: { color: 'rgba(168, 85, 247, 0.8)', title: 'PDH' },
+  pdl: { color: 'rgba(168, 85, 247, 0.8)', title: 'PDL' },
+  session_high: { color: 'rgba(56, 189, 248, 0.8)', title: 'Session High' },
+  session_low: { color: 'rgba(56, 189, 248, 0.8)', title: 'Session Low' },
+};
+
+export const MainChart = ({ candles, interval, onIntervalChange, oiData, structure, symbol }) => {
   const chartContainerRef = useRef();
   const chartRef = useRef();
   const seriesRef = useRef();
@@ -103,6 +110,49 @@ export const MainChart = ({ candles, interval, onIntervalChange, oiData, symbol
     });
   }, [oiData]);
 
+  const structureLinesRef = useRef([]);
+
+  useEffect(() => {
+    if (!seriesRef.current || !structure) return;
+
+    structureLinesRef.current.forEach(line => {
+      try {
+        seriesRef.current.removePriceLine(line);
+      } catch (e) {
+        // Line might have already been removed
+      }
+    });
+    structureLinesRef.current = [];
+
+    Object.values(structure).forEach(level => {
+      if (level.kind === 'order_block') {
+        // Order blocks as a pair of edges: green demand below price, red supply above
+        const color = level.side === 'bullish' ? 'rgba(34, 197, 94, 0.5)' : 'rgba(239, 68, 68, 0.5)';
+        [level.top, level.bottom].forEach((price, i) => {
+          structureLinesRef.current.push(seriesRef.current.createPriceLine({
+            price,
+            color,
+            lineWidth: 1,
+            lineStyle: 0,
+            axisLabelVisible: false,
+            title: i === 0 ? `${level.side === 'bullish' ? 'Bull' : 'Bear'} OB` : '',
+          }));
+        });
+        return;
+      }
+      const style = levelStyles[level.kind];
+      if (!style) return;
+      structureLinesRef.current.push(seriesRef.current.createPriceLine({
+        price: level.price,
+        color: style.color,
+        lineWidth: 1,
+        lineStyle: 2, // Dashed
+        axisLabelVisible: true,
+        title: style.title,
+      }));
+    });
+  }, [structure]);
+
   return (
     <div className="panel main-chart" data-testid="main-chart">
       <div className="panel-header">
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# The backend runs from its own directory (core/, data/ are top-level packages there)
+BACKEND = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend')
+if BACKEND not in sys.path:
+    sys.path.insert(0, BACKEND)
@@ -0,0 +1,64 @@
+import asyncio
+
+from core.bar_store import BarStore
+from core.resampler import NSE_SESSION_OPEN_UTC, base_minutes_needed
+
+OPEN = 1704067200 + NSE_SESSION_OPEN_UTC
+
+
+def candles(n, seconds):
+    return [{"time": OPEN + i * seconds, "open": 100.0, "high": 101.0, "low": 99.0, "close": 100.0,
+             "volume": 10} for i in range(n)]
+
+
+class Upstream:
+    """Candle fetcher returning at most `depth[interval]` bars."""
+
+    def __init__(self, depth):
+        self.depth = depth
+        self.calls = []
+
+    async def __call__(self, symbol, interval, n_bars):
+        self.calls.append((interval, n_bars))
+        available = self.depth.get(interval, 0)
+        return candles(min(n_bars, available), 60 if interval == '1' else 3600) if available else None
+
+
+def test_intraday_intervals_share_one_base_seed():
+    async def run():
+        store = BarStore()
+        fetch = Upstream({'1': 100000})
+        assert len(await store.get_candles('nifty', '15', 50, fetch)) == 50
+        assert len(await store.get_candles('NIFTY', '5', 50, fetch)) == 50
+        assert fetch.calls == [('1', base_minutes_needed('15', 50))]
+        assert store.base_series('NIFTY').seeded_bars == base_minutes_needed('15', 50)
+
+    asyncio.run(run())
+
+
+def test_short_base_falls_back_to_native_interval():
+    async def run():
+        store = BarStore()
+        fetch = Upstream({'1': 5000, '60': 1000})
+        result = await store.get_candles('NIFTY', '60', 100, fetch)
+        assert len(result) == 100
+        assert fetch.calls == [('1', base_minutes_needed('60', 100)), ('60', 100)]
+        # The base records what arrived, not what was asked for
+        assert store.base_series('NIFTY').seeded_bars == 5000
+        # Both seeds are reused: the short base for shallow requests, the 60-minute series for this one
+        assert len(await store.get_candles('NIFTY', '60', 100, fetch)) == 100
+        assert len(await store.get_candles('NIFTY', '5', 100, fetch)) == 100
+        assert len(fetch.calls) == 2
+
+    asyncio.run(run())
+
+
+def test_short_base_served_when_native_fetch_fails():
+    async def run():
+        store = BarStore()
+        fetch = Upstream({'1': 600})
+        result = await store.get_candles('NIFTY', '60', 100, fetch)
+        assert 0 < len(result) < 100
+        assert store.peek('NIFTY', '60', 100) is None
+
+    asyncio.run(run())
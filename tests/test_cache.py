@@ -0,0 +1,92 @@
+import asyncio
+
+from core.cache import TTLCache
+from core.option_chain import OptionChainService
+from data.providers import provider_registry
+
+
+class Loader:
+    def __init__(self, value='chain', delay=0.01):
+        self.value = value
+        self.delay = delay
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return self.value
+
+
+def test_concurrent_misses_share_one_load():
+    async def run():
+        cache = TTLCache(ttl=60)
+        loader = Loader()
+        results = await asyncio.gather(*(cache.get_or_load('NIFTY', loader) for _ in range(10)))
+        assert results == ['chain'] * 10 and loader.calls == 1
+        assert await cache.get_or_load('NIFTY', loader) == 'chain' and loader.calls == 1
+        assert (cache.hits, cache.misses) == (1, 10) and not cache.inflight
+
+    asyncio.run(run())
+
+
+def test_entries_expire_after_ttl():
+    async def run():
+        cache = TTLCache(ttl=0.02)
+        loader = Loader(delay=0)
+        await cache.get_or_load('NIFTY', loader)
+        await cache.get_or_load('NIFTY', loader)
+        assert loader.calls == 1
+        await asyncio.sleep(0.03)
+        assert cache.get('NIFTY') is None
+        await cache.get_or_load('NIFTY', loader)
+        assert loader.calls == 2
+
+    asyncio.run(run())
+
+
+def test_empty_results_are_not_cached():
+    async def run():
+        cache = TTLCache(ttl=60)
+        loader = Loader(value=None, delay=0)
+        assert await cache.get_or_load('NIFTY', loader) is None
+        assert await cache.get_or_load('NIFTY', loader) is None
+        assert loader.calls == 2
+
+    asyncio.run(run())
+
+
+def test_cancelled_waiter_does_not_cancel_shared_load():
+    async def run():
+        cache = TTLCache(ttl=60)
+        loader = Loader(delay=0.05)
+        impatient = asyncio.create_task(cache.get_or_load('NIFTY', loader))
+        patient = asyncio.create_task(cache.get_or_load('NIFTY', loader))
+        await asyncio.sleep(0.01)
+        impatient.cancel()
+        assert await patient == 'chain'
+        assert impatient.cancelled() and loader.calls == 1
+        assert cache.get('NIFTY') == 'chain'
+
+    asyncio.run(run())
+
+
+def test_option_chain_service_coalesces_upstream_calls(monkeypatch):
+    calls = []
+
+    async def fetch(kind, method, *args):
+        calls.append((kind, method) + args)
+        await asyncio.sleep(0.01)
+        return {"symbol": "TESTIDX", "strikes": [{"strike": 100.0, "ce_oi": 10, "pe_oi": 20, "ce_change": 0,
+                                                   "pe_change": 0, "ce_ltp": 5.0, "pe_ltp": 4.0}]}
+
+    monkeypatch.setattr(provider_registry, 'fetch', fetch)
+
+    async def run():
+        service = OptionChainService(chain_ttl=60)
+        chains = await asyncio.gather(*(service.get_chain('TESTIDX') for _ in range(5)))
+        assert calls == [('options', 'get_option_chain', 'TESTIDX', None)]
+        assert all(chain is chains[0] for chain in chains)
+        assert chains[0]['analytics']['pcr'] == 2.0
+        assert service.stats() == {"chain_hits": 0, "chain_misses": 5, "cached_chains": 1}
+
+    asyncio.run(run())
@@ -0,0 +1,49 @@
+from datetime import datetime, timezone
+
+from core.candles import columns_from_rows, epoch_seconds
+
+# 2025-01-06 09:15 IST
+OPEN_UTC = int(datetime(2025, 1, 6, 3, 45, tzinfo=timezone.utc).timestamp())
+
+
+def test_epoch_seconds_numeric():
+    assert epoch_seconds([OPEN_UTC, OPEN_UTC + 60.0, str(OPEN_UTC + 120)]).tolist() == \
+        [OPEN_UTC, OPEN_UTC + 60, OPEN_UTC + 120]
+
+
+def test_epoch_seconds_naive_and_utc_iso_strings():
+    assert epoch_seconds(['2025-01-06T03:45:00', '2025-01-06T03:46:00Z', '2025-01-06 03:47:00']).tolist() == \
+        [OPEN_UTC, OPEN_UTC + 60, OPEN_UTC + 120]
+
+
+def test_epoch_seconds_offset_iso_strings():
+    assert epoch_seconds(['2025-01-06T09:15:00+05:30', '2025-01-06T03:46:00Z', '2025-01-06T03:47:00+00:00']).tolist() == \
+        [OPEN_UTC, OPEN_UTC + 60, OPEN_UTC + 120]
+
+
+def test_epoch_seconds_unparseable_entries_become_minus_one():
+    assert epoch_seconds(['2025-01-06T03:45:00Z', 'not a time', None]).tolist() == [OPEN_UTC, -1, -1]
+    assert epoch_seconds(['2025-01-06T09:15:00+05:30', 'garbage']).tolist() == [OPEN_UTC, -1]
+
+
+def test_columns_from_rows_falls_back_for_missing_volume_and_drops_bad_times():
+    rows = [
+        {'timestamp': '2025-01-06T09:15:00+05:30', 'open': 1, 'high': 2, 'low': 0.5, 'close': 1.5, 'volume': 100},
+        {'datetime': '2025-01-06T09:16:00+05:30', 'open': 1.5, 'high': 2.5, 'low': 1, 'close': 2},
+        {'timestamp': 'garbage', 'open': 9, 'high': 9, 'low': 9, 'close': 9, 'volume': 9},
+        {'timestamp': '2025-01-06T09:17:00+05:30', 'open': 2, 'high': 3, 'low': 2, 'close': 3, 'volume': None},
+    ]
+    cols = columns_from_rows(rows)
+    assert cols['time'].tolist() == [OPEN_UTC, OPEN_UTC + 60, OPEN_UTC + 120]
+    assert cols['close'].tolist() == [1.5, 2.0, 3.0]
+    assert cols['volume'].tolist() == [100, 0, 0]
+    assert len(cols['open']) == len(cols['high']) == len(cols['low']) == 3
+
+
+def test_columns_from_rows_fast_path():
+    rows = [{'timestamp': OPEN_UTC + 60 * i, 'open': i, 'high': i + 1, 'low': i - 1, 'close': i, 'volume': 10 * i}
+            for i in range(3)]
+    cols = columns_from_rows(rows)
+    assert cols['time'].tolist() == [OPEN_UTC, OPEN_UTC + 60, OPEN_UTC + 120]
+    assert cols['volume'].dtype.kind == 'i' and cols['volume'].tolist() == [0, 10, 20]
+    assert columns_from_rows([])['time'].tolist() == []
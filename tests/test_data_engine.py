@@ -0,0 +1,52 @@
+import asyncio
+
+import tradingview_scraper.symbols.stream as tv_stream
+
+from data_engine import DataEngine
+from tests.test_tv_api import PACKETS
+
+
+class FakeSocket:
+    def __init__(self):
+        self.aborted = False
+
+    def abort(self):
+        self.aborted = True
+
+
+class FakeStreamer:
+    """Yields the recorded packets once, then ends like a closed TradingView socket."""
+
+    instances = []
+
+    def __init__(self, export_result=False):
+        self.stream_obj = type('Handler', (), {})()
+        self.stream_obj.ws = FakeSocket()
+        FakeStreamer.instances.append(self)
+
+    def stream(self, exchange, symbol, timeframe, numb_price_candles):
+        return iter(PACKETS[3:5])
+
+
+def test_poll_loop_reopens_the_streamer_after_the_stream_ends(monkeypatch):
+    monkeypatch.setattr(tv_stream, 'Streamer', FakeStreamer)
+    FakeStreamer.instances = []
+    bars = []
+    engine = object.__new__(DataEngine)
+
+    async def on_bar(symbol, ohlc):
+        bars.append((symbol, ohlc["close"]))
+
+    engine._on_bar = on_bar
+
+    async def run():
+        task = asyncio.create_task(engine._stream_loop('NIFTY'))
+        while len(FakeStreamer.instances) < 2:
+            await asyncio.sleep(0.05)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    asyncio.run(asyncio.wait_for(run(), 10))
+    assert len(FakeStreamer.instances) >= 2
+    assert bars[0] == ('NIFTY', 22120.0)
+    assert all(streamer.stream_obj.ws.aborted for streamer in FakeStreamer.instances[:-1])
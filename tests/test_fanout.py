@@ -0,0 +1,220 @@
+import asyncio
+import json
+
+from core.fanout import (COMPACT, DELTA, DISCONNECT, DROP_OLDEST, JSON, KEYFRAME, TICK_FIELDS, FanoutHub,
+                         negotiate_encoding, tick_delta, tick_values)
+
+
+class StuckSocket:
+    """A client that never reads: its send queue only fills."""
+
+    def __init__(self):
+        self.closed_with = None
+
+    async def send_text(self, payload):
+        await asyncio.Event().wait()
+
+    async def send_bytes(self, payload):
+        await asyncio.Event().wait()
+
+    async def close(self, code=1000):
+        self.closed_with = code
+
+
+class CompactClient:
+    """Applies compact keyframes and deltas the way the dashboard does."""
+
+    def __init__(self):
+        self.values = {}
+        self.symbols = {}
+        self.seqs = []
+
+    def apply(self, payload):
+        frame = json.loads(payload)
+        if not isinstance(frame, list):
+            return
+        if frame[0] == KEYFRAME:
+            _, symbol_id, _, symbol, *rest = frame
+            self.symbols[symbol_id] = symbol
+            self.values[symbol] = list(rest[:len(TICK_FIELDS)])
+            self.seqs.append(rest[len(TICK_FIELDS)])
+        elif frame[0] == DELTA:
+            _, symbol_id, _, mask, *rest = frame
+            symbol = self.symbols.get(symbol_id)
+            if symbol is None:
+                return
+            changed = iter(rest)
+            for i in range(len(TICK_FIELDS)):
+                if mask & (1 << i):
+                    self.values[symbol][i] = next(changed)
+            self.seqs.append(next(changed))
+
+
+def drain(channel):
+    payloads = []
+    while not channel.queue.empty():
+        payloads.append(channel.queue.get_nowait())
+    return payloads
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_negotiate_encoding():
+    assert negotiate_encoding(None) == JSON
+    assert negotiate_encoding('COMPACT') == COMPACT
+    assert negotiate_encoding('xml') == JSON
+
+
+def test_tick_delta_carries_only_changed_fields():
+    prev = tick_values(100.0, 99.0, 101.0, 98.0, 500, 1.0, 1.01)
+    values = tick_values(100.5, 99.0, 101.0, 98.0, 520, 1.5, 1.52)
+    assert tick_delta(3, 1000, values, prev, 42) == [DELTA, 3, 1000, 0b1110001, 100.5, 520, 1.5, 1.52, 42]
+
+
+def test_publish_encodes_once_and_skips_unsubscribed():
+    async def scenario():
+        hub = FanoutHub(max_queue=8)
+        a, b, c = StuckSocket(), StuckSocket(), StuckSocket()
+        for ws in (a, b, c):
+            hub.register(ws)
+        hub.set_subscriptions(a, ['NIFTY'])
+        hub.set_subscriptions(b, ['NIFTY', 'BANKNIFTY'])
+        hub.set_subscriptions(c, ['BANKNIFTY'])
+        assert hub.publish('NIFTY', {"type": "oi_update", "symbol": "NIFTY"}) == 2
+        qa, qb, qc = (drain(hub.channels[ws]) for ws in (a, b, c))
+        assert qa == qb and qa[0] is qb[0] and qc == []
+        for ws in (a, b, c):
+            hub.unregister(ws)
+    run(scenario())
+
+
+def test_compact_client_gets_keyframe_then_deltas():
+    async def scenario():
+        hub = FanoutHub(max_queue=8)
+        ws = StuckSocket()
+        hub.register(ws, COMPACT)
+        hub.set_subscriptions(ws, ['NIFTY'])
+        hub.publish_tick('NIFTY', 1000, tick_values(100.0, 99.0, 101.0, 98.0, 10))
+        hub.publish_tick('NIFTY', 2000, tick_values(100.5, 99.0, 101.0, 98.0, 12))
+        frames = [json.loads(p) for p in drain(hub.channels[ws])]
+        assert [f[0] for f in frames] == [KEYFRAME, DELTA]
+        assert frames[1][-1] == 2
+        hub.unregister(ws)
+    run(scenario())
+
+
+def test_drop_oldest_resyncs_compact_clients_immediately():
+    async def scenario():
+        hub = FanoutHub(max_queue=4, slow_consumer_policy=DROP_OLDEST)
+        ws = StuckSocket()
+        hub.register(ws, COMPACT)
+        hub.set_subscriptions(ws, ['NIFTY', 'BANKNIFTY'])
+        client = CompactClient()
+        # More ticks than the queue holds, each changing a different field
+        for i in range(12):
+            symbol = 'NIFTY' if i % 3 else 'BANKNIFTY'
+            hub.publish_tick(symbol, 1000 + i, tick_values(100.0 + i, 99.0, 101.0 + i % 2, 98.0, 10 * i))
+        channel = hub.channels[ws]
+        assert channel.dropped > 0
+        for payload in drain(channel):
+            client.apply(payload)
+        # Whatever was dropped, the client ends on the published values without waiting for another tick
+        for symbol in ('NIFTY', 'BANKNIFTY'):
+            assert tuple(client.values[symbol]) == hub.last_ticks[symbol]
+        hub.publish_tick('NIFTY', 5000, tick_values(200.0, 99.0, 201.0, 98.0, 999))
+        client.apply(drain(channel)[-1])
+        assert tuple(client.values['NIFTY']) == hub.last_ticks['NIFTY']
+        hub.unregister(ws)
+    run(scenario())
+
+
+def test_dropped_delta_is_repaired_without_another_tick():
+    async def scenario():
+        hub = FanoutHub(max_queue=4, slow_consumer_policy=DROP_OLDEST)
+        ws = StuckSocket()
+        hub.register(ws, COMPACT)
+        hub.set_subscriptions(ws, ['NIFTY', 'BANKNIFTY'])
+        channel = hub.channels[ws]
+        client = CompactClient()
+        hub.publish_tick('NIFTY', 1000, tick_values(100.0, 99.0, 101.0, 98.0, 10))
+        for payload in drain(channel):
+            client.apply(payload)
+        # The only delta that moves the high, then ltp-only deltas filling the queue
+        hub.publish_tick('NIFTY', 2000, tick_values(104.0, 99.0, 105.0, 98.0, 10))
+        for i in range(3):
+            hub.publish_tick('NIFTY', 3000 + i, tick_values(103.0 - i, 99.0, 105.0, 98.0, 10))
+        # A BANKNIFTY tick pushes the high-moving delta out of the full queue
+        hub.publish_tick('BANKNIFTY', 4000, tick_values(48000.0))
+        assert channel.dropped >= 1
+        for payload in drain(channel):
+            client.apply(payload)
+        assert tuple(client.values['NIFTY']) == hub.last_ticks['NIFTY']
+        assert client.values['NIFTY'][2] == 105.0
+        hub.unregister(ws)
+    run(scenario())
+
+
+def test_disconnect_policy_closes_slow_consumer():
+    async def scenario():
+        hub = FanoutHub(max_queue=2, slow_consumer_policy=DISCONNECT)
+        ws = StuckSocket()
+        hub.register(ws)
+        hub.set_subscriptions(ws, ['NIFTY'])
+        for i in range(4):
+            hub.publish_tick('NIFTY', 1000 + i, tick_values(100.0 + i))
+        await asyncio.sleep(0)
+        assert hub.channels[ws].closed and ws.closed_with == 1013
+        hub.unregister(ws)
+    run(scenario())
+
+
+def test_rate_capped_client_gets_latest_value_on_flush():
+    async def scenario():
+        hub = FanoutHub(max_queue=16, flush_interval=60)
+        capped, full = StuckSocket(), StuckSocket()
+        hub.register(capped, COMPACT)
+        hub.register(full, COMPACT)
+        hub.set_subscriptions(capped, ['NIFTY'], {'NIFTY': 2})
+        hub.set_subscriptions(full, ['NIFTY'])
+        for i in range(5):
+            hub.publish_tick('NIFTY', 1000 + i, tick_values(100.0 + i, 99.0, 101.0 + i, 98.0, 10 + i))
+        capped_channel = hub.channels[capped]
+        assert len(drain(hub.channels[full])) == 5
+        # First tick goes out at once; the rest collapse into one held value
+        client = CompactClient()
+        for payload in drain(capped_channel):
+            client.apply(payload)
+        assert client.seqs == [1] and capped_channel.pending['NIFTY'][2] == 5
+        # Not due yet: nothing is sent
+        now = asyncio.get_running_loop().time()
+        hub.flush_conflated(now)
+        assert capped_channel.queue.empty()
+        hub.flush_conflated(now + 1)
+        for payload in drain(capped_channel):
+            client.apply(payload)
+        assert client.seqs == [1, 5] and tuple(client.values['NIFTY']) == hub.last_ticks['NIFTY']
+        assert not capped_channel.pending and capped_channel not in hub.conflating
+        for ws in (capped, full):
+            hub.unregister(ws)
+    run(scenario())
+
+
+def test_lifting_the_cap_hands_over_held_tick_as_keyframe():
+    async def scenario():
+        hub = FanoutHub(max_queue=16, flush_interval=60)
+        ws = StuckSocket()
+        hub.register(ws, COMPACT)
+        hub.set_subscriptions(ws, ['NIFTY'], {'NIFTY': 1})
+        hub.publish_tick('NIFTY', 1000, tick_values(100.0))
+        hub.publish_tick('NIFTY', 2000, tick_values(101.0))
+        channel = hub.channels[ws]
+        drain(channel)
+        hub.set_subscriptions(ws, ['NIFTY'])
+        frames = [json.loads(p) for p in drain(channel)]
+        assert [f[0] for f in frames] == [KEYFRAME] and frames[0][4] == 101.0
+        hub.publish_tick('NIFTY', 3000, tick_values(102.0))
+        assert json.loads(drain(channel)[0])[0] == DELTA
+        hub.unregister(ws)
+    run(scenario())
@@ -0,0 +1,64 @@
+import numpy as np
+
+from core.footprint import FootprintEngine, profile_stats
+from core.resampler import NSE_SESSION_OPEN_UTC
+
+OPEN = 1704067200 + NSE_SESSION_OPEN_UTC
+
+
+def test_tick_rule_classifies_volume_added_since_last_snapshot():
+    engine = FootprintEngine(price_step=1.0)
+    # First snapshot only sets the reference price and cumulative volume
+    assert engine.on_tick('nifty', OPEN, 100.0, 10) is None
+    up = engine.on_tick('NIFTY', OPEN, 101.0, 15)
+    assert up == {"type": "footprint_update", "symbol": "NIFTY", "time": OPEN, "price": 101.0,
+                  "buy": 5.0, "sell": 0.0, "side": "buy", "delta": 5.0}
+    # Unchanged price keeps the side of the last move; a downtick sells
+    assert engine.on_tick('NIFTY', OPEN, 101.0, 18)["buy"] == 8.0
+    down = engine.on_tick('NIFTY', OPEN, 100.0, 20)
+    assert (down["side"], down["sell"], down["delta"]) == ("sell", 2.0, 6.0)
+    # No new volume, or an older bar: nothing to publish
+    assert engine.on_tick('NIFTY', OPEN, 99.0, 20) is None
+    assert engine.on_tick('NIFTY', OPEN - 60, 99.0, 50) is None
+
+
+def test_price_levels_bucket_at_the_step():
+    engine = FootprintEngine(price_step=5.0, price_steps={'BANKNIFTY': 10.0})
+    engine.on_tick('NIFTY', OPEN, 22000.0, 0)
+    assert engine.on_tick('NIFTY', OPEN, 22003.0, 4)["price"] == 22005.0
+    assert engine.on_tick('NIFTY', OPEN, 22001.0, 6)["price"] == 22000.0
+    # Far from the first level: the arrays grow instead of clipping
+    assert engine.on_tick('NIFTY', OPEN, 21500.0, 7)["sell"] == 1.0
+    assert engine.step_for('banknifty') == 10.0
+
+
+def test_new_minute_starts_a_new_bar_with_its_own_volume():
+    engine = FootprintEngine(price_step=1.0)
+    engine.on_tick('NIFTY', OPEN, 100.0, 10)
+    engine.on_tick('NIFTY', OPEN, 101.0, 20)
+    # The next minute's snapshot volume is that minute's own cumulative volume
+    rolled = engine.on_tick('NIFTY', OPEN + 60, 102.0, 7)
+    assert rolled["time"] == OPEN + 60 and rolled["buy"] == 7.0 and rolled["delta"] == 7.0
+    assert [bar["time"] for bar in engine.get_bars('NIFTY', '1')] == [OPEN, OPEN + 60]
+
+
+def test_get_bars_merges_minutes_into_interval_profile():
+    engine = FootprintEngine(price_step=1.0)
+    engine.on_tick('NIFTY', OPEN, 100.0, 0)
+    engine.on_tick('NIFTY', OPEN, 101.0, 10)
+    engine.on_tick('NIFTY', OPEN + 60, 100.0, 4)
+    engine.on_tick('NIFTY', OPEN + 120, 101.0, 6)
+    engine.on_tick('NIFTY', OPEN + 300, 103.0, 1)
+    first, second = engine.get_bars('NIFTY', '5')
+    assert first["time"] == OPEN and second["time"] == OPEN + 300
+    assert first["prices"] == [100.0, 101.0]
+    assert first["buy"] == [0.0, 16.0] and first["sell"] == [4.0, 0.0]
+    assert (first["volume"], first["delta"], first["poc"]) == (20.0, 12.0, 101.0)
+    assert engine.get_bars('NIFTY', '5', n_bars=1) == [second]
+    assert engine.get_bars('BANKNIFTY') == []
+
+
+def test_value_area_expands_towards_heavier_side():
+    buy = np.array([1.0, 2.0, 10.0, 5.0, 1.0])
+    poc, val, vah = profile_stats(buy, np.zeros(5), 0.7)
+    assert (poc, val, vah) == (2, 2, 3)
@@ -0,0 +1,104 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from core.greeks import GreeksEngine, SECONDS_PER_YEAR, bs_greeks, bs_price, expiry_datetime, implied_vol
+from core.option_chain import IST
+
+R = 0.065
+
+
+def test_implied_vol_round_trip():
+    strike = np.array([20000.0, 21000, 22000, 23000, 24000] * 2)
+    is_call = np.r_[np.ones(5, dtype=bool), np.zeros(5, dtype=bool)]
+    sigma = np.array([0.25, 0.2, 0.15, 0.18, 0.3] * 2)
+    t = np.full(10, 20 / 365)
+    price = bs_price(22000.0, strike, t, R, sigma, is_call)
+    solved = implied_vol(price, 22000.0, strike, t, R, is_call, tol=1e-8)
+    assert np.allclose(solved, sigma, atol=1e-4)
+
+
+def test_implied_vol_outside_arbitrage_bounds_is_nan():
+    strike = np.array([21000.0, 21000.0, 23000.0])
+    is_call = np.array([True, True, False])
+    t = np.full(3, 0.05)
+    # Below intrinsic, above spot, and a put above the discounted strike
+    price = np.array([500.0, 22500.0, 23500.0])
+    assert np.isnan(implied_vol(price, 22000.0, strike, t, R, is_call)).all()
+
+
+def test_greeks_put_call_parity():
+    strike = np.array([22000.0, 22000.0])
+    is_call = np.array([True, False])
+    g = bs_greeks(22000.0, strike, np.full(2, 0.1), R, np.full(2, 0.2), is_call)
+    assert np.isclose(g["delta"][0] - g["delta"][1], 1.0)
+    assert np.isclose(g["gamma"][0], g["gamma"][1])
+    assert np.isclose(g["vega"][0], g["vega"][1])
+    assert (g["theta"] < 0).all()
+
+
+def test_expiry_formats():
+    for text in ('30-Oct-2026', '2026-10-30', '30Oct2026'):
+        assert expiry_datetime(text) == datetime(2026, 10, 30, 15, 30, tzinfo=IST)
+    assert expiry_datetime('soon') is None
+    assert expiry_datetime(None) is None
+
+
+def chain(spot=22000.0, bump=0.0):
+    expiry = (datetime.now(IST) + timedelta(days=14)).strftime('%d-%b-%Y')
+    years = (expiry_datetime(expiry).timestamp() - datetime.now(IST).timestamp()) / SECONDS_PER_YEAR
+    strikes = np.array([21800.0, 22000.0, 22200.0])
+    ce = bs_price(spot, strikes, years, R, 0.15, True)
+    pe = bs_price(spot, strikes, years, R, 0.15, False)
+    return {
+        "symbol": "NIFTY",
+        "spot": spot,
+        "expiry": expiry,
+        "strikes": [{"strike": float(k), "ce_ltp": round(float(c) + bump, 2), "pe_ltp": round(float(p), 2),
+                     "ce_oi": 1, "pe_oi": 1, "ce_change": 0, "pe_change": 0}
+                    for k, c, p in zip(strikes, ce, pe)]
+    }
+
+
+def test_engine_solves_once_per_chain_version():
+    engine = GreeksEngine(risk_free_rate=R)
+    engine.attach(chain())
+    engine.attach(chain())
+    assert engine.solves == 1 and engine.chains["NIFTY"].version == 1
+    result = engine.attach(chain())["greeks"]
+    assert [round(iv) for iv in result["ce"]["iv"]] == [15, 15, 15]
+    assert 0.4 < result["ce"]["delta"][1] < 0.6
+    engine.attach(chain(bump=5.0))
+    assert engine.solves == 2 and engine.chains["NIFTY"].version == 2
+
+
+def test_greeks_update_throttled_per_spot_and_version():
+    engine = GreeksEngine(risk_free_rate=R, push_interval=60)
+    assert engine.on_spot("NIFTY", 22000.0) is None
+    engine.attach(chain())
+    first = engine.on_spot("NIFTY", 22010.0)
+    assert first["type"] == "greeks_update" and first["spot"] == 22010.0 and first["version"] == 1
+    # Greeks follow every tick, but the push waits for the interval
+    computes = engine.computes
+    assert engine.on_spot("NIFTY", 22020.0) is None
+    assert engine.computes == computes + 1 and engine.chains["NIFTY"].latest["spot"] == 22020.0
+    # A new chain version is pushed straight away
+    engine.attach(chain(bump=5.0))
+    second = engine.on_spot("NIFTY", 22040.0)
+    assert second["version"] == 2 and second["spot"] == 22040.0
+    engine.push_interval = 0
+    assert engine.on_spot("NIFTY", 22040.0) is None
+    assert engine.on_spot("NIFTY", 22050.0)["spot"] == 22050.0
+
+
+def test_position_greeks():
+    engine = GreeksEngine(risk_free_rate=R)
+    engine.attach(chain())
+    assert engine.position_greeks("NIFTY", 50) == {"delta": 50.0, "gamma": 0.0}
+    option = engine.position_greeks("NIFTY26OCT22000CE", 75)
+    assert 0.4 * 75 < option["delta"] < 0.6 * 75 and option["gamma"] > 0
+    assert engine.position_greeks("NIFTY26OCT22000PE", 75)["delta"] < 0
+    assert engine.position_greeks("BANKNIFTY26OCT48000CE", 15) is None
+    # Marked at the latest spot, not the chain's
+    engine.on_spot("NIFTY", 22300.0)
+    assert engine.position_greeks("NIFTY26OCT22000CE", 75)["delta"] > option["delta"]
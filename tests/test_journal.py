@@ -0,0 +1,35 @@
+from core.journal import TICK, MessageJournal
+
+
+def test_seqs_are_per_symbol():
+    journal = MessageJournal()
+    assert journal.record_tick('NIFTY', 1000, (1.0,)) == 1
+    assert journal.record_message('NIFTY', {"type": "footprint"}) == 2
+    assert journal.record_tick('BANKNIFTY', 1000, (2.0,)) == 1
+    assert journal.last_seq('NIFTY') == 2 and journal.last_seq('FINNIFTY') == 0
+    assert journal.last_tick('NIFTY') == (1, 1000, (1.0,))
+
+
+def test_since_replays_only_missed_entries():
+    journal = MessageJournal()
+    journal.record_tick('NIFTY', 1000, (1.0,))
+    message = {"type": "structure_update"}
+    journal.record_message('NIFTY', message)
+    journal.record_tick('NIFTY', 2000, (2.0,))
+    assert message["seq"] == 2
+    assert journal.since('NIFTY', 1, journal.epoch) == [(2, message), (3, (TICK, 2000, (2.0,)))]
+    assert journal.since('NIFTY', 3, journal.epoch) == []
+
+
+def test_since_refuses_gaps_it_cannot_fill():
+    journal = MessageJournal(size=4)
+    for i in range(10):
+        journal.record_tick('NIFTY', i, (float(i),))
+    # Still buffered: seqs 7..10
+    assert [seq for seq, _ in journal.since('NIFTY', 6, journal.epoch)] == [7, 8, 9, 10]
+    # Overrun, ahead of the server, negative, or another server's epoch: snapshot instead
+    assert journal.since('NIFTY', 5, journal.epoch) is None
+    assert journal.since('NIFTY', 11, journal.epoch) is None
+    assert journal.since('NIFTY', -1, journal.epoch) is None
+    assert journal.since('NIFTY', 8, 'other-epoch') is None
+    assert MessageJournal().epoch != journal.epoch
@@ -0,0 +1,44 @@
+import asyncio
+
+import server
+from core.resampler import NSE_SESSION_OPEN_UTC, SESSION_MINUTES
+from data.providers import provider_registry
+
+OPEN = 1704067200 + NSE_SESSION_OPEN_UTC
+
+
+def bars(times):
+    return [{"time": t, "open": 1.0, "high": 1.0, "low": 1.0, "close": 1.0, "volume": 1} for t in times]
+
+
+def load(monkeypatch, stored_times):
+    fetched = bars([OPEN + i * 60 for i in range(10)])
+    calls = []
+
+    async def get_bars(symbol, interval, limit=5000):
+        return bars(stored_times)[-limit:]
+
+    async def fetch(kind, method, *args):
+        calls.append(args)
+        return fetched
+
+    monkeypatch.setattr(server.sqlite_db, 'get_bars', get_bars)
+    monkeypatch.setattr(server, 'is_fresh', lambda *args: True)
+    monkeypatch.setattr(provider_registry, 'fetch', fetch)
+    monkeypatch.setattr(server.timeseries_writer, 'add_bars', lambda *args: None)
+    return asyncio.run(server.load_candles('NIFTY', '1', 10)), calls
+
+
+def test_contiguous_store_is_served(monkeypatch):
+    yesterday = [OPEN - 86400 + (SESSION_MINUTES - 4 + i) * 60 for i in range(4)]
+    today = [OPEN + i * 60 for i in range(6)]
+    candles, calls = load(monkeypatch, yesterday + today)
+    assert not calls and [c["time"] for c in candles] == yesterday + today
+
+
+def test_gapped_store_is_backfilled_upstream(monkeypatch):
+    # Written before and after a mid-session restart
+    yesterday = [OPEN - 86400 + (SESSION_MINUTES - 4 + i) * 60 for i in range(4)]
+    after_restart = [OPEN + (30 + i) * 60 for i in range(6)]
+    candles, calls = load(monkeypatch, yesterday + after_restart)
+    assert calls == [('NIFTY', '1', 10)] and candles[0]["time"] == OPEN
@@ -0,0 +1,70 @@
+from core.market_structure import MarketStructureEngine
+from core.resampler import NSE_SESSION_OPEN_UTC, BarSeries
+
+OPEN = 1704067200 + NSE_SESSION_OPEN_UTC
+
+# (open, high, low, close): a swing high at 105, then a close through it
+BREAKOUT = [
+    (100.0, 101.0, 99.0, 100.5),
+    (100.5, 103.0, 100.0, 102.0),
+    (102.0, 105.0, 101.0, 103.0),
+    (103.0, 104.0, 100.0, 100.5),  # last bearish candle before the break
+    (100.5, 102.0, 99.5, 101.0),
+    (101.0, 107.0, 100.5, 106.0),
+    (106.0, 106.5, 105.0, 106.0),
+]
+
+
+def feed(engine, bars, start=OPEN):
+    return [engine.on_bar('NIFTY', start + i * 60, *bar) for i, bar in enumerate(bars)]
+
+
+def order_blocks(engine):
+    return [level for level in engine.get_levels('NIFTY') if level["kind"] == "order_block"]
+
+
+def test_break_of_swing_high_forms_bullish_order_block():
+    engine = MarketStructureEngine(swing_length=2)
+    messages = feed(engine, BREAKOUT)
+    assert messages[0] is None
+    blocks = order_blocks(engine)
+    assert len(blocks) == 1
+    block = blocks[0]
+    assert (block["side"], block["top"], block["bottom"], block["time"]) == ("bullish", 104.0, 100.0, OPEN + 180)
+    # Announced as the breakout bar closed, i.e. when the following minute started
+    assert block in messages[6]["added"] and messages[6]["time"] == OPEN + 300
+
+
+def test_close_through_block_removes_it():
+    engine = MarketStructureEngine(swing_length=2)
+    feed(engine, BREAKOUT)
+    block_id = order_blocks(engine)[0]["id"]
+    messages = feed(engine, [(105.0, 105.0, 98.0, 99.0), (99.0, 99.5, 98.5, 99.0)], start=OPEN + 7 * 60)
+    assert block_id in messages[1]["removed"]
+    # The same close breaks the swing low, so the last bullish candle becomes a bearish block
+    assert [(b["side"], b["top"]) for b in order_blocks(engine)] == [("bearish", 107.0)]
+
+
+def test_day_roll_publishes_previous_session_range():
+    engine = MarketStructureEngine(swing_length=2)
+    feed(engine, BREAKOUT)
+    next_day = OPEN + 86400
+    feed(engine, [(106.0, 106.0, 105.0, 105.5), (105.5, 106.0, 105.0, 105.5)], start=next_day)
+    levels = {level["id"]: level for level in engine.get_levels('NIFTY')}
+    assert levels["pdh"]["price"] == 107.0 and levels["pdl"]["price"] == 99.0
+    assert levels["session_high"]["time"] == next_day
+
+
+def test_seed_matches_incremental_build():
+    incremental = MarketStructureEngine(swing_length=2)
+    feed(incremental, BREAKOUT)
+    seeded = MarketStructureEngine(swing_length=2)
+    series = BarSeries.from_candles('1', [
+        {"time": OPEN + i * 60, "open": o, "high": h, "low": l, "close": c, "volume": 1}
+        for i, (o, h, l, c) in enumerate(BREAKOUT)
+    ])
+    message = seeded.seed('NIFTY', series)
+    assert message["full"] and message["added"] == incremental.get_levels('NIFTY')
+    # The same depth again is a no-op; the forming bar keeps closing through on_bar
+    assert seeded.seed('NIFTY', series) is None
+    assert seeded.seeded_bars('NIFTY') == len(BREAKOUT)
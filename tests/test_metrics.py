@@ -0,0 +1,50 @@
+from core.metrics import MetricsRegistry
+
+
+def test_histogram_buckets_are_cumulative_up_to_inf():
+    registry = MetricsRegistry(namespace='t')
+    histogram = registry.histogram('fetch_seconds', 'Fetch latency', ('provider',), buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 2.5):
+        histogram.observe(value, ('nse',))
+    assert registry.render().splitlines() == [
+        '# HELP t_fetch_seconds Fetch latency',
+        '# TYPE t_fetch_seconds histogram',
+        't_fetch_seconds_bucket{provider="nse",le="0.1"} 2',
+        't_fetch_seconds_bucket{provider="nse",le="1"} 3',
+        't_fetch_seconds_bucket{provider="nse",le="+Inf"} 4',
+        't_fetch_seconds_sum{provider="nse"} 3.15',
+        't_fetch_seconds_count{provider="nse"} 4',
+    ]
+
+
+def test_counter_label_values_are_escaped():
+    registry = MetricsRegistry(namespace='t')
+    counter = registry.counter('errors_total', 'Errors', ('reason',))
+    counter.inc(('say "hi"\\now\nthen',))
+    counter.inc(('plain',), 2)
+    counter.inc(('plain',), 0.5)
+    assert registry.render().splitlines()[2:] == [
+        't_errors_total{reason="say \\"hi\\"\\\\now\\nthen"} 1',
+        't_errors_total{reason="plain"} 2.5',
+    ]
+
+
+def test_unlabelled_counter_renders_without_braces():
+    registry = MetricsRegistry(namespace='t')
+    registry.counter('ticks_total', 'Ticks').inc()
+    assert registry.render() == '# HELP t_ticks_total Ticks\n# TYPE t_ticks_total counter\nt_ticks_total 1\n'
+
+
+def test_failing_collector_is_skipped():
+    registry = MetricsRegistry(namespace='t')
+
+    def broken():
+        raise RuntimeError("boom")
+
+    registry.collector(broken)
+    registry.collector(lambda: [('queue_depth', 'gauge', 'Queue depth', [({'queue': 'ticks'}, 3)])])
+    assert registry.render().splitlines() == [
+        '# HELP t_queue_depth Queue depth',
+        '# TYPE t_queue_depth gauge',
+        't_queue_depth{queue="ticks"} 3',
+    ]
@@ -0,0 +1,109 @@
+import asyncio
+
+import httpx
+import pytest
+
+import data.nse_api as nse_module
+from data.nse_api import NSEAPI
+
+CHAIN_URL = f"{NSEAPI.BASE_URL}/api/option-chain-indices?symbol=NIFTY"
+
+
+def _api(monkeypatch, handler):
+    """NSEAPI over a mock transport; returns (api, requested paths, retry sleeps)."""
+    paths, sleeps = [], []
+
+    def record(request):
+        paths.append(request.url.path)
+        return handler(request, len(paths))
+
+    async def sleep(delay):
+        sleeps.append(delay)
+
+    monkeypatch.setattr(nse_module.asyncio, 'sleep', sleep)
+    api = NSEAPI()
+    api.client = httpx.AsyncClient(transport=httpx.MockTransport(record))
+    return api, paths, sleeps
+
+
+def test_expired_cookies_are_refreshed_once_and_the_request_retried(monkeypatch):
+    chain_calls = []
+
+    def handler(request, n):
+        if request.url.path == '/':
+            return httpx.Response(200, headers={'set-cookie': f'nsit=gen{n}; Path=/'})
+        chain_calls.append(request.headers.get('cookie'))
+        return httpx.Response(401 if len(chain_calls) == 1 else 200, json={"records": {}})
+
+    api, paths, sleeps = _api(monkeypatch, handler)
+    assert asyncio.run(api.get_json(CHAIN_URL)) == {"records": {}}
+    assert paths == ['/', '/api/option-chain-indices', '/', '/api/option-chain-indices']
+    assert chain_calls == ['nsit=gen1', 'nsit=gen3']
+    assert api.cookie_generation == 2 and sleeps == []
+
+
+@pytest.mark.parametrize('status', [400, 404])
+def test_other_client_errors_are_not_retried(monkeypatch, status):
+    api, paths, sleeps = _api(monkeypatch, lambda request, n: httpx.Response(200 if request.url.path == '/' else status))
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(api.get_json(CHAIN_URL))
+    assert paths == ['/', '/api/option-chain-indices'] and sleeps == []
+
+
+def test_throttling_server_errors_and_transport_errors_are_retried(monkeypatch):
+    outcomes = iter([429, 503, httpx.ConnectError("reset"), 200])
+
+    def handler(request, n):
+        if request.url.path == '/':
+            return httpx.Response(200)
+        outcome = next(outcomes)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return httpx.Response(outcome, json={"ok": True})
+
+    api, paths, sleeps = _api(monkeypatch, handler)
+    assert asyncio.run(api.get_json(CHAIN_URL, backoff_factor=1.0)) == {"ok": True}
+    assert len(paths) == 5 and len(sleeps) == 3
+    assert [int(s) for s in sleeps] == [1, 2, 4]
+
+
+def test_retries_stop_at_max_retries(monkeypatch):
+    api, paths, sleeps = _api(monkeypatch, lambda request, n: httpx.Response(200 if request.url.path == '/' else 502))
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(api.get_json(CHAIN_URL, max_retries=3))
+    assert paths.count('/api/option-chain-indices') == 3 and len(sleeps) == 2
+
+
+RESPONSE = {"records": {
+    "expiryDates": ["27-Feb-2025", "06-Mar-2025"],
+    "underlyingValue": 22150.35,
+    "data": [
+        {"strikePrice": 22200, "expiryDate": "27-Feb-2025",
+         "CE": {"openInterest": 1000, "changeinOpenInterest": -50, "lastPrice": 80.5},
+         "PE": {"openInterest": 3000, "changeinOpenInterest": 200, "lastPrice": 120}},
+        {"strikePrice": 22100.0, "expiryDate": "27-Feb-2025",
+         "CE": {"openInterest": 500, "lastPrice": 130.25}},
+        {"strikePrice": 22150.5, "expiryDate": "06-Mar-2025",
+         "PE": {"openInterest": 9999, "lastPrice": 1}},
+    ]
+}}
+
+
+def test_normalize_picks_the_nearest_expiry_and_sorts_strikes():
+    chain = NSEAPI.normalize_oi_data(RESPONSE, 'NSE:NIFTY')
+    assert chain["expiry"] == "27-Feb-2025" and chain["expiries"] == ["27-Feb-2025", "06-Mar-2025"]
+    assert chain["spot"] == 22150.35 and chain["source"] == "nse"
+    assert chain["strikes"] == [
+        {"strike": 22100, "ce_oi": 500, "pe_oi": 0, "ce_change": 0, "pe_change": 0, "ce_ltp": 130.25, "pe_ltp": 0.0},
+        {"strike": 22200, "ce_oi": 1000, "pe_oi": 3000, "ce_change": -50, "pe_change": 200, "ce_ltp": 80.5,
+         "pe_ltp": 120.0},
+    ]
+    assert chain["pcr"] == 2.0
+
+
+def test_normalize_other_expiry_and_empty_responses():
+    chain = NSEAPI.normalize_oi_data(RESPONSE, 'NSE:NIFTY', expiry="06-Mar-2025")
+    assert [s["strike"] for s in chain["strikes"]] == [22150.5]
+    assert chain["pcr"] == 0
+    assert NSEAPI.normalize_oi_data({"records": {"data": []}}, 'NSE:NIFTY') is None
+    assert NSEAPI.normalize_oi_data(None, 'NSE:NIFTY') is None
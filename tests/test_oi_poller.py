@@ -0,0 +1,115 @@
+import asyncio
+
+from core.oi_poller import OIPoller
+
+
+class Manager:
+    def __init__(self):
+        self.sent = []
+
+    async def broadcast_to_symbol(self, symbol, message):
+        self.sent.append(message)
+
+
+def chain(ce_oi=100, pcr=0.9, trend_ts=1):
+    return {
+        "symbol": "NIFTY",
+        "expiry": "30-Oct-2026",
+        "timestamp": f"t{trend_ts}",
+        "strikes": [
+            {"strike": 22000, "ce_oi": ce_oi, "pe_oi": 90},
+            {"strike": 22100, "ce_oi": 80, "pe_oi": 70},
+        ],
+        "analytics": {"pcr": pcr, "max_pain": 22000, "pcr_trend": [[trend_ts, pcr]]},
+        "greeks": {"spot": 22000 + trend_ts, "version": trend_ts, "ce": {"delta": [0.5, 0.4]}},
+    }
+
+
+def poll(poller, chains):
+    async def run():
+        for c in chains:
+            poller.fetch = lambda symbol, c=c: asyncio.sleep(0, c)
+            await poller._poll("NIFTY")
+    asyncio.run(run())
+
+
+def types(messages):
+    return [m["type"] for m in messages]
+
+
+def test_first_poll_sends_snapshot_and_analytics():
+    manager = Manager()
+    poller = OIPoller(manager, fetch=None)
+    poller.track("NIFTY")
+    poll(poller, [chain()])
+    assert types(manager.sent) == ["oi_analytics", "oi_update"]
+    update = manager.sent[1]
+    assert update["full"] and update["version"] == 1
+    assert "analytics" not in update and "greeks" not in update
+
+
+def test_trend_and_greeks_alone_do_not_publish():
+    manager = Manager()
+    poller = OIPoller(manager, fetch=None)
+    poller.track("NIFTY")
+    poll(poller, [chain(trend_ts=1), chain(trend_ts=2), chain(trend_ts=3)])
+    assert types(manager.sent) == ["oi_analytics", "oi_update"]
+    assert poller.state["NIFTY"].version == 1
+
+
+def test_changed_strike_is_a_small_delta():
+    manager = Manager()
+    poller = OIPoller(manager, fetch=None)
+    poller.track("NIFTY")
+    poll(poller, [chain(), chain(ce_oi=150)])
+    delta = manager.sent[-1]
+    assert delta["type"] == "oi_update" and not delta["full"]
+    assert delta["base_version"] == 1 and delta["version"] == 2
+    assert [row["strike"] for row in delta["strikes"]] == [22000]
+
+
+def test_analytics_sent_when_values_change():
+    manager = Manager()
+    poller = OIPoller(manager, fetch=None)
+    poller.track("NIFTY")
+    poll(poller, [chain(pcr=0.9), chain(pcr=1.1, trend_ts=2)])
+    assert types(manager.sent) == ["oi_analytics", "oi_update", "oi_analytics"]
+    assert manager.sent[-1]["analytics"]["pcr"] == 1.1
+    assert poller.analytics_message("NIFTY")["analytics"]["pcr"] == 1.1
+
+
+def test_message_since():
+    manager = Manager()
+    poller = OIPoller(manager, fetch=None)
+    poller.track("NIFTY")
+    poll(poller, [chain(), chain(ce_oi=150)])
+    assert poller.message_since("NIFTY", 0)["full"]
+    since = poller.message_since("NIFTY", 1)
+    assert not since["full"] and [row["strike"] for row in since["strikes"]] == [22000]
+    # Newer than anything published: snapshot
+    assert poller.message_since("NIFTY", 7)["full"]
+
+
+def test_failed_poll_keeps_chain_and_flags_stale():
+    manager = Manager()
+    poller = OIPoller(manager, fetch=None)
+    poller.track("NIFTY")
+    poll(poller, [chain(), None, None, chain(ce_oi=150)])
+    assert types(manager.sent) == ["oi_analytics", "oi_update", "oi_status", "oi_status", "oi_update"]
+    stale, fresh = manager.sent[2], manager.sent[3]
+    assert stale["stale"] and stale["error"] and stale["version"] == 1
+    assert not fresh["stale"] and fresh["error"] is None
+    assert not manager.sent[-1]["full"] and manager.sent[-1]["base_version"] == 1
+
+
+def test_fetch_error_is_reported_in_status():
+    async def failing(symbol):
+        raise TimeoutError("upstream timed out")
+
+    manager = Manager()
+    poller = OIPoller(manager, fetch=failing)
+    poller.track("NIFTY")
+    asyncio.run(poller._poll("NIFTY"))
+    assert manager.sent == [{"type": "oi_status", "symbol": "NIFTY", "stale": True,
+                             "error": "TimeoutError: upstream timed out", "version": 0}]
+    assert poller.message_since("NIFTY") is None
@@ -0,0 +1,38 @@
+import numpy as np
+
+from core.option_analytics import OptionAnalytics, analyze_arrays, chain_arrays
+
+
+def row(expiry, strike, ce_oi, pe_oi, ce_ltp=10.0, pe_ltp=10.0, ce_change=0, pe_change=0):
+    return {"expiry": expiry, "strike": strike, "ce_oi": ce_oi, "pe_oi": pe_oi, "ce_change": ce_change,
+            "pe_change": pe_change, "ce_ltp": ce_ltp, "pe_ltp": pe_ltp}
+
+
+def brute_max_pain(rows):
+    def pain(k):
+        return sum(r["ce_oi"] * max(k - r["strike"], 0) + r["pe_oi"] * max(r["strike"] - k, 0) for r in rows)
+    return min((r["strike"] for r in rows), key=pain)
+
+
+def test_per_expiry_max_pain_and_pcr_match_brute_force():
+    rng = np.random.default_rng(7)
+    rows = [row(expiry, 21000.0 + 50 * i, int(rng.integers(0, 5000)), int(rng.integers(0, 5000)))
+            for expiry in ('2024-01-25', '2024-02-29') for i in range(40)]
+    result = analyze_arrays(chain_arrays(rows[::-1]), 22000.0)
+    for expiry in ('2024-01-25', '2024-02-29'):
+        rows_e = [r for r in rows if r["expiry"] == expiry]
+        assert result[expiry]["max_pain"] == brute_max_pain(rows_e)
+        pcr = sum(r["pe_oi"] for r in rows_e) / sum(r["ce_oi"] for r in rows_e)
+        assert result[expiry]["pcr"] == round(pcr, 4)
+        assert result[expiry]["atm_strike"] == 22000.0
+
+
+def test_buildup_matches_premium_by_expiry_and_strike():
+    analytics = OptionAnalytics()
+    first = [row('2024-01-25', 22000.0, 100, 100, ce_ltp=50.0), row('2024-02-29', 22000.0, 100, 100, ce_ltp=200.0)]
+    analytics.analyze({"symbol": "NIFTY", "spot": 22000.0, "strikes": first})
+    # Near expiry premium rises, far expiry falls; both add OI
+    second = [row('2024-02-29', 22000.0, 150, 100, ce_ltp=190.0, ce_change=50),
+              row('2024-01-25', 22000.0, 150, 100, ce_ltp=60.0, ce_change=50)]
+    result = analytics.analyze({"symbol": "NIFTY", "spot": 22000.0, "strikes": second})
+    assert result["strike_buildup"]["ce"] == ['short_buildup', 'long_buildup']
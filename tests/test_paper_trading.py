@@ -0,0 +1,142 @@
+import asyncio
+
+import pytest
+
+from core.paper_trading import CANCELLED, FILLED, OPEN, PaperTradingEngine, Position
+from sqlite_db import SQLiteDB
+
+CONFIG = {'initial_balance': 100000, 'max_position_size': 0, 'flush_interval_seconds': 1.0}
+
+
+class FakeDB:
+    def __init__(self, fail=0):
+        self.fail = fail
+        self.writes = []
+
+    async def write_paper_state(self, account, positions, orders):
+        if self.fail:
+            self.fail -= 1
+            raise OSError("disk I/O error")
+        self.writes.append((account, positions, orders))
+
+
+def engine(db=None):
+    paper = PaperTradingEngine(CONFIG)
+    paper.db = db
+    return paper
+
+
+def test_position_fill_and_flip():
+    position = Position('PAPERTEST')
+    assert position.fill(10, 100.0) == 0
+    assert position.fill(10, 110.0) == 0 and position.avg_price == 105.0
+    assert position.fill(-15, 120.0) == 225.0 and position.qty == 5
+    # Through flat: the remainder opens short at the fill price
+    assert position.fill(-10, 100.0) == -25.0
+    assert position.qty == -5 and position.avg_price == 100.0
+
+
+def test_market_order_fills_on_next_tick():
+    paper = engine()
+    order = paper.place_order('papertest', 'buy', 10)
+    assert order['status'] == OPEN
+    paper.on_tick('PAPERTEST', 100.0, 1000)
+    assert paper.orders[order['id']].status == FILLED
+    assert paper.orders[order['id']].fill_price == 100.0
+    paper.on_tick('PAPERTEST', 103.0, 2000)
+    account = paper.account()
+    assert account['unrealized_pnl'] == 30.0 and account['open_positions'] == 1
+
+
+def test_limit_orders_fill_only_when_marketable():
+    paper = engine()
+    paper.on_tick('PAPERTEST', 100.0, 1000)
+    bid = paper.place_order('PAPERTEST', 'BUY', 5, 'LIMIT', 98.0)
+    ask = paper.place_order('PAPERTEST', 'SELL', 5, 'LIMIT', 105.0)
+    paper.on_tick('PAPERTEST', 99.0, 2000)
+    assert paper.orders[bid['id']].status == OPEN
+    paper.on_tick('PAPERTEST', 97.5, 3000)
+    assert paper.orders[bid['id']].status == FILLED and paper.orders[bid['id']].fill_price == 97.5
+    paper.on_tick('PAPERTEST', 106.0, 4000)
+    assert paper.orders[ask['id']].status == FILLED
+    assert paper.account()['realized_pnl'] == 42.5
+
+
+def test_rejects_and_cancel():
+    paper = engine()
+    for args in [('', 'BUY', 1), ('PAPERTEST', 'HOLD', 1), ('PAPERTEST', 'BUY', 0),
+                 ('PAPERTEST', 'BUY', 1, 'LIMIT', None)]:
+        with pytest.raises(ValueError):
+            paper.place_order(*args)
+    order = paper.place_order('PAPERTEST', 'BUY', 1, 'LIMIT', 50.0)
+    assert paper.cancel_order(order['id'])['status'] == CANCELLED
+    with pytest.raises(ValueError):
+        paper.cancel_order(order['id'])
+    paper.on_tick('PAPERTEST', 40.0, 1000)
+    assert paper.orders[order['id']].status == CANCELLED
+
+
+def test_flush_keeps_state_when_the_write_fails():
+    db = FakeDB(fail=1)
+    paper = engine(db)
+    order = paper.place_order('PAPERTEST', 'BUY', 10)
+    paper.on_tick('PAPERTEST', 100.0, 1000)
+
+    asyncio.run(paper.flush())
+    assert db.writes == []
+    # Still in memory and still dirty
+    assert order['id'] in paper.orders
+    assert order['id'] in paper.dirty_orders and 'PAPERTEST' in paper.dirty_positions and paper.account_dirty
+
+    asyncio.run(paper.flush())
+    account, positions, orders = db.writes[0]
+    assert [o['id'] for o in orders] == [order['id']] and orders[0]['status'] == FILLED
+    assert positions[0]['qty'] == 10 and account['balance'] == 100000
+    # Persisted once: the filled order leaves the working set
+    assert order['id'] not in paper.orders
+    assert paper.get_orders(FILLED)[-1]['id'] == order['id']
+    assert not paper.dirty_orders and not paper.dirty_positions and not paper.account_dirty
+
+
+def test_changes_during_a_failed_write_are_kept():
+    paper = engine()
+
+    class SlowFailingDB:
+        async def write_paper_state(self, account, positions, orders):
+            paper.place_order('PAPERTEST', 'SELL', 1, 'LIMIT', 500.0)
+            raise OSError("database is locked")
+
+    paper.db = SlowFailingDB()
+    first = paper.place_order('PAPERTEST', 'BUY', 1, 'LIMIT', 10.0)
+    asyncio.run(paper.flush())
+    assert len(paper.dirty_orders) == 2 and first['id'] in paper.dirty_orders
+
+
+def test_restart_restores_balance_with_positions(tmp_path):
+    async def run():
+        db = SQLiteDB()
+        db.db_path = tmp_path / "paper.db"
+        await db.init_db()
+        try:
+            # A row left by an older account scheme sorts first
+            await db.update_account({"id": "4c6fb4d0-legacy", "balance": 1.0})
+            paper = engine(db)
+            paper.place_order('PAPERTEST', 'BUY', 10)
+            paper.on_tick('PAPERTEST', 100.0, 1000)
+            paper.on_tick('PAPERTEST', 110.0, 2000)
+            # Fills at once against the last tick
+            paper.place_order('PAPERTEST', 'SELL', 4)
+            await paper.flush()
+            before = paper.account()
+
+            restarted = engine(db)
+            await restarted.load()
+            account = restarted.account()
+            assert account['realized_pnl'] == 40.0
+            assert account['balance'] == before['balance'] == CONFIG['initial_balance'] + 40.0
+            position = restarted.positions['PAPERTEST']
+            assert position.qty == 6 and position.avg_price == 100.0
+        finally:
+            await db.close()
+
+    asyncio.run(run())
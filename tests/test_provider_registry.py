@@ -0,0 +1,108 @@
+import asyncio
+import time
+
+from core.provider_registry import CLOSED, HALF_OPEN, OPEN, ProviderHealth, ProviderRegistry
+from data.providers import DataProvider
+
+
+class Provider(DataProvider):
+    def __init__(self, name, delay=0.0, result=None, error=None):
+        self.name = name
+        self.delay = delay
+        self.result = result
+        self.error = error
+        self.calls = 0
+        self.cancelled = 0
+
+    async def get_historical_ohlcv(self, symbol, interval, n_bars):
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if self.error:
+            raise self.error
+        return self.result
+
+
+class ChainsOnly(DataProvider):
+    async def get_option_chain(self, symbol, expiry=None):
+        return {"symbol": symbol, "strikes": []}
+
+
+def registry(primary, fallback=None, hedge_after_ms=50, timeout_seconds=2.0):
+    config = {'historical': {'provider': 'a', 'fallback': 'b' if fallback else None,
+                             'hedge_after_ms': hedge_after_ms, 'timeout_seconds': timeout_seconds}}
+    reg = ProviderRegistry(config, failure_threshold=2, cooldown=0.2)
+    reg.register('a', primary)
+    if fallback:
+        reg.register('b', fallback)
+    return reg
+
+
+def fetch(reg):
+    return asyncio.run(reg.fetch('historical', 'get_historical_ohlcv', 'NIFTY', '1', 10))
+
+
+def test_supports_only_overridden_methods():
+    assert not ChainsOnly().supports('get_historical_ohlcv')
+    assert ChainsOnly().supports('get_option_chain')
+    assert asyncio.run(DataProvider().get_historical_ohlcv('NIFTY', '1', 10)) is None
+    reg = ProviderRegistry({'historical': {'provider': 'a', 'fallback': 'b'}})
+    reg.register('a', ChainsOnly())
+    reg.register('b', Provider('b'))
+    assert reg.route('historical', 'get_historical_ohlcv') == ['b']
+
+
+def test_primary_answers_within_budget():
+    primary, fallback = Provider('a', result=[1]), Provider('b', result=[2])
+    assert fetch(registry(primary, fallback)) == [1]
+    assert fallback.calls == 0
+
+
+def test_slow_primary_is_hedged_and_cancelled():
+    primary, fallback = Provider('a', delay=1.0, result=[1]), Provider('b', delay=0.01, result=[2])
+    started = time.monotonic()
+    assert fetch(registry(primary, fallback)) == [2]
+    assert time.monotonic() - started < 0.5
+    assert primary.cancelled == 1
+
+
+def test_failure_starts_fallback_at_once():
+    primary, fallback = Provider('a', error=RuntimeError("down")), Provider('b', result=[2])
+    started = time.monotonic()
+    assert fetch(registry(primary, fallback, hedge_after_ms=1000)) == [2]
+    assert time.monotonic() - started < 0.5
+
+
+def test_timeout_returns_none():
+    reg = registry(Provider('a', delay=1.0, result=[1]), timeout_seconds=0.1)
+    assert fetch(reg) is None
+    assert reg.health['a'].failures == 1
+
+
+def test_circuit_opens_then_half_opens():
+    primary, fallback = Provider('a', result=[]), Provider('b', result=[2])
+    reg = registry(primary, fallback)
+    fetch(reg)
+    fetch(reg)
+    assert reg.health['a'].state == OPEN
+    fetch(reg)
+    # Skipped while open
+    assert primary.calls == 2
+    time.sleep(0.25)
+    primary.result = [1]
+    assert fetch(reg) == [1]
+    assert reg.health['a'].state == CLOSED
+
+
+def test_health_half_open_allows_one_trial():
+    health = ProviderHealth(failure_threshold=1, cooldown=10)
+    health.record_failure("boom", now=100.0)
+    assert not health.available(105.0)
+    assert health.available(111.0) and health.state == HALF_OPEN
+    health.trial_inflight = True
+    assert not health.available(112.0)
+    health.record_failure("again", now=112.0)
+    assert health.state == OPEN and health.opened_at == 112.0
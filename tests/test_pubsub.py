@@ -0,0 +1,112 @@
+import asyncio
+import fcntl
+import json
+import os
+
+from core.pubsub import UnixSocketBus
+
+
+def frame(message) -> bytes:
+    return json.dumps(message).encode() + b'\n'
+
+
+def test_follower_survives_bad_frames_and_handler_errors(tmp_path):
+    socket_path = str(tmp_path / 'feed.sock')
+    lock_path = str(tmp_path / 'feed.lock')
+    # Another process holds the feed lock, so the bus follows
+    lock_fd = os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+    fcntl.flock(lock_fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+    async def run():
+        connections = []
+        interest = []
+
+        async def serve(reader, writer):
+            connections.append(writer)
+            interest.append(json.loads(await reader.readline()))
+            writer.write(b'not json\n')
+            writer.write(frame({"t": "bar", "b": [1, 2, 3, 4, 5, 6, 7]}))
+            writer.write(frame({"t": "bar", "s": "BOOM", "b": [60, 1, 1, 1, 1, 1, 1]}))
+            writer.write(frame({"t": "bar", "s": "NIFTY", "b": [60, 1, 2, 0.5, 1.5, 10, 1000]}))
+            await writer.drain()
+            if len(connections) == 1:
+                # Drop the first follower connection: it should come back
+                writer.close()
+
+        server = await asyncio.start_unix_server(serve, path=socket_path)
+        bars = []
+
+        async def on_bar(symbol, bar):
+            if symbol == 'BOOM':
+                raise RuntimeError("handler failed")
+            bars.append((symbol, bar))
+
+        async def on_interest(peer, symbol, wanted):
+            pass
+
+        bus = UnixSocketBus(socket_path, lock_path, retry_seconds=0.05)
+        bus.interest.add('NIFTY')
+        await bus.start(on_bar, on_interest)
+        for _ in range(200):
+            if len(bars) >= 2:
+                break
+            await asyncio.sleep(0.01)
+        await bus.stop()
+        server.close()
+        return bars, interest, bus
+
+    bars, interest, bus = asyncio.run(asyncio.wait_for(run(), 10))
+    os.close(lock_fd)
+    assert not bus.is_leader
+    assert bars == [("NIFTY", (60, 1, 2, 0.5, 1.5, 10, 1000))] * 2
+    assert interest[0] == {"t": "interest", "s": "NIFTY", "on": True}
+
+
+def test_feed_drops_a_failing_peer_and_keeps_serving(tmp_path, caplog):
+    socket_path = str(tmp_path / 'feed.sock')
+    lock_path = str(tmp_path / 'feed.lock')
+
+    async def run():
+        loop_errors = []
+        asyncio.get_running_loop().set_exception_handler(lambda loop, context: loop_errors.append(context))
+        calls = []
+
+        async def on_interest(peer, symbol, wanted):
+            calls.append((peer, symbol, wanted))
+
+        async def on_bar(symbol, bar):
+            pass
+
+        bus = UnixSocketBus(socket_path, lock_path, retry_seconds=0.05)
+        await bus.start(on_bar, on_interest)
+        for _ in range(200):
+            if bus.is_leader:
+                break
+            await asyncio.sleep(0.01)
+
+        _, bad = await asyncio.open_unix_connection(socket_path)
+        bad.write(frame({"t": "interest", "s": "NIFTY", "on": True}))
+        bad.write(frame({"t": "interest", "on": True}))  # no symbol
+        await bad.drain()
+        good_reader, good = await asyncio.open_unix_connection(socket_path)
+        good.write(frame({"t": "interest", "s": "BANKNIFTY", "on": True}))
+        await good.drain()
+        for _ in range(200):
+            if len(calls) >= 3:
+                break
+            await asyncio.sleep(0.01)
+        peers = list(bus.peers)
+        await bus.publish_bar('BANKNIFTY', (60, 1, 2, 0.5, 1.5, 10, 1000))
+        relayed = json.loads(await asyncio.wait_for(good_reader.readline(), 5))
+        bad.close()
+        good.close()
+        await bus.stop()
+        return calls, peers, relayed, loop_errors
+
+    calls, peers, relayed, loop_errors = asyncio.run(asyncio.wait_for(run(), 10))
+    assert ('peer-1', 'NIFTY', True) in calls and ('peer-1', 'NIFTY', False) in calls
+    assert ('peer-2', 'BANKNIFTY', True) in calls
+    assert peers == ['peer-2']
+    assert relayed["s"] == 'BANKNIFTY'
+    assert loop_errors == []
+    assert any('Dropping feed bus peer-1' in record.getMessage() for record in caplog.records)
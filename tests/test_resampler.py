@@ -0,0 +1,59 @@
+from core.resampler import (NSE_SESSION_OPEN_UTC, SESSION_MINUTES, BarSeries, SymbolBars, base_minutes_needed,
+                            has_gaps, resample, session_bucket)
+
+# Monday 2024-01-01, 09:15 IST
+OPEN = 1704067200 + NSE_SESSION_OPEN_UTC
+
+
+def minutes(n, start=OPEN):
+    return [{"time": start + i * 60, "open": 100 + i, "high": 101 + i, "low": 99 + i, "close": 100.5 + i,
+             "volume": 10} for i in range(n)]
+
+
+def test_base_minutes_needed_counts_whole_sessions():
+    assert base_minutes_needed('1', 100) == 100
+    # 75 five-minute bars per session: 100 bars span two sessions, plus the forming one
+    assert base_minutes_needed('5', 100) == 3 * SESSION_MINUTES
+    assert session_bucket(OPEN + 14 * 60, 900) == OPEN
+    assert session_bucket(OPEN + 15 * 60, 900) == OPEN + 900
+
+
+def test_from_candles_counts_rows_received():
+    series = BarSeries.from_candles('1', minutes(3) + [{"time": None}])
+    assert len(series) == 3 and series.seeded_bars == 3
+
+
+def test_resample_aggregates_session_buckets():
+    base = BarSeries.from_candles('1', minutes(12), session_aligned=True)
+    five = resample(base, '5', base.seeded_bars)
+    assert five.candles(10) == [
+        {"time": OPEN, "open": 100.0, "high": 105.0, "low": 99.0, "close": 104.5, "volume": 50},
+        {"time": OPEN + 300, "open": 105.0, "high": 110.0, "low": 104.0, "close": 109.5, "volume": 50},
+        {"time": OPEN + 600, "open": 110.0, "high": 112.0, "low": 109.0, "close": 111.5, "volume": 20},
+    ]
+    assert five.columns(1)["time"] == [OPEN + 600]
+
+
+def test_derived_timeframe_follows_base_updates():
+    bars = SymbolBars(BarSeries.from_candles('1', minutes(12), session_aligned=True))
+    five = bars.timeframe('5')
+    # Same minute again with more volume, then the minute that opens a new bucket
+    bars.apply(OPEN + 11 * 60, 111, 115, 109, 114, 25, 15)
+    bars.apply(OPEN + 15 * 60, 114, 116, 113, 115, 7, 7)
+    assert five.candles(2) == [
+        {"time": OPEN + 600, "open": 110.0, "high": 115.0, "low": 109.0, "close": 114.0, "volume": 35},
+        {"time": OPEN + 900, "open": 114.0, "high": 116.0, "low": 113.0, "close": 115.0, "volume": 7},
+    ]
+    assert bars.base.candles(1)[0]["volume"] == 7
+
+
+def test_has_gaps_follows_the_session_calendar():
+    today = [OPEN + i * 60 for i in range(5)]
+    assert not has_gaps(today, '1')
+    # Yesterday's last bars, then today's from the open
+    yesterday = [OPEN - 86400 + (SESSION_MINUTES - 2 + i) * 60 for i in range(2)]
+    assert not has_gaps(yesterday + today, '1')
+    # Resumed mid-session after a restart, or a hole inside one session
+    assert has_gaps(yesterday + today[3:], '1')
+    assert has_gaps(today[:2] + today[4:], '1')
+    assert not has_gaps([OPEN, OPEN + 86400 * 3], 'D')
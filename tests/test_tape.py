@@ -0,0 +1,46 @@
+import asyncio
+import os
+
+import pytest
+
+from core.tape import BAR, CHAIN, TapeReader, TapeRecorder, decode_chain
+
+
+def record(tmp_path, chain):
+    async def run():
+        recorder = TapeRecorder(str(tmp_path))
+        recorder.start()
+        recorder.record_bar('NIFTY', 1000, 60, 1.0, 2.0, 0.5, 1.5, 10)
+        recorder.record_chain('NIFTY', chain)
+        recorder.record_bar('BANKNIFTY', 2000, 60, 3.0, 4.0, 2.5, 3.5, 20)
+        await recorder.stop()
+        return recorder
+
+    return asyncio.run(run())
+
+
+def test_round_trip(tmp_path):
+    chain = {"symbol": "NIFTY", "strikes": [{"strike": 22000, "ce_oi": 100}]}
+    recorder = record(tmp_path, chain)
+    assert recorder.records == 5  # two symbol records
+    records = list(TapeReader(recorder.path))
+    assert [(kind, ts, symbol) for kind, ts, symbol, _ in records[::2]] == [(BAR, 1000, 'NIFTY'),
+                                                                           (BAR, 2000, 'BANKNIFTY')]
+    assert records[0][3] == [60, 1.0, 2.0, 0.5, 1.5, 10]
+    assert records[1][0] == CHAIN and decode_chain(records[1][3]) == chain
+    summary = TapeReader(recorder.path).summary()
+    assert summary["symbols"] == {"NIFTY": {"bars": 1, "chains": 1}, "BANKNIFTY": {"bars": 1, "chains": 0}}
+
+
+def test_truncated_record_is_ignored(tmp_path):
+    recorder = record(tmp_path, {"strikes": []})
+    with open(recorder.path, 'r+b') as f:
+        f.truncate(os.path.getsize(recorder.path) - 5)
+    assert [symbol for _, _, symbol, _ in TapeReader(recorder.path)] == ['NIFTY', 'NIFTY']
+
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / "not.tape"
+    path.write_bytes(b'{"hello": 1}')
+    with pytest.raises(ValueError):
+        list(TapeReader(str(path)))
@@ -0,0 +1,76 @@
+import asyncio
+import time
+
+from sqlite_db import SQLiteDB, TimeSeriesWriter
+
+
+class FlakyDB:
+    def __init__(self, fail=0):
+        self.fail = fail
+        self.bars = []
+        self.ticks = []
+
+    async def write_batch(self, bars, ticks):
+        if self.fail:
+            self.fail -= 1
+            raise OSError("database is locked")
+        self.bars.extend(bars)
+        self.ticks.extend(ticks)
+
+
+def test_failed_batch_is_retried():
+    async def run():
+        db = FlakyDB(fail=1)
+        writer = TimeSeriesWriter(db)
+        writer.add_bar('nifty', '1', 60, 1, 2, 0.5, 1.5, 10)
+        writer.add_tick('nifty', 1000, 1.5, 10)
+        await writer.flush()
+        assert not db.bars and not db.ticks
+        # Arrives while the first batch is waiting for its retry: newer bar wins, ticks stay in order
+        writer.add_bar('nifty', '1', 60, 1, 3, 0.5, 2.5, 20)
+        writer.add_tick('nifty', 2000, 2.5, 20)
+        await writer.flush()
+        assert db.bars == [('NIFTY', '1', 60, 1, 3, 0.5, 2.5, 20)]
+        assert [tick[1] for tick in db.ticks] == [1000, 2000]
+        assert not writer.bars and not writer.ticks
+
+    asyncio.run(run())
+
+
+def test_retained_rows_are_bounded():
+    async def run():
+        db = FlakyDB(fail=10)
+        writer = TimeSeriesWriter(db, max_retained=5)
+        for ts in range(4):
+            writer.add_bar('nifty', '1', ts * 60, 1, 1, 1, 1, 1)
+            writer.add_tick('nifty', ts, 1, 1)
+        await writer.flush()
+        # Oldest ticks are shed first
+        assert [tick[1] for tick in writer.ticks] == [3]
+        assert len(writer.bars) == 4 and writer.shed == 3
+        writer.max_retained = 2
+        await writer.flush()
+        assert not writer.ticks and sorted(key[2] for key in writer.bars) == [120, 180]
+
+    asyncio.run(run())
+
+
+def test_prune_deletes_old_ticks(tmp_path):
+    async def run():
+        db = SQLiteDB()
+        db.db_path = tmp_path / "ticks.db"
+        await db.init_db()
+        try:
+            now_ms = int(time.time() * 1000)
+            old_ms = now_ms - 10 * 86400 * 1000
+            writer = TimeSeriesWriter(db, tick_retention_days=7)
+            writer.add_tick('nifty', old_ms, 1.0, 1)
+            writer.add_tick('nifty', now_ms, 2.0, 1)
+            await writer.flush()
+            await writer.prune()
+            ticks = await db.get_ticks('nifty', 0, now_ms + 1)
+            assert [tick['ts'] for tick in ticks] == [now_ms]
+        finally:
+            await db.close()
+
+    asyncio.run(run())
@@ -0,0 +1,78 @@
+import itertools
+
+from data.tv_api import HISTORY_MAX_PACKETS, LIVE_PACKETS, first_ohlc, ohlc_rows
+
+# Raw packets as Streamer(export_result=False).stream() yields them for NSE:NIFTY, 1m
+PACKETS = [
+    {"m": "qsd", "p": ["qs_abc", {"n": "NSE:NIFTY", "s": "ok", "v": {"lp": 22150.35, "ch": 12.5}}]},
+    {"m": "quote_completed", "p": ["qs_abc", "NSE:NIFTY"]},
+    {"m": "symbol_resolved", "p": ["cs_xyz", "sds_sym_1", {"name": "NIFTY", "exchange": "NSE", "pricescale": 100}]},
+    {"m": "series_loading", "p": ["cs_xyz", "sds_1", "s1"]},
+    {"m": "timescale_update", "p": ["cs_xyz", {
+        "sds_1": {"node": "svc", "s": [
+            {"i": 0, "v": [1767584700.0, 22100.0, 22120.5, 22095.25, 22110.0, 152000.0]},
+            {"i": 1, "v": [1767584760.0, 22110.0, 22130.0, 22105.0, 22125.75, 98000.0]},
+            {"i": 2, "v": [1767584820.0, 22125.75, 22126.0, 22118.0, 22120.0]}
+        ], "ns": {"d": "", "indexes": []}, "t": "s1", "lbs": {"bar_close_time": 1767584880}}
+    }, {"index": 2, "zoffset": 0, "changes": [], "marks": []}]},
+    {"m": "series_completed", "p": ["cs_xyz", "sds_1", "streaming", "s1", {}]},
+]
+
+
+def test_only_timescale_update_carries_rows():
+    assert [bool(ohlc_rows(packet)) for packet in PACKETS] == [False, False, False, False, True, False]
+    assert ohlc_rows({"m": "du", "p": ["cs_xyz", {"sds_1": {"s": [{"i": 3, "v": [1, 2, 3, 4, 5]}]}}]}) == []
+    assert ohlc_rows({"m": "timescale_update", "p": ["cs_xyz"]}) == []
+    assert ohlc_rows("~h~1") == []
+
+
+def test_first_ohlc_parses_the_history_packet():
+    rows = first_ohlc(iter(PACKETS))
+    assert rows == [
+        {"timestamp": 1767584700.0, "open": 22100.0, "high": 22120.5, "low": 22095.25, "close": 22110.0,
+         "volume": 152000.0},
+        {"timestamp": 1767584760.0, "open": 22110.0, "high": 22130.0, "low": 22105.0, "close": 22125.75,
+         "volume": 98000.0},
+        # Packets without a volume field
+        {"timestamp": 1767584820.0, "open": 22125.75, "high": 22126.0, "low": 22118.0, "close": 22120.0,
+         "volume": 0},
+    ]
+
+
+def test_first_ohlc_stops_at_the_packet_limit():
+    consumed = []
+
+    def quotes():
+        for i in itertools.count():
+            consumed.append(i)
+            yield PACKETS[0]
+
+    assert first_ohlc(quotes()) is None
+    assert len(consumed) == HISTORY_MAX_PACKETS
+
+
+def test_first_ohlc_stops_at_the_deadline():
+    consumed = []
+
+    def quotes():
+        for i in itertools.count():
+            consumed.append(i)
+            yield PACKETS[0]
+
+    assert first_ohlc(quotes(), max_packets=1000, deadline=0) is None
+    assert consumed == [0]
+
+
+def test_first_ohlc_on_a_closed_socket():
+    assert first_ohlc(iter(PACKETS[:4])) is None
+
+
+def test_live_updates_arrive_as_du_packets():
+    du = {"m": "du", "p": ["cs_xyz", {"sds_1": {"s": [{"i": 3, "v": [1767584880.0, 22120.0, 22131.0, 22119.0,
+                                                                    22130.5, 4100.0]}]}}]}
+    assert ohlc_rows(du) == []
+    assert ohlc_rows(du, LIVE_PACKETS) == [
+        {"timestamp": 1767584880.0, "open": 22120.0, "high": 22131.0, "low": 22119.0, "close": 22130.5,
+         "volume": 4100.0}
+    ]
+    assert ohlc_rows(PACKETS[4], LIVE_PACKETS)[-1]["close"] == 22120.0
@@ -0,0 +1,145 @@
+import asyncio
+import json
+
+import pytest
+
+import data.tv_stream as tv_stream
+from data.tv_stream import TradingViewStream, _frame
+
+
+class FakeSocket:
+    def __init__(self, frames=()):
+        self.frames = list(frames)
+        self.sent = []
+
+    async def send(self, data):
+        self.sent.append(data)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if not self.frames:
+            raise StopAsyncIteration
+        return self.frames.pop(0)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+def _du(updates):
+    return _frame(json.dumps({"m": "du", "p": ["cs_test", updates]}))
+
+
+def _bar(t, close):
+    return {"s": [{"i": 0, "v": [t, close - 1, close + 1, close - 2, close, 500]}]}
+
+
+async def _noop(symbol, bar):
+    pass
+
+
+def test_updates_are_routed_to_their_series_symbol():
+    async def run():
+        stream = TradingViewStream(_noop)
+        await stream.add_symbol('NIFTY')
+        await stream.add_symbol('BANKNIFTY')
+        stream.ws = FakeSocket()
+        # One socket message carrying a heartbeat and a du for both series plus an unknown one
+        raw = _frame('~h~7') + _du({
+            stream.series['BANKNIFTY']: _bar(1767584760.0, 48000.0),
+            stream.series['NIFTY']: _bar(1767584760.0, 22100.0),
+            'sds_99': _bar(1767584760.0, 1.0),
+        })
+        await stream._handle(raw)
+        assert stream.ws.sent == [_frame('~h~7')]
+        routed = [stream.queue.get_nowait() for _ in range(stream.queue.qsize())]
+        assert [(symbol, bar['close']) for symbol, bar in routed] == [('BANKNIFTY', 48000.0), ('NIFTY', 22100.0)]
+        assert routed[1][1] == {"timestamp": 1767584760, "open": 22099.0, "high": 22101.0,
+                                "low": 22098.0, "close": 22100.0, "volume": 500}
+
+    asyncio.run(run())
+
+
+def test_removed_symbol_is_not_routed_or_dispatched():
+    async def run():
+        received = []
+
+        async def on_bar(symbol, bar):
+            received.append(symbol)
+
+        stream = TradingViewStream(on_bar)
+        await stream.add_symbol('NIFTY')
+        await stream.add_symbol('BANKNIFTY')
+        nifty = stream.series['NIFTY']
+        stream.ws = FakeSocket()
+        await stream._handle(_du({nifty: _bar(1.0, 10.0), stream.series['BANKNIFTY']: _bar(1.0, 20.0)}))
+        # Removed while its bar was already queued: dropped at dispatch
+        await stream.remove_symbol('NIFTY')
+        await stream._handle(_du({nifty: _bar(2.0, 11.0)}))
+        dispatcher = asyncio.create_task(stream._dispatch())
+        await asyncio.sleep(0)
+        dispatcher.cancel()
+        await asyncio.gather(dispatcher, return_exceptions=True)
+        assert received == ['BANKNIFTY']
+
+    asyncio.run(run())
+
+
+class StopLoop(Exception):
+    pass
+
+
+def _record_backoff(monkeypatch, connects, limit):
+    """Fake connect/sleep; `connects` yields a socket or an exception per attempt. Returns the sleeps."""
+    delays = []
+    attempts = iter(connects)
+
+    def connect(*args, **kwargs):
+        outcome = next(attempts)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    async def sleep(delay):
+        delays.append(delay)
+        if len(delays) == limit:
+            raise StopLoop()
+
+    monkeypatch.setattr(tv_stream, 'connect', connect)
+    monkeypatch.setattr(tv_stream.asyncio, 'sleep', sleep)
+    # Upper end of the jitter window so the delays are deterministic
+    monkeypatch.setattr(tv_stream.random, 'uniform', lambda low, high: high)
+    return delays
+
+
+def test_reconnect_backoff_doubles_up_to_the_cap(monkeypatch):
+    delays = _record_backoff(monkeypatch, [OSError("refused")] * 6, limit=6)
+    stream = TradingViewStream(_noop, backoff_base=1.0, backoff_cap=10.0)
+    with pytest.raises(StopLoop):
+        asyncio.run(stream._run())
+    assert delays == [1.0, 2.0, 4.0, 8.0, 10.0, 10.0]
+    assert stream.reconnects == 6 and not stream.connected
+
+
+def test_successful_session_resets_backoff_and_resubscribes(monkeypatch):
+    socket = FakeSocket()
+    delays = _record_backoff(monkeypatch, [OSError("refused"), OSError("refused"), socket, OSError("refused")],
+                             limit=4)
+
+    async def run():
+        stream = TradingViewStream(_noop, backoff_base=1.0, backoff_cap=10.0)
+        await stream.add_symbol('NIFTY')
+        with pytest.raises(StopLoop):
+            await stream._run()
+        return stream
+
+    stream = asyncio.run(run())
+    # Two failures, a session that opened then closed, then the count starts again
+    assert delays == [1.0, 2.0, 1.0, 2.0]
+    methods = [json.loads(frame.split('~m~', 2)[2])['m'] for frame in socket.sent]
+    assert methods == ['set_auth_token', 'chart_create_session', 'resolve_symbol', 'create_series']
+    assert stream.ws is None and not stream.connected